@@ -0,0 +1,245 @@
+"""Local stand-ins for Telegram, Gemini, CoinGecko and Solana used by the benchmarks."""
+import asyncio
+import itertools
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+from telegram import Update
+from telegram.error import RetryAfter
+from telegram.request import BaseRequest, RequestData
+from websockets.server import serve
+
+
+class FakeBot:
+    """Records every send and injects configurable latency and RetryAfter errors."""
+
+    def __init__(self, latency: float = 0.0, retry_after_rate: float = 0.0, retry_after: int = 1, username: str = "FlowsyBot"):
+        self.latency = latency
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.username = username
+        self.sent: List[Dict[str, Any]] = []
+        self.retry_afters = 0
+        self._message_ids = itertools.count(1)
+
+    async def _send(self, method: str, **kwargs: Any) -> SimpleNamespace:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.retry_after_rate and random.random() < self.retry_after_rate:
+            self.retry_afters += 1
+            raise RetryAfter(self.retry_after)
+        self.sent.append({"method": method, "chat_id": kwargs.get("chat_id"), "at": time.perf_counter()})
+        return SimpleNamespace(message_id=next(self._message_ids), chat_id=kwargs.get("chat_id"))
+
+    async def send_message(self, chat_id=None, text=None, **kwargs):
+        return await self._send("send_message", chat_id=chat_id, text=text)
+
+    async def send_animation(self, chat_id=None, **kwargs):
+        return await self._send("send_animation", chat_id=chat_id)
+
+    async def send_sticker(self, chat_id=None, **kwargs):
+        return await self._send("send_sticker", chat_id=chat_id)
+
+    async def send_photo(self, chat_id=None, **kwargs):
+        return await self._send("send_photo", chat_id=chat_id)
+
+    async def send_poll(self, chat_id=None, **kwargs):
+        return await self._send("send_poll", chat_id=chat_id)
+
+    async def send_chat_action(self, chat_id=None, action=None, **kwargs):
+        return True
+
+    async def get_me(self):
+        return SimpleNamespace(username=self.username, id=0)
+
+
+class FakeBotAPIRequest(BaseRequest):
+    """Answers Bot API calls locally so a real Application/Bot can run without Telegram.
+
+    Records every call and can inject latency and 429 (RetryAfter) responses.
+    """
+
+    def __init__(self, latency: float = 0.0, retry_after_rate: float = 0.0, retry_after: int = 1):
+        self.latency = latency
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.calls: List[Dict[str, Any]] = []
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _result(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        if endpoint == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Flowsy", "username": "FlowsyBot",
+                    "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+        if endpoint == "getUpdates":
+            return []
+        if endpoint.startswith("send") and endpoint != "sendChatAction":
+            chat_id = int(params.get("chat_id", 0))
+            return {"message_id": next(self._message_ids), "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"}}
+        return True
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None, *args: Any, **kwargs: Any):
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        if self.latency and endpoint not in ("getMe", "getUpdates"):
+            await asyncio.sleep(self.latency)
+        if self.retry_after_rate and endpoint.startswith("send") and random.random() < self.retry_after_rate:
+            body = {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                    "parameters": {"retry_after": self.retry_after}}
+            return 429, json.dumps(body).encode()
+        self.calls.append({"endpoint": endpoint, "chat_id": params.get("chat_id"), "at": time.perf_counter()})
+        return 200, json.dumps({"ok": True, "result": self._result(endpoint, params)}).encode()
+
+
+class FakeContext:
+    """The subset of CallbackContext the handlers use."""
+
+    def __init__(self, bot: FakeBot, args: Optional[List[str]] = None, user_data: Optional[dict] = None):
+        self.bot = bot
+        self.args = args or []
+        self.user_data = user_data if user_data is not None else {}
+        self.chat_data: dict = {}
+        self.bot_data: dict = {}
+
+
+def make_update(bot: FakeBot, update_id: int, user_id: int, text: str, chat_id: Optional[int] = None, chat_type: str = "private") -> Update:
+    """Builds a real telegram.Update bound to the fake bot."""
+    chat_id = chat_id if chat_id is not None else user_id
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": chat_type},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "text": text,
+        },
+    }, bot)
+
+
+class FakeGeminiModel:
+    """Stand-in for genai.GenerativeModel with a tunable (blocking) delay."""
+
+    def __init__(self, delay: float = 0.2, text: str = "Salut! Alătură-te comunității FlowsyAI."):
+        self.delay = delay
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, prompt: str) -> SimpleNamespace:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return SimpleNamespace(text=self.text)
+
+
+COINGECKO_PRICES = {"bitcoin": 65000.0, "ethereum": 3200.0, "solana": 150.0}
+
+
+def coingecko_transport(prices: Optional[Dict[str, float]] = None) -> httpx.MockTransport:
+    """httpx.MockTransport answering /simple/price like CoinGecko."""
+    prices = prices or COINGECKO_PRICES
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ids = request.url.params.get("ids", "").split(",")
+        return httpx.Response(200, json={coin_id: {"usd": prices[coin_id]} for coin_id in ids if coin_id in prices})
+
+    return httpx.MockTransport(handler)
+
+
+def solana_rpc_transport(token_mint: str) -> httpx.MockTransport:
+    """httpx.MockTransport answering getTransaction batches with a buy of `token_mint`."""
+    def transaction() -> Dict[str, Any]:
+        return {
+            "slot": 1,
+            "transaction": {"message": {"accountKeys": ["BUYER", "POOL"]}},
+            "meta": {
+                "err": None, "fee": 5000,
+                "preBalances": [5_000_000_000, 0], "postBalances": [4_000_000_000, 0],
+                "preTokenBalances": [{"owner": "BUYER", "mint": token_mint, "uiTokenAmount": {"uiAmount": 0.0}}],
+                "postTokenBalances": [{"owner": "BUYER", "mint": token_mint, "uiTokenAmount": {"uiAmount": 1000.0}}],
+                "logMessages": ["Program log: Instruction: Transfer"],
+            },
+        }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if isinstance(body, list):
+            return httpx.Response(200, json=[{"jsonrpc": "2.0", "id": item["id"], "result": transaction()} for item in body])
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": []})
+
+    return httpx.MockTransport(handler)
+
+
+class FakeSolanaServer:
+    """Local WebSocket server that accepts logsSubscribe and emits logsNotification frames."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.sent_at: Dict[str, float] = {}
+        self._clients: List[Any] = []
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def __aenter__(self) -> "FakeSolanaServer":
+        self._server = await serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handler(self, websocket) -> None:
+        subscription_ids = itertools.count(1)
+        subscriptions: Dict[int, Any] = {}
+        client = SimpleNamespace(websocket=websocket, subscriptions=subscriptions)
+        self._clients.append(client)
+        try:
+            async for raw in websocket:
+                request = json.loads(raw)
+                if request.get("method", "").endswith("Unsubscribe"):
+                    subscriptions.pop(request["params"][0], None)
+                    result: Any = True
+                else:
+                    result = next(subscription_ids)
+                    subscriptions[result] = request.get("params")
+                await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}))
+        finally:
+            self._clients.remove(client)
+
+    async def wait_for_subscribers(self, count: int = 1, timeout: float = 10.0) -> None:
+        deadline = time.perf_counter() + timeout
+        while sum(len(client.subscriptions) for client in self._clients) < count:
+            if time.perf_counter() > deadline:
+                raise TimeoutError("No subscriber connected to the fake Solana server")
+            await asyncio.sleep(0.01)
+
+    async def emit_transfer(self, signature: str, slot: int) -> None:
+        self.sent_at[signature] = time.perf_counter()
+        for client in list(self._clients):
+            for subscription_id in list(client.subscriptions):
+                await client.websocket.send(json.dumps({
+                    "jsonrpc": "2.0",
+                    "method": "logsNotification",
+                    "params": {
+                        "subscription": subscription_id,
+                        "result": {
+                            "context": {"slot": slot},
+                            "value": {"signature": signature, "err": None, "logs": ["Program log: Instruction: Transfer"]},
+                        },
+                    },
+                }))
@@ -0,0 +1,109 @@
+"""Romanian/English fixture corpus for the language detection benchmark.
+
+Short chat messages of the kind the bot receives: with and without diacritics, crypto
+jargon, words that contain the old substring indicators ('de' in 'decide', 'or' in
+'work', 'ai' in 'wait'). Each entry is (expected language, text).
+"""
+
+CORPUS = [
+    ("ro", "Salut, ce mai faci?"),
+    ("ro", "salut ce mai faci"),
+    ("ro", "Cât costă un token FlowsyAI?"),
+    ("ro", "cat costa un token flowsy"),
+    ("ro", "Vreau să cumpăr monedă, de unde o iau?"),
+    ("ro", "vreau sa cumpar moneda de unde o iau"),
+    ("ro", "Mulțumesc pentru ajutor!"),
+    ("ro", "multumesc mult frate"),
+    ("ro", "Când se listează pe Binance?"),
+    ("ro", "cand se listeaza pe binance"),
+    ("ro", "Poți să-mi explici ce este blockchain?"),
+    ("ro", "poti sa imi explici ce e un wallet"),
+    ("ro", "Am trimis SOL dar nu apare în portofel"),
+    ("ro", "am trimis sol dar nu apare in portofel"),
+    ("ro", "Care e prețul azi?"),
+    ("ro", "care e pretul azi"),
+    ("ro", "Bună seara tuturor"),
+    ("ro", "buna seara tuturor"),
+    ("ro", "Cum setez o alertă pentru BTC?"),
+    ("ro", "cum setez o alerta pentru btc"),
+    ("ro", "Ce înseamnă inteligența artificială?"),
+    ("ro", "ce inseamna inteligenta artificiala"),
+    ("ro", "Echipa răspunde foarte repede, bravo!"),
+    ("ro", "echipa raspunde foarte repede bravo"),
+    ("ro", "Merită să investesc acum?"),
+    ("ro", "merita sa investesc acum"),
+    ("ro", "Nu înțeleg de ce tranzacția durează atât"),
+    ("ro", "nu inteleg de ce dureaza atat tranzactia"),
+    ("ro", "Aș vrea să aflu mai multe despre proiect"),
+    ("ro", "as vrea sa aflu mai multe despre proiect"),
+    ("ro", "Unde găsesc adresa contractului?"),
+    ("ro", "unde gasesc adresa contractului"),
+    ("ro", "Mâine intru pe grup"),
+    ("ro", "maine intru pe grup"),
+    ("ro", "Ești un bot sau un om?"),
+    ("ro", "esti bot sau om"),
+    ("ro", "Ajută-mă te rog cu o idee de aplicație"),
+    ("ro", "ajuta-ma te rog cu o idee de aplicatie"),
+    ("ro", "Dă-mi trei idei de proiecte AI"),
+    ("ro", "da-mi trei idei de proiecte ai"),
+    ("ro", "Am decis să aștept până săptămâna viitoare"),
+    ("ro", "Prețul a crescut frumos ieri"),
+    ("ro", "pretul a crescut frumos ieri"),
+    ("ro", "Câți membri are comunitatea?"),
+    ("ro", "cati membri are comunitatea"),
+    ("ro", "Scrie-mi un cod Python pentru recunoaștere de imagini"),
+    ("ro", "scrie-mi un cod python pentru recunoastere de imagini"),
+    ("ro", "Mersi, o zi bună!"),
+    ("ro", "mersi o zi buna"),
+    ("ro", "Lichiditatea e blocată?"),
+    ("en", "Hello, how are you?"),
+    ("en", "hello how are you"),
+    ("en", "How much does one FlowsyAI token cost?"),
+    ("en", "how much is one token"),
+    ("en", "I want to buy the coin, where can I get it?"),
+    ("en", "Thanks for the help!"),
+    ("en", "thanks a lot man"),
+    ("en", "When will it be listed on Binance?"),
+    ("en", "Can you explain what a blockchain is?"),
+    ("en", "I sent SOL but it doesn't show up in my wallet"),
+    ("en", "What's the price today?"),
+    ("en", "Good evening everyone"),
+    ("en", "How do I set an alert for BTC?"),
+    ("en", "What does artificial intelligence mean?"),
+    ("en", "The team answers really fast, great job!"),
+    ("en", "Is it worth investing now?"),
+    ("en", "I don't understand why the transaction takes so long"),
+    ("en", "I would like to learn more about the project"),
+    ("en", "Where do I find the contract address?"),
+    ("en", "I'll join the group tomorrow"),
+    ("en", "Are you a bot or a human?"),
+    ("en", "Please help me with an app idea"),
+    ("en", "Give me three AI project ideas"),
+    ("en", "I decided to wait until next week"),
+    ("en", "The price went up nicely yesterday"),
+    ("en", "How many members does the community have?"),
+    ("en", "Write me Python code for image recognition"),
+    ("en", "Have a nice day!"),
+    ("en", "Is the liquidity locked?"),
+    ("en", "wait what"),
+    ("en", "does it work on mobile"),
+    ("en", "decide for me"),
+    ("en", "gm everyone, wen moon"),
+    ("en", "any news about the roadmap"),
+    ("en", "my order is still pending"),
+    ("en", "airdrop details please"),
+    ("en", "show me the chart"),
+    ("en", "who is the developer behind this"),
+    ("en", "is this project legit"),
+    ("en", "send me the link"),
+    ("en", "let's go to the moon"),
+    ("en", "what about staking rewards"),
+    ("en", "tell me a joke about crypto"),
+    ("en", "dear admin, i have a question"),
+    ("en", "nice work everyone"),
+    ("en", "how to bridge from ethereum"),
+    ("en", "why is the chart red today"),
+    ("en", "the website is down"),
+    ("en", "recommend me some AI tools"),
+    ("en", "could you translate this for me"),
+]
@@ -0,0 +1,118 @@
+"""Replays a recording made with RECORD_UPDATES_PATH against the real Application.
+
+The Application comes from src.main.build_application(); Telegram, Gemini and
+CoinGecko are replaced by the local stand-ins from benchmarks.fakes.
+
+    python -m benchmarks.replay updates.jsonl.gz --speed 10
+    python -m benchmarks.replay updates.jsonl.gz --speed max --output replay.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay recorded updates against fake backends")
+    parser.add_argument("recording", help="Path to a .jsonl.gz recording")
+    parser.add_argument("--speed", default="1", help="1, 10, ... or 'max' (no pauses)")
+    parser.add_argument("--gemini-delay", type=float, default=0.5)
+    parser.add_argument("--bot-latency", type=float, default=0.05)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    from telegram import Update
+
+    from benchmarks.fakes import FakeBotAPIRequest, FakeGeminiModel, coingecko_transport
+    from benchmarks.scenarios import patch_coingecko, percentile
+    from src import handlers
+    from src.database import setup_database
+    from src.main import build_application
+    from src.metrics import registry
+    from src.recorder import load_recording
+
+    logging.getLogger().setLevel(logging.WARNING)
+    records = load_recording(args.recording)
+    speed = None if args.speed == "max" else float(args.speed)
+
+    await setup_database()
+    handlers.set_gemini_model(FakeGeminiModel(delay=args.gemini_delay))
+    patch_coingecko(handlers, coingecko_transport())
+    request = FakeBotAPIRequest(latency=args.bot_latency, retry_after_rate=args.retry_after_rate)
+    app = build_application(token="0:replay", request=request)
+
+    latencies: List[float] = []
+
+    async def process(update: Update) -> None:
+        started = time.perf_counter()
+        # Același drum ca în Application: procesorul de update-uri decide concurența
+        await app.update_processor.process_update(update, app.process_update(update))
+        latencies.append(time.perf_counter() - started)
+
+    async with app:
+        tasks = []
+        started = time.perf_counter()
+        for record in records:
+            if speed:
+                delay = started + record["t"] / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            update = Update.de_json(record["update"], app.bot)
+            tasks.append(asyncio.create_task(process(update)))
+        await asyncio.gather(*tasks, return_exceptions=True)
+        duration = time.perf_counter() - started
+
+    handler_stats = {}
+    for (name, labels), histogram in registry.histograms.items():
+        if name != "flowsy_handler_seconds":
+            continue
+        handler = dict(labels).get("handler")
+        handler_stats[handler] = {
+            "count": histogram.count,
+            "p50_ms": round(histogram.quantile(0.5) * 1000, 3),
+            "p99_ms": round(histogram.quantile(0.99) * 1000, 3),
+            "errors": registry.counter("flowsy_handler_errors_total", handler=handler),
+        }
+
+    return {
+        "recording": args.recording,
+        "speed": args.speed,
+        "updates": len(records),
+        "duration_s": round(duration, 4),
+        "throughput_per_s": round(len(records) / duration, 2) if duration else None,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "bot_api_calls": len(request.calls),
+        "handlers": handler_stats,
+    }
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="flowsy-replay-")
+    os.environ.update({
+        "DB_FILE": os.path.join(workdir, "replay.db"),
+        "GEMINI_API_KEY": "replay",
+        "RECORD_UPDATES_PATH": "",
+        "LOGO_PATH": os.path.join(workdir, "missing-logo.png"),
+    })
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    report = asyncio.run(replay(args))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
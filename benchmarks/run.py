@@ -0,0 +1,149 @@
+"""Offline benchmark runner.
+
+Every scenario runs in its own subprocess against a fresh temporary database,
+so peak RSS is measured per scenario. Results are printed as JSON:
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --scenario broadcast --broadcast-users 1000000 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCENARIO_NAMES = ["handle_message", "check_alerts", "broadcast", "solana_burst", "price_watch", "language", "outbound"]
+ADMIN_ID = 1
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux raportează în KB, macOS în bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def scenario_kwargs(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    if name == "handle_message":
+        return {"users": args.users, "messages_per_user": args.messages_per_user,
+                "gemini_delay": args.gemini_delay, "bot_latency": args.bot_latency}
+    if name == "check_alerts":
+        return {"alerts": args.alerts, "users": min(args.alerts, 10000), "bot_latency": args.bot_latency}
+    if name == "broadcast":
+        return {"recipients": args.broadcast_users, "bot_latency": args.bot_latency,
+                "retry_after_rate": args.retry_after_rate}
+    if name == "solana_burst":
+        return {"rate": args.solana_rate, "seconds": args.solana_seconds}
+    if name == "price_watch":
+        return {"alerts": args.price_alerts, "seconds": args.price_seconds, "fixed_interval": args.price_fixed_interval}
+    if name == "outbound":
+        return {"bulk": args.outbound_bulk, "replies": args.outbound_replies, "rate": args.outbound_rate}
+    if name == "language":
+        return {"rounds": args.language_rounds, "users": args.users}
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def run_child(name: str, args: argparse.Namespace) -> None:
+    """Runs one scenario in this process and prints its JSON result."""
+    workdir = tempfile.mkdtemp(prefix="flowsy-bench-")
+    os.environ.update({
+        "DB_FILE": os.path.join(workdir, "bench.db"),
+        "ADMIN_ID": str(ADMIN_ID),
+        "TELEGRAM_TOKEN": "0:bench",
+        "GEMINI_API_KEY": "bench",
+        "LOGO_PATH": os.path.join(workdir, "missing-logo.png"),
+        "DB_SHARDS": str(args.db_shards),
+    })
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from benchmarks.scenarios import SCENARIOS
+    logging.getLogger().setLevel(logging.WARNING)
+
+    result = asyncio.run(SCENARIOS[name](**scenario_kwargs(name, args)))
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="FlowsyAI bot offline benchmarks")
+    parser.add_argument("--scenario", action="append", choices=SCENARIO_NAMES, help="Run only these scenarios (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Small sizes for a smoke run")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages-per-user", type=int, default=3)
+    parser.add_argument("--gemini-delay", type=float, default=0.5)
+    parser.add_argument("--bot-latency", type=float, default=0.05)
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--broadcast-users", type=int, default=1_000_000)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--solana-rate", type=int, default=1000)
+    parser.add_argument("--solana-seconds", type=float, default=5.0)
+    parser.add_argument("--price-alerts", type=int, default=200)
+    parser.add_argument("--price-seconds", type=float, default=12.0)
+    parser.add_argument("--price-fixed-interval", type=float, default=0.6, help="Scaled stand-in for the old 60 s polling")
+    parser.add_argument("--db-shards", type=int, default=1, help="DB_SHARDS for the scenario's database")
+    parser.add_argument("--language-rounds", type=int, default=50)
+    parser.add_argument("--outbound-bulk", type=int, default=2000)
+    parser.add_argument("--outbound-replies", type=int, default=20)
+    parser.add_argument("--outbound-rate", type=float, default=300, help="Scaled stand-in for the 30 msg/s global limit")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.users, args.messages_per_user, args.gemini_delay = 50, 2, 0.05
+        args.alerts, args.broadcast_users = 1000, 5000
+        args.solana_rate, args.solana_seconds = 200, 1.0
+        args.price_alerts, args.price_seconds = 50, 3.0
+        args.language_rounds = 10
+        args.outbound_bulk = 500
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.child:
+        run_child(args.child, args)
+        return
+
+    forwarded = [arg for arg in (argv if argv is not None else sys.argv[1:]) if arg != "--quick"]
+    if args.quick:
+        forwarded.append("--quick")
+    report: Dict[str, Any] = {
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": {},
+    }
+    for name in args.scenario or SCENARIO_NAMES:
+        print(f"Running {name}...", file=sys.stderr)
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--child", name] + forwarded,
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        lines = child.stdout.strip().splitlines()
+        if child.returncode != 0 or not lines:
+            report["scenarios"][name] = {"error": child.stderr.strip().splitlines()[-1:] or ["no output"]}
+            continue
+        report["scenarios"][name] = json.loads(lines[-1])
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Benchmark scenarios. Each returns a dict of measurements for one run."""
+import asyncio
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List
+
+import httpx
+
+from .fakes import (
+    FakeBot, FakeBotAPIRequest, FakeContext, FakeGeminiModel, FakeSolanaServer,
+    coingecko_transport, make_update, solana_rpc_transport
+)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(latencies: List[float], duration: float, count: int, **extra: Any) -> Dict[str, Any]:
+    result = {
+        "count": count,
+        "duration_s": round(duration, 4),
+        "throughput_per_s": round(count / duration, 2) if duration else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+    result.update(extra)
+    return result
+
+
+def patch_coingecko(handlers_module: Any, transport: httpx.MockTransport) -> None:
+    """Points get_crypto_price at the mock CoinGecko transport."""
+    handlers_module.set_http_client(httpx.AsyncClient(transport=transport))
+
+
+def _by_shard(rows: Iterable[tuple], db_file: str, shards: int) -> Dict[str, List[tuple]]:
+    """Rows keyed by user_id (first column) grouped per shard file, as src.database routes them."""
+    from src.database import shard_file, shard_of
+
+    files: Dict[str, List[tuple]] = {}
+    for row in rows:
+        files.setdefault(shard_file(shard_of(row[0], shards), shards, db_file), []).append(row)
+    return files
+
+
+def seed_users(db_file: str, count: int, shards: int = 1) -> None:
+    rows = ((user_id, f"User{user_id}", None, None) for user_id in range(1, count + 1))
+    for path, shard_rows in _by_shard(rows, db_file, shards).items():
+        with sqlite3.connect(path) as db:
+            db.executemany("INSERT OR IGNORE INTO users (user_id, first_name, last_name, username) VALUES (?, ?, ?, ?)", shard_rows)
+
+
+def seed_alerts(db_file: str, count: int, users: int, shards: int = 1) -> None:
+    """Half of the alerts are already past their threshold and fire on the next check."""
+    symbols = [("BTC", 65000.0), ("ETH", 3200.0), ("SOL", 150.0)]
+    rows = []
+    for i in range(count):
+        symbol, price = symbols[i % len(symbols)]
+        fires = i % 2 == 0
+        direction = 'peste' if i % 4 < 2 else 'sub'
+        if direction == 'peste':
+            target = price * (0.9 if fires else 1.1)
+        else:
+            target = price * (1.1 if fires else 0.9)
+        rows.append((i % users + 1, symbol, target, direction))
+    for path, shard_rows in _by_shard(rows, db_file, shards).items():
+        with sqlite3.connect(path) as db:
+            db.executemany("INSERT INTO alerts (user_id, symbol, target_price, direction) VALUES (?, ?, ?, ?)", shard_rows)
+
+
+async def bench_handle_message(users: int, messages_per_user: int, gemini_delay: float, bot_latency: float) -> Dict[str, Any]:
+    """N users talking to the bot in private chat at the same time."""
+    from src import handlers
+    from src.database import setup_database
+
+    await setup_database()
+    model = FakeGeminiModel(delay=gemini_delay)
+    handlers.set_gemini_model(model)
+    bot = FakeBot(latency=bot_latency)
+    latencies: List[float] = []
+
+    async def session(user_id: int) -> None:
+        context = FakeContext(bot)
+        for i in range(messages_per_user):
+            update = make_update(bot, user_id * 1000 + i, user_id, "Salut, ce este FlowsyAI?")
+            started = time.perf_counter()
+            await handlers.handle_message(update, context)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(user_id) for user_id in range(1, users + 1)))
+    duration = time.perf_counter() - started
+    return summarize(latencies, duration, len(latencies), users=users, gemini_calls=model.calls, sends=len(bot.sent))
+
+
+async def bench_check_alerts(alerts: int, users: int, bot_latency: float) -> Dict[str, Any]:
+    """One check_alerts pass over a large alert table; half of the alerts fire."""
+    from src import handlers
+    from src.config import DB_FILE, DB_SHARDS
+    from src.database import setup_database
+
+    await setup_database()
+    seed_users(DB_FILE, users, DB_SHARDS)
+    seed_alerts(DB_FILE, alerts, users, DB_SHARDS)
+    patch_coingecko(handlers, coingecko_transport())
+    bot = FakeBot(latency=bot_latency)
+
+    started = time.perf_counter()
+    await handlers.check_alerts(FakeContext(bot))
+    duration = time.perf_counter() - started
+    # Latența = timpul de la începutul verificării până la fiecare notificare trimisă
+    notify_delays = [item["at"] - started for item in bot.sent if item["method"] == "send_message"]
+    return summarize(notify_delays, duration, alerts, notifications=len(notify_delays))
+
+
+async def bench_broadcast(recipients: int, bot_latency: float, retry_after_rate: float) -> Dict[str, Any]:
+    """Admin /broadcast to every user in the database."""
+    from src import handlers
+    from src.config import ADMIN_ID, DB_FILE, DB_SHARDS
+    from src.database import setup_database
+
+    await setup_database()
+    seed_users(DB_FILE, recipients, DB_SHARDS)
+    bot = FakeBot(latency=bot_latency, retry_after_rate=retry_after_rate)
+    update = make_update(bot, 1, ADMIN_ID, "/broadcast Salutare tuturor!")
+
+    started = time.perf_counter()
+    await handlers.broadcast(update, FakeContext(bot, args=["Salutare", "tuturor!"]))
+    duration = time.perf_counter() - started
+    # Ultimul mesaj trimis este rezumatul pentru admin
+    delivery = [item["at"] - started for item in bot.sent[:-1]]
+    return summarize(delivery, duration, recipients, delivered=len(delivery), retry_afters=bot.retry_afters)
+
+
+async def bench_solana_burst(rate: int, seconds: float) -> Dict[str, Any]:
+    """A burst of `rate` transfer notifications per second through SolanaMonitor."""
+    from src.blockchain import SolanaMonitor
+
+    token_mint = "BenchMint1111111111111111111111111111111111"
+    detected: Dict[str, float] = {}
+
+    async def on_event(event) -> None:
+        detected[event.signature] = time.perf_counter()
+
+    async with FakeSolanaServer() as server:
+        monitor = SolanaMonitor(server.url, token_mint, on_event, rpc_url="http://solana-rpc.local")
+        monitor.rpc._client = httpx.AsyncClient(transport=solana_rpc_transport(token_mint))
+        monitor_task = asyncio.create_task(monitor.start())
+        await server.wait_for_subscribers()
+
+        total = int(rate * seconds)
+        tick = 0.01
+        per_tick = max(1, int(rate * tick))
+        started = time.perf_counter()
+        for i in range(total):
+            await server.emit_transfer(f"sig{i}", slot=i)
+            if (i + 1) % per_tick == 0:
+                next_tick = started + (i + 1) / rate
+                await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+        deadline = time.perf_counter() + 10
+        while len(detected) < total and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        duration = time.perf_counter() - started
+
+        await monitor.stop()
+        await asyncio.gather(monitor_task, return_exceptions=True)
+
+    latencies = [detected[sig] - server.sent_at[sig] for sig in detected]
+    return summarize(latencies, duration, len(detected), emitted=total, target_rate=rate)
+
+
+async def bench_price_watch(alerts: int, seconds: float, fixed_interval: float) -> Dict[str, Any]:
+    """Price ramps +10% over `seconds`; the old per-alert fixed polling vs PriceWatcher.
+
+    Times are scaled down (60 s fixed polling ~ `fixed_interval`), the delay is measured
+    from the moment the ramp crosses a threshold to the notification.
+    """
+    from src.price_watch import PriceWatcher
+
+    start_price, rise = 100.0, 10.0
+    rows = [(i, i, "BTC", start_price + rise * (i + 0.5) / alerts, 'peste') for i in range(alerts)]
+    rows.append((alerts, alerts, "ETH", 1000.0, 'peste'))  # departe de țintă: interogat rar
+
+    def crossing_time(target: float) -> float:
+        return (target - start_price) / rise * seconds
+
+    async def run(strategy: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        requests = 0
+        delays: List[float] = []
+        pending = {row[0]: row for row in rows}
+
+        async def fetch_price(symbol: str) -> float:
+            nonlocal requests
+            requests += 1
+            elapsed = min(time.perf_counter() - started, seconds)
+            return start_price + rise * elapsed / seconds if symbol == "BTC" else 500.0
+
+        async def on_price(symbol: str, price: float, symbol_alerts) -> List[int]:
+            now = time.perf_counter() - started
+            fired = [row[0] for row in symbol_alerts if row[0] in pending and price >= row[3]]
+            for alert_id in fired:
+                delays.append(now - crossing_time(pending.pop(alert_id)[3]))
+            return fired
+
+        if strategy == "fixed":
+            while time.perf_counter() - started < seconds + fixed_interval:
+                # Ca vechiul check_alerts: câte o cerere de preț pentru fiecare alertă
+                for row in list(pending.values()):
+                    await on_price(row[2], await fetch_price(row[2]), [row])
+                await asyncio.sleep(fixed_interval)
+        else:
+            async def load_alerts():
+                return list(pending.values())
+
+            watcher = PriceWatcher(fetch_price, load_alerts, on_price,
+                                   min_interval=fixed_interval / 12, max_interval=fixed_interval * 5)
+            task = asyncio.create_task(watcher.run())
+            await asyncio.sleep(seconds + fixed_interval)
+            watcher.stop()
+            await asyncio.gather(task, return_exceptions=True)
+
+        return {"upstream_requests": requests, "notified": len(delays),
+                "delay_p50_ms": round(percentile(delays, 0.50) * 1000, 1),
+                "delay_p99_ms": round(percentile(delays, 0.99) * 1000, 1)}
+
+    fixed = await run("fixed")
+    adaptive = await run("adaptive")
+    return {"count": alerts, "duration_s": seconds, "fixed": fixed, "adaptive": adaptive}
+
+
+async def bench_outbound(bulk: int, replies: int, rate: float) -> Dict[str, Any]:
+    """Replies sent while a bulk send is queued, through a real ExtBot and OutboundScheduler.
+
+    `fifo` sends everything with one priority, as before the scheduler had classes;
+    `prioritised` sends the bulk as BULK. The global rate is scaled down (`rate`/s) so
+    the queue builds up quickly; reply latency is what a user waiting for /coin sees.
+    """
+    from telegram.ext import ExtBot
+    from src.outbound import BULK, INTERACTIVE, OutboundScheduler
+
+    async def run(bulk_priority: int) -> Dict[str, Any]:
+        scheduler = OutboundScheduler(global_rate=rate)
+        bot = ExtBot("0:bench", request=FakeBotAPIRequest(), rate_limiter=scheduler)
+        await bot.initialize()
+        latencies: List[float] = []
+
+        async def reply(i: int) -> None:
+            await asyncio.sleep(i * bulk / rate / replies / 2)  # răspunsurile sosesc în prima jumătate a trimiterii
+            started = time.perf_counter()
+            await bot.send_message(-(i + 1), "reply", rate_limit_args=INTERACTIVE)
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        sends = [bot.send_message(user_id, "bulk", rate_limit_args=bulk_priority) for user_id in range(1, bulk + 1)]
+        await asyncio.gather(*sends, *(reply(i) for i in range(replies)))
+        duration = time.perf_counter() - started
+        await bot.shutdown()
+        return {"reply_p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+                "reply_p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+                "duration_s": round(duration, 2)}
+
+    return {"count": bulk, "replies": replies, "rate": rate,
+            "fifo": await run(INTERACTIVE), "prioritised": await run(BULK)}
+
+
+def legacy_detect_user_language(text: str) -> str:
+    """detect_user_language din main.py înainte de src/language.py (referință)."""
+    romanian_indicators = ['să', 'și', 'cu', 'de', 'la', 'în', 'pe', 'pentru', 'este', 'sunt', 'ai', 'îmi', 'îți', 'că', 'dacă', 'când', 'unde', 'cum', 'ce', 'cine']
+    english_indicators = ['the', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'have', 'has', 'had', 'will', 'would', 'can', 'could', 'should', 'what', 'when', 'where', 'how', 'who']
+    text_lower = text.lower()
+    romanian_count = sum(1 for word in romanian_indicators if word in text_lower)
+    english_count = sum(1 for word in english_indicators if word in text_lower)
+    return 'romanian' if romanian_count > english_count else 'english'
+
+
+async def bench_language(rounds: int, users: int) -> Dict[str, Any]:
+    """Accuracy and cost per message on the fixture corpus, old substring check vs LanguageDetector.
+
+    The profile part replays `users` users writing `rounds` messages each in one language
+    and reports how many detections the per-user profiles skipped.
+    """
+    from src.language import LanguageDetector, LanguageProfiles
+    from .language_corpus import CORPUS
+
+    started = time.perf_counter()
+    detector = LanguageDetector()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    def measure(detect) -> Dict[str, Any]:
+        correct = sum(detect(text) == expected for expected, text in CORPUS)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for _, text in CORPUS:
+                detect(text)
+        per_message = (time.perf_counter() - started) / (rounds * len(CORPUS))
+        return {"accuracy": round(correct / len(CORPUS), 3), "us_per_message": round(per_message * 1e6, 2)}
+
+    legacy = measure(lambda text: 'ro' if legacy_detect_user_language(text) == 'romanian' else 'en')
+    detector_result = measure(lambda text: detector.detect(text).language or 'en')
+
+    profiles = LanguageProfiles(detector)
+    by_language = {lang: [text for expected, text in CORPUS if expected == lang] for lang in ('ro', 'en')}
+    correct = total = 0
+    for user_id in range(users):
+        lang = 'ro' if user_id % 2 else 'en'
+        texts = by_language[lang]
+        for i in range(rounds):
+            correct += profiles.observe(user_id, texts[(user_id + i) % len(texts)]) == lang
+            total += 1
+    return {
+        "count": len(CORPUS), "build_ms": round(build_ms, 2),
+        "legacy": legacy, "detector": detector_result,
+        "profiles": {"accuracy": round(correct / total, 3), "messages": total,
+                     "detections": profiles.detections, "skipped": profiles.skipped},
+    }
+
+
+SCENARIOS = {
+    "handle_message": bench_handle_message,
+    "check_alerts": bench_check_alerts,
+    "broadcast": bench_broadcast,
+    "solana_burst": bench_solana_burst,
+    "price_watch": bench_price_watch,
+    "language": bench_language,
+    "outbound": bench_outbound,
+}
@@ -5,7 +5,7 @@ import os
 import logging
 import asyncio
 import aiosqlite
-from datetime import datetime, timedelta
+from datetime import datetime, time as dt_time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from telegram.constants import ParseMode
@@ -13,6 +13,8 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 import configparser
 
+from src.language import LanguageDetector, LanguageProfiles
+
 # Load environment variables
 load_dotenv()
 
@@ -42,6 +44,10 @@ model = None
 # Initialize conversation history
 conversation_history = {}
 
+# Limba fiecărui utilizator; tabelele detectorului se construiesc o singură dată
+language_profiles = LanguageProfiles(LanguageDetector())
+LANGUAGE_SAVE_INTERVAL = 60  # secunde
+
 # Database setup
 async def init_db():
     async with aiosqlite.connect(DB_FILE) as db:
@@ -54,6 +60,22 @@ async def init_db():
                 first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # Ultima săptămână în care sfatul a fost trimis, ca o repornire să nu-l retrimită
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS weekly_tip_runs (
+                week TEXT PRIMARY KEY,
+                cursor INTEGER NOT NULL DEFAULT 0,
+                completed_at TIMESTAMP
+            )
+        ''')
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS user_languages (
+                user_id INTEGER PRIMARY KEY,
+                language TEXT NOT NULL,
+                score REAL NOT NULL,
+                messages INTEGER NOT NULL
+            )
+        ''')
         await db.commit()
 
 async def add_user(user_id, username, first_name, last_name):
@@ -102,6 +124,12 @@ COIN_MESSAGE = (
 
 HELP_MESSAGE = r"*Comenzi disponibile:*\n\n/start \- Pornește conversația cu mine\.\n/features \- Află beneficiile grupului nostru\.\n/about \- Citește mai multe despre misiunea FlowsyAI\.\n/coin \- Vezi detalii despre FlowsyAI Coin\.\n/help \- Afișează acest mesaj de ajutor\."
 
+def read_logo():
+    if not os.path.exists(LOGO_PATH):
+        return None
+    with open(LOGO_PATH, 'rb') as logo:
+        return logo.read()
+
 # Command handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
@@ -113,14 +141,15 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    if os.path.exists(LOGO_PATH):
-        with open(LOGO_PATH, 'rb') as logo:
-            await update.message.reply_photo(
-                photo=logo,
-                caption=WELCOME_MESSAGE,
-                parse_mode=ParseMode.MARKDOWN_V2,
-                reply_markup=reply_markup
-            )
+    # Citirea de pe disc rulează într-un thread, ca event loop-ul să nu fie blocat
+    logo = await asyncio.to_thread(read_logo)
+    if logo:
+        await update.message.reply_photo(
+            photo=logo,
+            caption=WELCOME_MESSAGE,
+            parse_mode=ParseMode.MARKDOWN_V2,
+            reply_markup=reply_markup
+        )
     else:
         await send_reply(update, WELCOME_MESSAGE, ParseMode.MARKDOWN_V2, reply_markup)
 
@@ -146,22 +175,30 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await send_reply(update, HELP_MESSAGE, ParseMode.MARKDOWN_V2)
 
 # Language detection helper function
-def detect_user_language(text: str) -> str:
-    """Detect if user message is in Romanian or English"""
-    romanian_indicators = ['să', 'și', 'cu', 'de', 'la', 'în', 'pe', 'pentru', 'este', 'sunt', 'ai', 'îmi', 'îți', 'că', 'dacă', 'când', 'unde', 'cum', 'ce', 'cine']
-    english_indicators = ['the', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'have', 'has', 'had', 'will', 'would', 'can', 'could', 'should', 'what', 'when', 'where', 'how', 'who']
-
-    text_lower = text.lower()
-    romanian_count = sum(1 for word in romanian_indicators if word in text_lower)
-    english_count = sum(1 for word in english_indicators if word in text_lower)
-
-    if romanian_count > english_count:
-        return 'romanian'
-    elif english_count > romanian_count:
-        return 'english'
-    else:
-        # Default to English if unclear
-        return 'english'
+async def detect_user_language(user_id: int, text: str) -> str:
+    """Detect if user message is in Romanian or English, using the user's language profile"""
+    if user_id not in language_profiles:
+        async with aiosqlite.connect(DB_FILE) as db:
+            cursor = await db.execute("SELECT score, messages FROM user_languages WHERE user_id = ?", (user_id,))
+            language_profiles.load(user_id, await cursor.fetchone())
+    return 'romanian' if language_profiles.observe(user_id, text) == 'ro' else 'english'
+
+async def save_language_profiles(context: ContextTypes.DEFAULT_TYPE = None) -> None:
+    rows = language_profiles.take_dirty()
+    if not rows:
+        return
+    try:
+        async with aiosqlite.connect(DB_FILE) as db:
+            await db.executemany(
+                "INSERT OR REPLACE INTO user_languages (user_id, language, score, messages) VALUES (?, ?, ?, ?)", rows
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to save language profiles: {e}")
+        language_profiles.restore_dirty(row[0] for row in rows)
+
+async def on_shutdown(application: Application) -> None:
+    await save_language_profiles()
 
 # AI conversation handler
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -203,7 +240,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Determine response language and style based on chat type
         if chat_type == 'private':
             # Private chat: detect language, be concise, focus on investment
-            user_language = detect_user_language(user_message)
+            user_language = await detect_user_language(user_id, user_message)
             if user_language == 'romanian':
                 language_instruction = "Răspunde EXCLUSIV în limba română. Fii FOARTE CONCIS (maxim 2-3 propoziții). PROMOVEAZĂ INTENS investiția în FlowsyAI Coin ($FLOWSY) în fiecare răspuns. Menționează câștiguri potențiale, avantaje pentru investitorii timpurii, sau beneficii ale comunității."
                 error_message = "Îmi pare rău, am întâmpinat o problemă tehnică. Te rog încearcă din nou."
@@ -261,7 +298,8 @@ Recent conversation:
 
 Respond helpfully to the user's question."""
 
-        response = model.generate_content(system_prompt)
+        # Apelul Gemini e sincron: într-un thread, cu timeout, ca ceilalți utilizatori să nu aștepte
+        response = await asyncio.wait_for(asyncio.to_thread(model.generate_content, system_prompt), timeout=API_TIMEOUT)
         ai_response = response.text
 
         conversation_history[user_id].append(f"FlowsyAI: {ai_response}")
@@ -309,15 +347,38 @@ async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     await send_reply(update, rf"*Broadcast Terminat*\n\nMesaj trimis către *{sent_count}* utilizatori\.\nEșuat pentru *{failed_count}* utilizatori\.", parse_mode=ParseMode.MARKDOWN_V2)
 
+WEEKLY_TIP_RATE = 20  # mesaje pe secundă, sub limita Telegram pentru trimiteri în masă
+
 async def weekly_tip(context: ContextTypes.DEFAULT_TYPE):
     tip_message = rf"*Sfatul Săptămânii de la Flowsy* 💡\n\nȘtiai că poți folosi modele AI pentru a-ți genera idei de proiecte noi? Încearcă să-i ceri lui Gemini: `sugerează-mi 3 idei de aplicații web care folosesc Python și recunoaștere de imagini`\.\n\nHai pe [grupul nostru]({GROUP_LINK}) să ne arăți ce ai creat\!"
+    year, week, _ = datetime.utcnow().isocalendar()
+    week_key = f"{year}-W{week:02d}"
     async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute("SELECT user_id FROM users")
+        await db.execute("INSERT OR IGNORE INTO weekly_tip_runs (week) VALUES (?)", (week_key,))
+        await db.commit()
+        cursor = await db.execute("SELECT cursor, completed_at FROM weekly_tip_runs WHERE week = ?", (week_key,))
+        last_user_id, completed_at = await cursor.fetchone()
+        if completed_at:
+            logger.info(f"Weekly tip for {week_key} already sent, skipping.")
+            return
+        cursor = await db.execute("SELECT user_id FROM users WHERE user_id > ? ORDER BY user_id", (last_user_id,))
         user_ids = await cursor.fetchall()
-    
+
     logger.info(f"Sending weekly tip to {len(user_ids)} users.")
-    tasks = [context.bot.send_message(user_id[0], tip_message, parse_mode=ParseMode.MARKDOWN_V2, disable_web_page_preview=True) for user_id in user_ids]
-    await asyncio.gather(*tasks, return_exceptions=True)
+    # Trimitere eșalonată, în loturi; cursorul salvat permite reluarea fără dubluri
+    batch_size = WEEKLY_TIP_RATE
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        tasks = [context.bot.send_message(user_id[0], tip_message, parse_mode=ParseMode.MARKDOWN_V2, disable_web_page_preview=True) for user_id in batch]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        async with aiosqlite.connect(DB_FILE) as db:
+            await db.execute("UPDATE weekly_tip_runs SET cursor = ? WHERE week = ?", (batch[-1][0], week_key))
+            await db.commit()
+        await asyncio.sleep(1)
+
+    async with aiosqlite.connect(DB_FILE) as db:
+        await db.execute("UPDATE weekly_tip_runs SET completed_at = CURRENT_TIMESTAMP WHERE week = ?", (week_key,))
+        await db.commit()
 
 def main() -> None:
     # Configure Gemini AI
@@ -330,7 +391,7 @@ def main() -> None:
     asyncio.run(init_db())
     logger.info("Database initialized successfully.")
 
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = Application.builder().token(TELEGRAM_TOKEN).post_shutdown(on_shutdown).build()
 
     # Add handlers
     application.add_handler(CommandHandler("start", start))
@@ -344,7 +405,9 @@ def main() -> None:
 
     # Schedule weekly tips
     job_queue = application.job_queue
-    job_queue.run_repeating(weekly_tip, interval=timedelta(weeks=1), first=timedelta(seconds=10))
+    # Lunea la 09:00 UTC (în PTB 20 zilele sunt 0 = duminică ... 6 = sâmbătă), nu la fiecare pornire
+    job_queue.run_daily(weekly_tip, time=dt_time(hour=9, minute=0), days=(1,))
+    job_queue.run_repeating(save_language_profiles, interval=LANGUAGE_SAVE_INTERVAL, first=LANGUAGE_SAVE_INTERVAL)
 
     logger.info("Starting bot...")
 
@@ -1,105 +1,540 @@
 import asyncio
+import itertools
 import json
 import logging
-from typing import Optional, Dict, Any, Callable, Awaitable
+import random
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable, List, Sequence, Union
 
 from websockets.client import connect
 from websockets.exceptions import ConnectionClosed
 
+from .celebrations import SignatureCache
+from .classifier import TransactionClassifier, TransferEvent, classify_transaction, is_candidate
+from .metrics import timer
+from .solana_rpc import SolanaRPC
+
 logger = logging.getLogger(__name__)
 
-class SolanaMonitor:
-    """Monitors the Solana blockchain for transactions involving a specific token mint."""
+
+class EndpointStats:
+    """Latency and liveness statistics for one WebSocket endpoint."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.connected = False
+        self.notifications = 0
+        self.first_arrivals = 0
+        self.duplicates = 0
+        self.lag_ewma = 0.0  # secunde în urma celui mai rapid endpoint
+        self.last_message_at: Optional[float] = None
+        self.demoted_until = 0.0
+
+    def record_first_arrival(self) -> None:
+        self.first_arrivals += 1
+        self.lag_ewma *= 0.8
+
+    def record_lag(self, lag: float) -> None:
+        self.duplicates += 1
+        self.lag_ewma = 0.8 * self.lag_ewma + 0.2 * lag
+
+    @property
+    def demoted(self) -> bool:
+        return time.monotonic() < self.demoted_until
+
+    def as_dict(self) -> Dict[str, Any]:
+        idle = time.monotonic() - self.last_message_at if self.last_message_at else None
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "demoted": self.demoted,
+            "notifications": self.notifications,
+            "first_arrivals": self.first_arrivals,
+            "duplicates": self.duplicates,
+            "lag_ewma": round(self.lag_ewma, 4),
+            "idle_seconds": round(idle, 1) if idle is not None else None,
+        }
+
+
+class _Subscription:
+    """A subscription the monitor keeps alive on every endpoint."""
 
     def __init__(
-        self, 
-        ws_url: str, 
-        token_mint_address: str, 
-        transaction_callback: Callable[[Dict[str, Any]], Awaitable[None]]
+        self,
+        key: str,
+        method: str,
+        params: List[Any],
+        callback: Callable[[Dict[str, Any]], Awaitable[None]]
     ):
-        self.ws_url = ws_url
-        self.token_mint_address = token_mint_address
-        self.transaction_callback = transaction_callback
-        self.subscription_id: Optional[int] = None
+        self.key = key
+        self.method = method
+        self.params = params
+        self.callback = callback
+
+    @property
+    def unsubscribe_method(self) -> str:
+        return self.method.replace("Subscribe", "Unsubscribe")
+
+
+class _Endpoint:
+    """One WebSocket connection carrying all subscriptions, with its own reconnect loop."""
+
+    def __init__(self, monitor: "SolanaMonitor", url: str, request_timeout: float = 10.0):
+        self.monitor = monitor
+        self.url = url
+        self.request_timeout = request_timeout
+        self.stats = EndpointStats(url)
         self.websocket = None
+        self._attempt = 0
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        # Cheia locală a abonamentului <-> ID-ul primit de la server pe această conexiune
+        self._remote_ids: Dict[str, int] = {}
+        self._keys_by_remote: Dict[int, str] = {}
+        self._lock = asyncio.Lock()
 
-    async def start(self) -> None:
-        """Starts the WebSocket connection and subscribes to logs."""
-        while True:
+    def _next_backoff(self) -> float:
+        """Exponential backoff with jitter: 0.25-0.5s, 0.5-1s, 1-2s, ... up to backoff_max."""
+        delay = min(self.monitor.backoff_max, self.monitor.backoff_base * (2 ** self._attempt))
+        self._attempt += 1
+        return delay * random.uniform(0.5, 1.0)
+
+    async def run(self) -> None:
+        monitor = self.monitor
+        while monitor._running:
+            if self.stats.demoted:
+                await asyncio.sleep(self.stats.demoted_until - time.monotonic())
+                self.stats.lag_ewma = 0.0
+                continue
             try:
-                logger.info(f"Connecting to Solana WebSocket at {self.ws_url}...")
-                async with connect(self.ws_url) as websocket:
+                logger.info(f"Connecting to Solana WebSocket at {self.url}...")
+                async with connect(self.url) as websocket:
                     self.websocket = websocket
-                    await self._subscribe()
-                    await self._listen()
-            except (ConnectionClosed, ConnectionRefusedError, asyncio.TimeoutError) as e:
-                logger.error(f"WebSocket connection error: {e}. Reconnecting in 10 seconds...")
-                await asyncio.sleep(10)
+                    reader = asyncio.create_task(self._listen())
+                    try:
+                        await self._restore_subscriptions()
+                        self._attempt = 0
+                        self.stats.connected = True
+                        monitor._on_endpoint_connected(self)
+                        await reader
+                    finally:
+                        reader.cancel()
+                        await asyncio.gather(reader, return_exceptions=True)
+            except (ConnectionClosed, ConnectionRefusedError, OSError, asyncio.TimeoutError) as e:
+                if not monitor._running:
+                    break
+                delay = self._next_backoff()
+                logger.error(f"WebSocket connection error on {self.url}: {e}. Reconnecting in {delay:.2f} seconds...")
+                await asyncio.sleep(delay)
             except Exception as e:
-                logger.error(f"An unexpected error occurred in Solana monitor: {e}. Restarting...")
-                await asyncio.sleep(10)
-
-    async def _subscribe(self) -> None:
-        """Subscribes to logs mentioning the token mint address."""
-        subscribe_message = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "logsSubscribe",
-            "params": [
-                {"mentions": [self.token_mint_address]},
-                {"commitment": "confirmed"}
-            ]
-        }
-        await self.websocket.send(json.dumps(subscribe_message))
-        response_str = await self.websocket.recv()
-        response_data = json.loads(response_str)
-        
-        if 'error' in response_data:
-            err_msg = response_data['error']['message']
-            logger.error(f"Failed to subscribe to Solana logs: {err_msg}")
-            raise ConnectionAbortedError(f"Subscription failed: {err_msg}")
-
-        self.subscription_id = response_data.get('result')
-        logger.info(f"Successfully subscribed to Solana logs for mint {self.token_mint_address}. Sub ID: {self.subscription_id}")
+                if not monitor._running:
+                    break
+                delay = self._next_backoff()
+                logger.error(f"An unexpected error occurred in Solana monitor ({self.url}): {e}. Restarting in {delay:.2f} seconds...")
+                await asyncio.sleep(delay)
+            else:
+                if monitor._running and not self.stats.demoted:
+                    await asyncio.sleep(self._next_backoff())
+            finally:
+                self.websocket = None
+                self._reset_connection_state()
+                if self.stats.connected:
+                    self.stats.connected = False
+                    monitor._on_endpoint_disconnected(self)
+
+    def _reset_connection_state(self) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionAbortedError(f"Connection to {self.url} lost"))
+        self._pending.clear()
+        self._remote_ids.clear()
+        self._keys_by_remote.clear()
+
+    async def _request(self, method: str, params: List[Any]) -> Any:
+        """Sends a JSON-RPC request and waits for the response with the same id."""
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.websocket.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+            return await asyncio.wait_for(future, self.request_timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _restore_subscriptions(self) -> None:
+        """(Re)creates every registered subscription on a fresh connection."""
+        subscriptions = list(self.monitor._subscriptions.values())
+        results = await asyncio.gather(*(self.subscribe(sub) for sub in subscriptions), return_exceptions=True)
+        failed = [sub.key for sub, result in zip(subscriptions, results) if isinstance(result, Exception)]
+        if subscriptions and len(failed) == len(subscriptions):
+            raise ConnectionAbortedError(f"All subscriptions failed on {self.url}")
+        if failed:
+            logger.error(f"Failed to restore subscriptions {failed} on {self.url}")
+
+    async def subscribe(self, sub: _Subscription) -> None:
+        async with self._lock:
+            if sub.key in self._remote_ids or not self.websocket:
+                return
+            try:
+                remote_id = await self._request(sub.method, sub.params)
+            except ConnectionAbortedError as e:
+                logger.error(f"Failed to subscribe '{sub.key}' on {self.url}: {e}")
+                raise
+            self._remote_ids[sub.key] = remote_id
+            self._keys_by_remote[remote_id] = sub.key
+        logger.info(f"Successfully subscribed '{sub.key}' ({sub.method}) on {self.url}. Sub ID: {remote_id}")
+
+    async def unsubscribe(self, sub: _Subscription, wait: bool = True) -> None:
+        async with self._lock:
+            remote_id = self._remote_ids.pop(sub.key, None)
+            if remote_id is None or not self.websocket:
+                return
+            self._keys_by_remote.pop(remote_id, None)
+            try:
+                if wait:
+                    await self._request(sub.unsubscribe_method, [remote_id])
+                else:
+                    await self.websocket.send(json.dumps({
+                        "jsonrpc": "2.0", "id": next(self._request_ids),
+                        "method": sub.unsubscribe_method, "params": [remote_id]
+                    }))
+                logger.info(f"Unsubscribed '{sub.key}' on {self.url} (Sub ID: {remote_id}).")
+            except Exception as e:
+                logger.error(f"Error unsubscribing '{sub.key}' on {self.url}: {e}")
 
     async def _listen(self) -> None:
-        """Listens for incoming messages and processes them."""
+        """Reads every frame: responses resolve pending requests, notifications are dispatched."""
         while True:
             try:
                 message = await self.websocket.recv()
-                notification = json.loads(message)
-                if notification.get('method') == 'logsNotification':
-                    await self._process_log_notification(notification['params']['result'])
             except ConnectionClosed:
-                logger.warning("WebSocket connection closed during listen. Will reconnect.")
+                if self.stats.demoted:
+                    logger.info(f"Closed demoted endpoint {self.url}.")
+                else:
+                    logger.warning(f"WebSocket connection to {self.url} closed during listen. Will reconnect.")
                 break # Exit listen loop to trigger reconnection
 
-    async def _process_log_notification(self, log_result: Dict[str, Any]) -> None:
-        """Processes a log notification to check for transfers and triggers the callback."""
-        logs = log_result.get('value', {}).get('logs', [])
+            self.stats.last_message_at = time.monotonic()
+            data = json.loads(message)
+            if 'id' in data and data['id'] in self._pending:
+                future = self._pending[data['id']]
+                if future.done():
+                    continue
+                if 'error' in data:
+                    future.set_exception(ConnectionAbortedError(f"Request failed: {data['error'].get('message')}"))
+                else:
+                    future.set_result(data.get('result'))
+                continue
+
+            params = data.get('params') or {}
+            key = self._keys_by_remote.get(params.get('subscription'))
+            if key is None or not str(data.get('method', '')).endswith('Notification'):
+                continue
+            self.stats.notifications += 1
+            await self.monitor._on_notification(self, key, params.get('result') or {})
+
+    async def close(self, unsubscribe: bool = False) -> None:
+        if not self.websocket:
+            return
+        if unsubscribe:
+            for sub in list(self.monitor._subscriptions.values()):
+                await self.unsubscribe(sub, wait=False)
+        await self.websocket.close()
+
+
+class SolanaMonitor:
+    """Monitors the Solana blockchain for transactions involving a specific token mint.
+
+    Holds the subscriptions on every configured endpoint at once: the first arrival of
+    each notification is processed, later duplicates only feed the latency statistics.
+    Extra subscriptions (LP pool, treasury wallet, other tokens) share the same sockets.
+    """
+
+    MINT_SUBSCRIPTION = "mint"
+
+    def __init__(
+        self, 
+        ws_urls: Union[str, Sequence[str]],
+        token_mint_address: str, 
+        transaction_callback: Callable[[TransferEvent], Awaitable[None]],
+        rpc_url: Optional[str] = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        backfill_limit: int = 1000,
+        backfill_batch_size: int = 20,
+        demote_lag: float = 2.0,
+        demote_cooldown: float = 300.0,
+        dedup_capacity: int = 10000,
+        classifier_workers: int = 4,
+        classifier_batch_size: int = 20
+    ):
+        if isinstance(ws_urls, str):
+            ws_urls = [ws_urls]
+        self.token_mint_address = token_mint_address
+        self.transaction_callback = transaction_callback
+        self.endpoints = [_Endpoint(self, url) for url in dict.fromkeys(ws_urls)]
+
+        self.rpc = SolanaRPC(rpc_url) if rpc_url else None
+        self.classifier = TransactionClassifier(
+            self.rpc, token_mint_address,
+            workers=classifier_workers,
+            batch_size=classifier_batch_size,
+            cache_capacity=dedup_capacity
+        ) if self.rpc else None
+
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.backfill_limit = backfill_limit
+        self.backfill_batch_size = backfill_batch_size
+        self.demote_lag = demote_lag
+        self.demote_cooldown = demote_cooldown
+
+        # Momentul primei sosiri pentru fiecare semnătură, folosit la deduplicare și latență
+        self._first_seen = SignatureCache(dedup_capacity)
+
+        # Ultima tranzacție procesată, folosită pentru a recupera golurile după reconectare
+        self.last_signature: Optional[str] = None
+        self.last_slot: Optional[int] = None
+        self._running = False
+        self._backfill_task: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending: set = set()
+
+        self._subscriptions: Dict[str, _Subscription] = {}
+        self._subscription_ids = itertools.count(1)
+        self._register(_Subscription(
+            self.MINT_SUBSCRIPTION, "logsSubscribe", self._logs_params(token_mint_address), self._process_log_notification
+        ))
+
+    @staticmethod
+    def _logs_params(address: str) -> List[Any]:
+        return [{"mentions": [address]}, {"commitment": "confirmed"}]
+
+    def _register(self, sub: _Subscription) -> None:
+        self._subscriptions[sub.key] = sub
+
+    async def add_subscription(
+        self,
+        method: str,
+        params: List[Any],
+        callback: Callable[[Dict[str, Any]], Awaitable[None]],
+        key: Optional[str] = None
+    ) -> str:
+        """Adaugă un abonament nou pe toate conexiunile active și îl returnează prin cheia sa.
+
+        The subscription is restored automatically after every reconnect.
+        """
+        key = key or f"{method}-{next(self._subscription_ids)}"
+        if key in self._subscriptions:
+            raise ValueError(f"Subscription '{key}' already exists")
+        sub = _Subscription(key, method, params, callback)
+        self._register(sub)
+        connected = [endpoint for endpoint in self.endpoints if endpoint.stats.connected]
+        await asyncio.gather(*(endpoint.subscribe(sub) for endpoint in connected), return_exceptions=True)
+        return key
+
+    async def watch_logs(
+        self,
+        address: str,
+        callback: Callable[[Dict[str, Any]], Awaitable[None]],
+        key: Optional[str] = None
+    ) -> str:
+        """Shortcut for a logsSubscribe on another address (pool, wallet, token)."""
+        return await self.add_subscription("logsSubscribe", self._logs_params(address), callback, key)
+
+    async def remove_subscription(self, key: str) -> bool:
+        """Șterge un abonament de pe toate conexiunile. Abonamentul principal nu poate fi șters."""
+        if key == self.MINT_SUBSCRIPTION:
+            raise ValueError("The mint subscription cannot be removed")
+        sub = self._subscriptions.pop(key, None)
+        if not sub:
+            return False
+        await asyncio.gather(*(endpoint.unsubscribe(sub) for endpoint in self.endpoints), return_exceptions=True)
+        return True
+
+    def subscriptions(self) -> List[str]:
+        return list(self._subscriptions)
+
+    def endpoint_stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats.as_dict() for endpoint in self.endpoints]
+
+    async def start(self) -> None:
+        """Starts one connection per endpoint and runs until stopped."""
+        self._running = True
+        self._tasks = [asyncio.create_task(endpoint.run()) for endpoint in self.endpoints]
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self._cancel_backfill()
+
+    def _connected_count(self) -> int:
+        return sum(1 for endpoint in self.endpoints if endpoint.stats.connected)
+
+    def _on_endpoint_connected(self, endpoint: _Endpoint) -> None:
+        # Golul există doar dacă niciun alt endpoint nu a rămas conectat între timp
+        if self._connected_count() == 1 and self.last_signature and self.rpc:
+            if not self._backfill_task or self._backfill_task.done():
+                self._backfill_task = asyncio.create_task(self._backfill(self.last_signature))
+
+    def _on_endpoint_disconnected(self, endpoint: _Endpoint) -> None:
+        if self._running and self._connected_count() == 0:
+            logger.warning("All Solana endpoints are disconnected; missed transactions will be backfilled.")
+
+    @staticmethod
+    def _dedup_id(key: str, result: Dict[str, Any]) -> Optional[str]:
+        """Identifies a notification across endpoints: by signature, otherwise by slot."""
+        value = result.get('value')
+        signature = value.get('signature') if isinstance(value, dict) else None
+        if signature:
+            return f"{key}:{signature}"
+        slot = result.get('context', {}).get('slot')
+        return f"{key}@{slot}" if slot is not None else None
+
+    async def _on_notification(self, endpoint: _Endpoint, key: str, result: Dict[str, Any]) -> None:
+        """Accepts the first arrival of a notification and records lag for later ones."""
+        sub = self._subscriptions.get(key)
+        if not sub:
+            return
+        dedup_id = self._dedup_id(key, result)
+        now = time.monotonic()
+        if dedup_id and self._first_seen.seen(dedup_id, now):
+            endpoint.stats.record_lag(now - self._first_seen.get(dedup_id))
+            await self._maybe_demote(endpoint)
+            return
+        endpoint.stats.record_first_arrival()
+        try:
+            with timer("solana", subscription=key):
+                await sub.callback(result)
+        except Exception as e:
+            logger.error(f"Error in callback for subscription '{key}': {e}")
+
+    async def _maybe_demote(self, endpoint: _Endpoint) -> None:
+        """Disconnects an endpoint that keeps lagging, as long as another one is healthy."""
+        if endpoint.stats.lag_ewma < self.demote_lag:
+            return
+        healthy = [
+            other for other in self.endpoints
+            if other is not endpoint and other.stats.connected and other.stats.lag_ewma < self.demote_lag
+        ]
+        if not healthy:
+            return
+        logger.warning(
+            f"Demoting Solana endpoint {endpoint.url} (lag {endpoint.stats.lag_ewma:.2f}s) "
+            f"for {self.demote_cooldown:.0f} seconds."
+        )
+        endpoint.stats.demoted_until = time.monotonic() + self.demote_cooldown
+        await endpoint.close(unsubscribe=True)
+
+    async def _backfill(self, until_signature: str) -> None:
+        """Recuperează tranzacțiile pierdute de la `until_signature` până la reconectare."""
+        try:
+            signatures = await self._fetch_missed_signatures(until_signature)
+            if not signatures:
+                return
+            logger.info(f"Backfilling {len(signatures)} transaction(s) missed while disconnected.")
+            for i in range(0, len(signatures), self.backfill_batch_size):
+                chunk = [
+                    sig for sig in signatures[i:i + self.backfill_batch_size]
+                    if f"{self.MINT_SUBSCRIPTION}:{sig}" not in self._first_seen
+                ]
+                transactions = await self.rpc.batch([
+                    ("getTransaction", [sig, {"encoding": "json", "commitment": "confirmed", "maxSupportedTransactionVersion": 0}])
+                    for sig in chunk
+                ])
+                for sig, tx in zip(chunk, transactions):
+                    if not tx:
+                        logger.warning(f"Could not fetch missed transaction {sig}")
+                        continue
+                    if self._first_seen.seen(f"{self.MINT_SUBSCRIPTION}:{sig}", time.monotonic()):
+                        continue
+                    meta = tx.get('meta') or {}
+                    # Tranzacția e deja descărcată: o clasificăm direct în cache, fără alt getTransaction
+                    self.classifier.cache.seen(sig, classify_transaction(sig, tx, self.token_mint_address))
+                    await self._process_log_notification({
+                        "context": {"slot": tx.get('slot')},
+                        "value": {"signature": sig, "err": meta.get('err'), "logs": meta.get('logMessages') or []}
+                    })
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Backfill after reconnect failed: {e}")
+
+    async def _fetch_missed_signatures(self, until_signature: str) -> List[str]:
+        """Pages through getSignaturesForAddress and returns successful signatures, oldest first."""
+        signatures: List[str] = []
+        before = None
+        while len(signatures) < self.backfill_limit:
+            options = {"until": until_signature, "limit": min(1000, self.backfill_limit - len(signatures)), "commitment": "confirmed"}
+            if before:
+                options["before"] = before
+            page = await self.rpc.call("getSignaturesForAddress", [self.token_mint_address, options])
+            if not page:
+                break
+            signatures.extend(item['signature'] for item in page if item.get('err') is None)
+            if len(page) < options["limit"]:
+                break
+            before = page[-1]['signature']
+        signatures.reverse()
+        return signatures
+
+    async def _cancel_backfill(self) -> None:
+        if self._backfill_task and not self._backfill_task.done():
+            self._backfill_task.cancel()
+            await asyncio.gather(self._backfill_task, return_exceptions=True)
+        self._backfill_task = None
+
+    def _track_position(self, log_result: Dict[str, Any]) -> None:
+        """Remembers the newest processed signature and slot."""
+        slot = log_result.get('context', {}).get('slot')
         signature = log_result.get('value', {}).get('signature')
+        if signature and (self.last_slot is None or slot is None or slot >= self.last_slot):
+            self.last_signature = signature
+            self.last_slot = slot if slot is not None else self.last_slot
+
+    async def _process_log_notification(self, log_result: Dict[str, Any]) -> None:
+        """Pre-filters a log notification and hands candidate transfers to the classifier."""
+        value = log_result.get('value', {})
+        logs = value.get('logs', [])
+        signature = value.get('signature')
+        self._track_position(log_result)
+
+        if value.get('err') is not None or not signature or not is_candidate(logs):
+            return
+        if not self.classifier:
+            logger.warning(f"No RPC endpoint configured; cannot classify transaction {signature}.")
+            return
 
-        is_transfer = any("Instruction: Transfer" in log for log in logs)
-        
-        if is_transfer:
-            logger.info(f"Confirmed token transfer involving {self.token_mint_address}. Signature: {signature}")
-            await self.transaction_callback(log_result)
+        # Clasificarea rulează separat ca să nu blocheze citirea notificărilor
+        task = asyncio.create_task(self._classify_and_dispatch(signature))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _classify_and_dispatch(self, signature: str) -> None:
+        try:
+            with timer("dependency", dependency="solana_rpc", op="classify"):
+                event = await self.classifier.classify(signature)
+            if event is None:
+                logger.warning(f"Could not resolve transaction {signature} for classification.")
+                return
+            logger.info(f"Classified {self.token_mint_address} {event.kind} of {event.amount} tokens. Signature: {signature}")
+            await self.transaction_callback(event)
+        except Exception as e:
+            logger.error(f"Error handling transaction {signature}: {e}")
 
     async def stop(self) -> None:
-        """Stops the monitor and unsubscribes from the logs."""
-        if self.websocket and self.subscription_id is not None:
-            try:
-                unsubscribe_message = {
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "logsUnsubscribe",
-                    "params": [self.subscription_id]
-                }
-                await self.websocket.send(json.dumps(unsubscribe_message))
-                logger.info(f"Unsubscribed from Solana logs (Sub ID: {self.subscription_id}).")
-            except Exception as e:
-                logger.error(f"Error unsubscribing from Solana logs: {e}")
-            finally:
-                await self.websocket.close()
-                self.websocket = None
-                self.subscription_id = None
\ No newline at end of file
+        """Stops the monitor and unsubscribes from the logs on every endpoint."""
+        self._running = False
+        await self._cancel_backfill()
+        for endpoint in self.endpoints:
+            await endpoint.close(unsubscribe=True)
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for task in list(self._pending):
+            task.cancel()
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        if self.classifier:
+            await self.classifier.close()
+        if self.rpc:
+            await self.rpc.close()
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Deque, Optional
+
+from .config import logger
+
+
+class SignatureCache:
+    """LRU set of recently seen transaction signatures."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    def __contains__(self, signature: str) -> bool:
+        return signature in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, signature: str) -> Optional[Any]:
+        """Returns the value stored with a seen signature, if any."""
+        return self._entries.get(signature)
+
+    def seen(self, signature: str, value: Any = None) -> bool:
+        """Returns True if the signature was already seen, otherwise remembers it with `value`."""
+        if signature in self._entries:
+            self._entries.move_to_end(signature)
+            return True
+        self._entries[signature] = value
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return False
+
+
+class CelebrationAggregator:
+    """Colectează cumpărăturile pe fiecare chat și trimite o singură celebrare pe fereastră."""
+
+    def __init__(
+        self,
+        emit: Callable[[int, int], Awaitable[None]],
+        window: float,
+        max_per_minute: int,
+        seen_capacity: int,
+    ):
+        self.emit = emit
+        self.window = window
+        self.max_per_minute = max_per_minute
+        self.seen = SignatureCache(seen_capacity)
+        self._pending: Dict[int, int] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._sent: Dict[int, Deque[float]] = {}
+
+    def add_buy(self, chat_id: int, signature: str | None) -> bool:
+        """Înregistrează o cumpărătură. Returnează False pentru semnături deja procesate."""
+        if signature and self.seen.seen(signature):
+            logger.debug(f"Duplicate signature ignored: {signature}")
+            return False
+
+        self._pending[chat_id] = self._pending.get(chat_id, 0) + 1
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._flush_after_window(chat_id))
+        return True
+
+    def _delay_for_rate_limit(self, chat_id: int) -> float:
+        """Seconds to wait so that the chat stays under max_per_minute celebrations."""
+        sent = self._sent.setdefault(chat_id, deque())
+        now = time.monotonic()
+        while sent and now - sent[0] >= 60:
+            sent.popleft()
+        if len(sent) < self.max_per_minute:
+            return 0.0
+        return 60 - (now - sent[0])
+
+    async def _flush_after_window(self, chat_id: int) -> None:
+        try:
+            await asyncio.sleep(self.window)
+            delay = self._delay_for_rate_limit(chat_id)
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self._delay_for_rate_limit(chat_id)
+        finally:
+            self._tasks.pop(chat_id, None)
+        await self._emit_pending(chat_id)
+
+    async def _emit_pending(self, chat_id: int) -> None:
+        count = self._pending.pop(chat_id, 0)
+        if not count:
+            return
+        self._sent.setdefault(chat_id, deque()).append(time.monotonic())
+        try:
+            await self.emit(chat_id, count)
+        except Exception as e:
+            logger.error(f"Error emitting aggregated celebration for chat {chat_id}: {e}")
+
+    async def close(self) -> None:
+        """Anulează ferestrele în curs și trimite imediat ce a rămas de trimis."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for chat_id in list(self._pending):
+            await self._emit_pending(chat_id)
@@ -0,0 +1,175 @@
+import asyncio
+import struct
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from telegram.error import BadRequest
+
+from .config import logger
+from .metrics import registry
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Paleta graficului: fundal, grilă, linie în creștere/scădere, zona de sub linie
+BACKGROUND, GRID, LINE, FILL = 0, 1, 2, 3
+PALETTE_UP = ((23, 33, 43), (43, 57, 69), (46, 204, 113), (30, 77, 58))
+PALETTE_DOWN = ((23, 33, 43), (43, 57, 69), (231, 76, 60), (84, 45, 48))
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(width: int, height: int, pixels: bytes, palette: Sequence[Tuple[int, int, int]]) -> bytes:
+    """PNG cu paletă (8 biți per pixel) din indici de culoare, rând cu rând; doar zlib și struct."""
+    if len(pixels) != width * height:
+        raise ValueError("pixel buffer does not match the image size")
+    # Fiecare rând începe cu tipul de filtru (0 = fără filtru)
+    raw = b"".join(b"\x00" + pixels[row * width:(row + 1) * width] for row in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+    return b"".join((
+        _PNG_SIGNATURE,
+        _chunk(b"IHDR", header),
+        _chunk(b"PLTE", b"".join(bytes(color) for color in palette)),
+        _chunk(b"IDAT", zlib.compress(raw, 9)),
+        _chunk(b"IEND", b""),
+    ))
+
+
+def render_price_chart(timestamps: Sequence[float], prices: Sequence[float],
+                       width: int = 480, height: int = 240, margin: int = 10) -> Optional[bytes]:
+    """Grafic liniar mic (PNG) al prețurilor; None dacă sunt mai puțin de două puncte.
+
+    Green when the last price is above the first, red otherwise; four horizontal grid
+    lines, the area under the line filled. No text: the numbers go in the caption.
+    """
+    if len(prices) < 2 or len(timestamps) != len(prices):
+        return None
+    pixels = bytearray(width * height)
+    plot_w, plot_h = width - 2 * margin, height - 2 * margin
+    for step in range(5):
+        y = margin + round(step * (plot_h - 1) / 4)
+        pixels[y * width + margin:y * width + margin + plot_w] = bytes((GRID,)) * plot_w
+
+    t0, t1 = timestamps[0], timestamps[-1]
+    low, high = min(prices), max(prices)
+    pad = (high - low) * 0.05 or abs(high) * 0.01 or 1.0
+    low, high = low - pad, high + pad
+    x_scale = (plot_w - 1) / ((t1 - t0) or 1.0)
+    y_scale = (plot_h - 1) / (high - low)
+    points = [(margin + round((t - t0) * x_scale), margin + round((high - p) * y_scale))
+              for t, p in zip(timestamps, prices)]
+
+    # Bresenham între puncte consecutive; top[x] = cel mai de sus pixel al liniei pe coloană
+    top = [height] * width
+    line = []
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+        error = dx + dy
+        while True:
+            line.append((x0, y0))
+            if y0 < top[x0]:
+                top[x0] = y0
+            if x0 == x1 and y0 == y1:
+                break
+            doubled = 2 * error
+            if doubled >= dy:
+                error += dy
+                x0 += sx
+            if doubled <= dx:
+                error += dx
+                y0 += sy
+
+    bottom = margin + plot_h
+    for x in range(margin, margin + plot_w):
+        for y in range(top[x] + 1, bottom):
+            pixels[y * width + x] = FILL
+    for x, y in line:
+        pixels[y * width + x] = LINE
+        if y + 1 < bottom:
+            pixels[(y + 1) * width + x] = LINE  # linie groasă de 2 pixeli
+
+    palette = PALETTE_UP if prices[-1] >= prices[0] else PALETTE_DOWN
+    return encode_png(width, height, bytes(pixels), palette)
+
+
+class ChartCard:
+    """Un răspuns /coin gata de trimis: textul, PNG-ul și, după prima trimitere, file_id-ul Telegram."""
+
+    __slots__ = ("caption", "png", "file_id", "upload_lock")
+
+    def __init__(self, caption: str, png: Optional[bytes] = None):
+        self.caption = caption
+        self.png = png
+        self.file_id: Optional[str] = None
+        self.upload_lock = asyncio.Lock()
+
+
+class ChartCache:
+    """Cardurile /coin, pe (simbol, interval de `bucket_seconds`).
+
+    `build` (symbol -> ChartCard or None) runs once per symbol and bucket; concurrent
+    requests share it. The first send uploads the PNG and keeps the file_id Telegram
+    returns, so later sends in the same bucket cost neither rendering nor an upload.
+    Failed builds (None or an exception) are not cached; callers sharing a failed build
+    get its exception.
+    """
+
+    def __init__(self, build: Callable[[str], Awaitable[Optional[ChartCard]]], bucket_seconds: float = 300.0):
+        self.build = build
+        self.bucket_seconds = bucket_seconds
+        self._cache: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    def bucket(self, now: Optional[float] = None) -> int:
+        return int((time.time() if now is None else now) // self.bucket_seconds)
+
+    async def card(self, symbol: str, bucket: Optional[int] = None) -> Optional[ChartCard]:
+        symbol = symbol.upper()
+        bucket = self.bucket() if bucket is None else bucket
+        key = (symbol, bucket)
+        future = self._cache.get(key)
+        if future is not None:
+            registry.inc("flowsy_coin_chart_total", result="cached")
+            return await future
+        # Intervalul s-a schimbat: cardurile vechi nu mai sunt necesare
+        for old in [k for k in self._cache if k[1] != bucket]:
+            del self._cache[old]
+        future = asyncio.get_running_loop().create_future()
+        self._cache[key] = future
+        try:
+            card = await self.build(symbol)
+        except BaseException as e:
+            self._cache.pop(key, None)
+            # Cei care așteaptă același card primesc o eroare obișnuită, nu CancelledError
+            if isinstance(e, asyncio.CancelledError):
+                e = RuntimeError(f"building the {symbol} chart was cancelled")
+            future.set_exception(e)
+            future.exception()  # marcată ca preluată, chiar dacă nu așteaptă nimeni
+            raise
+        if card is None:
+            self._cache.pop(key, None)
+        registry.inc("flowsy_coin_chart_total", result="built" if card else "failed")
+        future.set_result(card)
+        return card
+
+    async def send(self, bot, chat_id: int, card: ChartCard, **kwargs):
+        """Trimite cardul: cu file_id dacă îl avem, altfel încarcă PNG-ul o singură dată."""
+        if card.png is None:
+            return await bot.send_message(chat_id, card.caption, **kwargs)
+        if card.file_id is None:
+            async with card.upload_lock:
+                if card.file_id is None:
+                    message = await bot.send_photo(chat_id, card.png, caption=card.caption, **kwargs)
+                    registry.inc("flowsy_coin_chart_uploads_total")
+                    if message and message.photo:
+                        card.file_id = message.photo[-1].file_id
+                    return message
+        try:
+            return await bot.send_photo(chat_id, card.file_id, caption=card.caption, **kwargs)
+        except BadRequest as e:
+            # file_id-ul poate expira; încărcăm din nou imaginea
+            logger.warning(f"Sending cached chart by file_id failed: {e}. Uploading again.")
+            card.file_id = None
+            return await bot.send_photo(chat_id, card.png, caption=card.caption, **kwargs)
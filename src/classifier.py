@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .celebrations import SignatureCache
+from .solana_rpc import SolanaRPC
+
+logger = logging.getLogger(__name__)
+
+# Instrucțiunile care pot muta tokenul: transferuri SPL și swap-uri prin AMM-uri
+CANDIDATE_LOG_PATTERN = re.compile(r"Instruction: (?:Transfer|TransferChecked|Buy|Sell|Swap)")
+
+# Lamports cheltuiți pe taxe/rent care nu contează ca plată pentru token
+SOL_DUST_LAMPORTS = 1_000_000
+
+
+def is_candidate(logs: Sequence[str]) -> bool:
+    """Fast pre-filter: one precompiled regex scan over all log lines."""
+    return bool(logs) and CANDIDATE_LOG_PATTERN.search("\n".join(logs)) is not None
+
+
+class TransferEvent(NamedTuple):
+    signature: str
+    kind: str  # 'buy', 'sell' sau 'transfer'
+    amount: float
+    owner: Optional[str]
+    slot: Optional[int]
+
+
+def _token_deltas(meta: Dict[str, Any], account_keys: List[str]) -> Dict[Tuple[str, str], float]:
+    """Change in token balance per (owner, mint) between pre and post balances."""
+    deltas: Dict[Tuple[str, str], float] = {}
+    for sign, key in ((-1, 'preTokenBalances'), (1, 'postTokenBalances')):
+        for balance in meta.get(key) or []:
+            owner = balance.get('owner')
+            if owner is None:
+                index = balance.get('accountIndex')
+                owner = account_keys[index] if index is not None and index < len(account_keys) else None
+            amount = (balance.get('uiTokenAmount') or {}).get('uiAmount') or 0.0
+            pair = (owner, balance.get('mint'))
+            deltas[pair] = deltas.get(pair, 0.0) + sign * amount
+    return deltas
+
+
+def classify_transaction(signature: str, tx: Dict[str, Any], mint: str) -> TransferEvent:
+    """Tags a fetched transaction as buy, sell or transfer from the signer's balance changes."""
+    meta = tx.get('meta') or {}
+    message = (tx.get('transaction') or {}).get('message') or {}
+    account_keys = [key if isinstance(key, str) else key.get('pubkey') for key in message.get('accountKeys') or []]
+    account_keys += (meta.get('loadedAddresses') or {}).get('writable', [])
+    account_keys += (meta.get('loadedAddresses') or {}).get('readonly', [])
+    signer = account_keys[0] if account_keys else None
+    slot = tx.get('slot')
+
+    deltas = _token_deltas(meta, account_keys)
+    token_delta = deltas.get((signer, mint), 0.0)
+
+    pre_sol, post_sol = meta.get('preBalances') or [0], meta.get('postBalances') or [0]
+    sol_delta = post_sol[0] - pre_sol[0] + (meta.get('fee') or 0)
+    other_deltas = [delta for (owner, other_mint), delta in deltas.items() if owner == signer and other_mint != mint]
+
+    paid = sol_delta < -SOL_DUST_LAMPORTS or any(delta < 0 for delta in other_deltas)
+    received = sol_delta > SOL_DUST_LAMPORTS or any(delta > 0 for delta in other_deltas)
+
+    if token_delta > 0 and paid:
+        return TransferEvent(signature, 'buy', token_delta, signer, slot)
+    if token_delta < 0 and received:
+        return TransferEvent(signature, 'sell', -token_delta, signer, slot)
+
+    moved = max((abs(delta) for (owner, other_mint), delta in deltas.items() if other_mint == mint), default=0.0)
+    return TransferEvent(signature, 'transfer', moved, signer, slot)
+
+
+class TransactionClassifier:
+    """Rezolvă semnăturile candidate prin apeluri getTransaction grupate, cu un cache pe semnătură.
+
+    A signature whose getTransaction comes back null (the RPC node often lags the
+    websocket node at `confirmed`) or whose batch failed is queued again after
+    `retry_delay`, doubled on each attempt, up to `max_retries` times before the
+    caller gets None.
+    """
+
+    def __init__(
+        self,
+        rpc: SolanaRPC,
+        token_mint_address: str,
+        workers: int = 4,
+        batch_size: int = 20,
+        batch_delay: float = 0.05,
+        cache_capacity: int = 10000,
+        max_retries: int = 3,
+        retry_delay: float = 1.0
+    ):
+        self.rpc = rpc
+        self.token_mint_address = token_mint_address
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.cache = SignatureCache(cache_capacity)
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future, int]]" = asyncio.Queue()
+        self._retry_handles: Set[asyncio.TimerHandle] = set()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def classify(self, signature: str) -> Optional[TransferEvent]:
+        """Returns the classified event, or None if the transaction could not be fetched."""
+        cached = self.cache.get(signature)
+        if cached is not None:
+            return cached
+        if signature in self._inflight:
+            return await asyncio.shield(self._inflight[signature])
+
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[signature] = future
+        await self._queue.put((signature, future, 0))
+        return await asyncio.shield(future)
+
+    def _retry_later(self, signature: str, future: asyncio.Future, attempt: int) -> None:
+        def requeue() -> None:
+            self._retry_handles.discard(handle)
+            if not future.done():
+                self._queue.put_nowait((signature, future, attempt + 1))
+        handle = asyncio.get_running_loop().call_later(self.retry_delay * 2 ** attempt, requeue)
+        self._retry_handles.add(handle)
+
+    async def _next_batch(self) -> List[Tuple[str, asyncio.Future, int]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            signatures = [signature for signature, _, _ in batch]
+            try:
+                transactions = await self.rpc.batch([
+                    ("getTransaction", [sig, {"encoding": "json", "commitment": "confirmed", "maxSupportedTransactionVersion": 0}])
+                    for sig in signatures
+                ])
+            except Exception as e:
+                logger.error(f"Batched getTransaction failed for {len(signatures)} signature(s): {e}")
+                transactions = [None] * len(signatures)
+
+            for (signature, future, attempt), tx in zip(batch, transactions):
+                if not tx and attempt < self.max_retries and not future.done():
+                    # Tranzacția nu e încă vizibilă pe nodul RPC: mai încercăm, cu pauze tot mai lungi
+                    self._retry_later(signature, future, attempt)
+                    continue
+                if not tx:
+                    logger.warning(f"Transaction {signature} still unavailable after {attempt + 1} attempt(s)")
+                self._inflight.pop(signature, None)
+                event = None
+                if tx:
+                    try:
+                        event = classify_transaction(signature, tx, self.token_mint_address)
+                        self.cache.seen(signature, event)
+                    except Exception as e:
+                        logger.error(f"Could not classify transaction {signature}: {e}")
+                if not future.done():
+                    future.set_result(event)
+
+    async def close(self) -> None:
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for future in self._inflight.values():
+            if not future.done():
+                future.set_result(None)
+        self._inflight.clear()
@@ -0,0 +1,154 @@
+import ast
+import asyncio
+import hashlib
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+from .config import logger
+
+GENERATED_COMMANDS_FILE = os.path.join(os.path.dirname(__file__), 'generated_commands.py')
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class GeneratedCommandRegistry:
+    """Ține comenzile generate sincronizate cu fișierul generated_commands.py, fără repornire.
+
+    The module prelude (imports and constants) runs again only when it changes. When any
+    function changes, all functions are re-executed into a fresh copy of the prelude
+    namespace, so none of them keeps calling a stale version of a helper. Handlers are swapped on the running
+    Application in one synchronous step, so in-flight updates keep the old callback and new
+    updates see the new one. If anything fails to compile or run, the previous version stays.
+    """
+
+    def __init__(self, path: str = GENERATED_COMMANDS_FILE):
+        self.path = path
+        self.app: Optional[Application] = None
+        self._mtime: Optional[float] = None
+        self._file_digest: Optional[str] = None
+        self._prelude_digest: Optional[str] = None
+        self._function_digests: Dict[str, str] = {}
+        self._namespace: Dict[str, Any] = {}
+        self._prelude_namespace: Dict[str, Any] = {}
+        self._handlers: Dict[str, CommandHandler] = {}
+        self._lock = asyncio.Lock()
+
+    def attach(self, app: Application) -> None:
+        self.app = app
+
+    @property
+    def commands(self) -> List[str]:
+        return sorted(self._handlers)
+
+    @staticmethod
+    def command_name(function_name: str) -> str:
+        return function_name.replace('_command', '')
+
+    def _new_namespace(self) -> Dict[str, Any]:
+        # Importurile relative din fișierul generat (from .handlers import ...) se rezolvă față de pachetul botului
+        return {'__name__': f"{__package__}.generated_commands", '__package__': __package__, '__file__': self.path}
+
+    def _compile(self, source: str) -> Tuple[Dict[str, Any], Dict[str, str], str, List[str], Dict[str, Any]]:
+        """Builds the new namespace (and the prelude-only one it started from). Raises on any error."""
+        tree = ast.parse(source, filename=self.path)
+        prelude = [node for node in tree.body if not isinstance(node, (ast.AsyncFunctionDef, ast.FunctionDef))]
+        functions = [node for node in tree.body if isinstance(node, (ast.AsyncFunctionDef, ast.FunctionDef))]
+
+        prelude_digest = _digest("\n".join(ast.dump(node) for node in prelude))
+        digests = {node.name: _digest(ast.get_source_segment(source, node) or ast.dump(node)) for node in functions}
+        full_reload = prelude_digest != self._prelude_digest
+
+        if full_reload:
+            prelude_namespace = self._new_namespace()
+            exec(compile(ast.Module(body=prelude, type_ignores=[]), self.path, 'exec'), prelude_namespace)
+            changed = [node.name for node in functions]
+        else:
+            prelude_namespace = self._prelude_namespace
+            changed = [node.name for node in functions if self._function_digests.get(node.name) != digests[node.name]]
+            if not changed and set(digests) == set(self._function_digests):
+                return self._namespace, digests, prelude_digest, changed, prelude_namespace
+
+        # Toate funcțiile, într-o copie nouă a prelude-ului: __globals__ al fiecăreia vede
+        # versiunile curente ale celorlalte (și nu mai vede funcțiile șterse)
+        namespace = dict(prelude_namespace)
+        exec(compile(ast.Module(body=functions, type_ignores=[]), self.path, 'exec'), namespace)
+        return namespace, digests, prelude_digest, changed, prelude_namespace
+
+    def _commands_in(self, namespace: Dict[str, Any], defined: Dict[str, str]) -> Dict[str, Callable]:
+        # Doar funcțiile definite în fișier; send_reply & co. sunt importate, nu comenzi
+        return {
+            self.command_name(name): namespace[name] for name in defined
+            if asyncio.iscoroutinefunction(namespace.get(name)) and not name.startswith("_")
+        }
+
+    async def reload(self, force: bool = False) -> Tuple[bool, str]:
+        """Reîncarcă fișierul dacă s-a schimbat. Returnează (succes, mesaj pentru admin)."""
+        async with self._lock:
+            if not os.path.exists(self.path):
+                return True, "Nu există comenzi generate."
+            try:
+                source = await asyncio.to_thread(self._read)
+            except OSError as e:
+                logger.error(f"Could not read generated commands: {e}")
+                return False, f"Nu am putut citi fișierul de comenzi: {e}"
+
+            file_digest = _digest(source)
+            if not force and file_digest == self._file_digest:
+                return True, "Nicio modificare."
+
+            try:
+                namespace, digests, prelude_digest, changed, prelude_namespace = self._compile(source)
+                new_commands = self._commands_in(namespace, digests)
+                new_handlers = {
+                    name: self._handlers[name] if name in self._handlers and self._handlers[name].callback is func
+                    else CommandHandler(name, func)
+                    for name, func in new_commands.items()
+                }
+            except Exception as e:
+                # Versiunea anterioară rămâne activă
+                logger.error(f"Generated commands failed to load, keeping previous version: {e}")
+                self._file_digest = file_digest  # nu reîncercăm același conținut la fiecare verificare
+                return False, f"Noua versiune nu a putut fi încărcată ({type(e).__name__}: {e}). Rămâne activă versiunea anterioară."
+
+            self._swap(new_handlers)
+            self._namespace = namespace
+            self._prelude_namespace = prelude_namespace
+            self._function_digests = digests
+            self._prelude_digest = prelude_digest
+            self._file_digest = file_digest
+            logger.info(f"Generated commands reloaded; recompiled: {changed or 'none'}; active: {self.commands}")
+            return True, f"Comenzi active: {', '.join('/' + name for name in self.commands) or 'niciuna'}."
+
+    def _swap(self, new_handlers: Dict[str, CommandHandler]) -> None:
+        """Replaces the handlers in one step (no await in between)."""
+        if self.app is None:
+            self._handlers = new_handlers
+            return
+        for name, handler in self._handlers.items():
+            if new_handlers.get(name) is not handler:
+                self.app.remove_handler(handler)
+        for name, handler in new_handlers.items():
+            if self._handlers.get(name) is not handler:
+                self.app.add_handler(handler)
+        self._handlers = new_handlers
+
+    def _read(self) -> str:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    async def check_for_changes(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job: reîncarcă doar când data modificării fișierului s-a schimbat."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self._mtime = mtime
+            await self.reload()
+
+
+command_registry = GeneratedCommandRegistry()
@@ -22,10 +22,99 @@ GROUP_LINK = os.getenv('GROUP_LINK', '')
 # --- APP SETTINGS ---
 LOGO_PATH = os.getenv('LOGO_PATH', 'logo.png')
 DB_FILE = os.getenv('DB_FILE', 'bot_data.db')
+# Utilizatorii și alertele împărțite după user_id în N fișiere SQLite (1 = totul în DB_FILE).
+# Schimbarea pe o bază existentă se face cu botul oprit: python -m src.reshard --shards N
+DB_SHARDS = max(1, int(os.getenv('DB_SHARDS', '1')))
 API_TIMEOUT = float(os.getenv('API_TIMEOUT', '30.0'))
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '32'))  # update-uri procesate simultan (ordinea e păstrată pe chat)
+PERSISTENCE_UPDATE_INTERVAL = float(os.getenv('PERSISTENCE_UPDATE_INTERVAL', '60'))  # secunde între salvările user_data/chat_data
+STATS_FLUSH_INTERVAL = float(os.getenv('STATS_FLUSH_INTERVAL', '10'))  # secunde între scrierile de statistici
+GENERATED_COMMANDS_POLL_INTERVAL = float(os.getenv('GENERATED_COMMANDS_POLL_INTERVAL', '5'))
+
+# --- OUTBOUND MESSAGES ---
+# Toate trimiterile trec printr-o coadă cu priorități (răspunsuri > alerte > celebrări > în masă)
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))  # cereri pe secundă, în total
+OUTBOUND_PRIVATE_INTERVAL = float(os.getenv('OUTBOUND_PRIVATE_INTERVAL', '1'))  # secunde între mesaje în același chat privat
+OUTBOUND_GROUP_PER_MINUTE = float(os.getenv('OUTBOUND_GROUP_PER_MINUTE', '20'))  # mesaje pe minut într-un grup
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))  # reîncercări după RetryAfter
+
+# --- PRICE ALERTS ---
+# Intervalul de interogare scade pe măsură ce prețul se apropie de cea mai apropiată țintă
+PRICE_POLL_MIN_INTERVAL = float(os.getenv('PRICE_POLL_MIN_INTERVAL', '5'))
+PRICE_POLL_MAX_INTERVAL = float(os.getenv('PRICE_POLL_MAX_INTERVAL', '300'))
+PRICE_NEAR_DISTANCE = float(os.getenv('PRICE_NEAR_DISTANCE', '0.005'))  # 0.5% de țintă
+PRICE_FAR_DISTANCE = float(os.getenv('PRICE_FAR_DISTANCE', '0.10'))     # 10% de țintă
+PRICE_FEED_WS_URL = os.getenv('PRICE_FEED_WS_URL', '')  # feed push opțional: {"symbol": "BTC", "price": 65000}
+ALERT_SEND_RATE = float(os.getenv('ALERT_SEND_RATE', '25'))  # notificări pe secundă (limita Telegram e ~30/s)
+ALERT_RETRY_INTERVAL = float(os.getenv('ALERT_RETRY_INTERVAL', '30'))
+ALERT_RETRY_MAX_ATTEMPTS = int(os.getenv('ALERT_RETRY_MAX_ATTEMPTS', '5'))
+
+# Istoricul prețurilor (în memorie, cu snapshot pe disc): capacitate * rezoluție = 24h implicit
+PRICE_HISTORY_CAPACITY = int(os.getenv('PRICE_HISTORY_CAPACITY', '2880'))  # puncte per simbol
+PRICE_HISTORY_RESOLUTION = float(os.getenv('PRICE_HISTORY_RESOLUTION', '30'))  # secunde între puncte
+PRICE_HISTORY_PATH = os.getenv('PRICE_HISTORY_PATH', 'price_history.bin')  # gol = fără snapshot
+PRICE_HISTORY_SNAPSHOT_INTERVAL = float(os.getenv('PRICE_HISTORY_SNAPSHOT_INTERVAL', '300'))
+# /coin SIMBOL: graficul e randat și încărcat o dată per simbol în fiecare interval de atâtea secunde
+COIN_CHART_BUCKET_SECONDS = float(os.getenv('COIN_CHART_BUCKET_SECONDS', '300'))
+
+# --- FLOOD CONTROL ---
+# Mesaje pe minut care ajung la Gemini (token bucket: ritm + rafală)
+FLOOD_USER_PER_MINUTE = float(os.getenv('FLOOD_USER_PER_MINUTE', '6'))
+FLOOD_USER_BURST = float(os.getenv('FLOOD_USER_BURST', '4'))
+FLOOD_CHAT_PER_MINUTE = float(os.getenv('FLOOD_CHAT_PER_MINUTE', '20'))
+FLOOD_CHAT_BURST = float(os.getenv('FLOOD_CHAT_BURST', '10'))
+FLOOD_ADMIN_PER_MINUTE = float(os.getenv('FLOOD_ADMIN_PER_MINUTE', '60'))
+FLOOD_ADMIN_BURST = float(os.getenv('FLOOD_ADMIN_BURST', '30'))
+FLOOD_IDLE_TTL = float(os.getenv('FLOOD_IDLE_TTL', '600'))  # secunde până la eliberarea unui bucket inactiv
+
+# --- MASS JOBS ---
+# Sfatul săptămânal: ziua (0 = luni) și ora locală de start, fereastra de livrare și ritmul maxim
+WEEKLY_TIP_WEEKDAY = int(os.getenv('WEEKLY_TIP_WEEKDAY', '0'))
+WEEKLY_TIP_TIME = os.getenv('WEEKLY_TIP_TIME', '09:00')
+WEEKLY_TIP_WINDOW = float(os.getenv('WEEKLY_TIP_WINDOW', '7200'))  # secunde
+MASS_SEND_RATE = float(os.getenv('MASS_SEND_RATE', '20'))  # mesaje pe secundă
+# Cu fusuri orare, utilizatorii care și-au setat /fus primesc mesajul la ora lor locală
+MASS_JOB_TZ_BUCKETS = os.getenv('MASS_JOB_TZ_BUCKETS', 'false').lower() in ('1', 'true', 'yes')
+DEFAULT_UTC_OFFSET = int(os.getenv('DEFAULT_UTC_OFFSET', '120'))  # minute, pentru utilizatorii fără fus orar cunoscut
+
+# --- EVENT LOG ---
+EVENT_LOG_CAPACITY = int(os.getenv('EVENT_LOG_CAPACITY', '100000'))     # evenimente ținute în memorie între scrieri
+EVENT_LOG_FLUSH_INTERVAL = float(os.getenv('EVENT_LOG_FLUSH_INTERVAL', '5'))
+EVENT_LOG_RAW_DAYS = int(os.getenv('EVENT_LOG_RAW_DAYS', '2'))           # zile păstrate eveniment cu eveniment
+EVENT_LOG_RETENTION_DAYS = int(os.getenv('EVENT_LOG_RETENTION_DAYS', '90'))  # zile păstrate ca agregate pe oră
+
+# --- METRICS ---
+# Endpoint local Prometheus; 0 îl dezactivează
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# --- DIAGNOSTICS ---
+# Proba event loop-ului: la câte secunde măsoară întârzierea; peste prag, stiva blocantă ajunge în log
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.5'))
+LOOP_STALL_THRESHOLD = float(os.getenv('LOOP_STALL_THRESHOLD', '0.25'))
+# /profile <secunde> (doar admin): eșantionare la fiecare PROFILE_SAMPLE_INTERVAL secunde
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.01'))
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '120'))
+
+# --- UPDATE RECORDING ---
+# Cale către un fișier .jsonl.gz; gol = înregistrarea este dezactivată
+RECORD_UPDATES_PATH = os.getenv('RECORD_UPDATES_PATH', '')
+RECORD_SALT = os.getenv('RECORD_SALT', 'flowsy-replay')
 
 # --- SOLANA SETUP ---
 SOLANA_WS_URL = os.getenv('SOLANA_WS_URL', 'wss://api.mainnet-beta.solana.com')
+# Listă separată prin virgulă; monitorul ține abonamente pe toate endpoint-urile simultan
+SOLANA_WS_URLS = [url.strip() for url in os.getenv('SOLANA_WS_URLS', SOLANA_WS_URL).split(',') if url.strip()]
+SOLANA_DEMOTE_LAG = float(os.getenv('SOLANA_DEMOTE_LAG', '2.0'))
+SOLANA_RPC_URL = os.getenv('SOLANA_RPC_URL', 'https://api.mainnet-beta.solana.com')
+SOLANA_BACKFILL_LIMIT = int(os.getenv('SOLANA_BACKFILL_LIMIT', '1000'))
+SOLANA_CLASSIFIER_WORKERS = int(os.getenv('SOLANA_CLASSIFIER_WORKERS', '4'))
+SOLANA_CLASSIFIER_BATCH_SIZE = int(os.getenv('SOLANA_CLASSIFIER_BATCH_SIZE', '20'))
+
+# --- CELEBRATIONS ---
+CELEBRATION_WINDOW = float(os.getenv('CELEBRATION_WINDOW', '15'))
+CELEBRATION_MAX_PER_MINUTE = int(os.getenv('CELEBRATION_MAX_PER_MINUTE', '3'))
+SEEN_SIGNATURES_CAPACITY = int(os.getenv('SEEN_SIGNATURES_CAPACITY', '10000'))
 
 # --- STATIC MESSAGES ---
 WELCOME_MESSAGE = r"*Bun venit la FlowsyAI\!*\n\nSunt asistentul tău virtual, gata să răspund la orice întrebare despre AI sau tehnologie\.\n\nPentru discuții aprofundate și pentru a te conecta cu comunitatea, apasă butonul de mai jos\!"
@@ -58,13 +147,16 @@ HELP_MESSAGE = r'''*Comenzi disponibile:*
 /alerta <simbol> <peste/sub> <preț> \- Setează o alertă de preț\. Exemplu: `/alerta btc peste 50000`
 /alerte \- Vezi alertele active\.
 /stergealerta <ID> \- Șterge o alertă după ID\.
+/fus <decalaj> \- Setează fusul orar pentru mesajele săptămânale\. Exemplu: `/fus +2`
 
 *Sondaje:*
 /sondaj <întrebare> "<opțiune1>" "<opțiune2>" ... \- Creează un sondaj\.
 
 *Comenzi Admin:*
 /addcelebration <categorie> [mesaj] \- Adaugă un media de celebrare \(răspunde la un GIF/sticker\)\. Categorii: `buy`, `price_up`, `milestone`
-/deletecelebration <ID> \- Șterge un media de celebrare\.'''
+/deletecelebration <ID> \- Șterge un media de celebrare\.
+/metrics \- Latențe și erori pentru handlere și servicii externe\.
+/profile <secunde> \- Profilează botul și trimite stivele cele mai frecvente\.'''
 
 # --- GEMINI & PERSONALITY SETUP ---
 SYSTEM_PROMPT = (
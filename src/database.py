@@ -1,23 +1,83 @@
+import asyncio
+import os
 import aiosqlite
-from .config import DB_FILE, logger
+from .config import DB_FILE, DB_SHARDS, logger
+from .metrics import timed_dependency
 
-async def setup_database():
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("""CREATE TABLE IF NOT EXISTS users (
+# --- SHARDING ---
+# Tabelele fierbinți (users, alerts) sunt împărțite după user_id în DB_SHARDS fișiere;
+# restul (statistici, evenimente, joburi, persistență, media) rămâne în DB_FILE.
+# Un ID de alertă codifică și shard-ul: alert_id = id_local * DB_SHARDS + shard.
+
+SHARD_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS users (
             user_id INTEGER PRIMARY KEY, 
             first_name TEXT, 
             last_name TEXT, 
             username TEXT, 
             first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )""")
-        await db.execute("""CREATE TABLE IF NOT EXISTS alerts (
+        )""",
+    """CREATE TABLE IF NOT EXISTS alerts (
             alert_id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
             symbol TEXT NOT NULL,
             target_price REAL NOT NULL,
             direction TEXT NOT NULL, -- 'above' or 'below'
             FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )""")
+        )""",
+    "CREATE INDEX IF NOT EXISTS idx_alerts_user ON alerts(user_id)",
+)
+# Coloane adăugate ulterior; bazele existente sunt migrate pe loc
+USER_COLUMNS = (("language_code", "TEXT"), ("last_seen", "TIMESTAMP"), ("utc_offset", "INTEGER"))
+
+def shard_file(shard: int, shards: int = DB_SHARDS, db_file: str = DB_FILE) -> str:
+    """Fișierul unui shard; cu un singur shard e chiar DB_FILE (fără migrare)."""
+    if shards == 1:
+        return db_file
+    root, ext = os.path.splitext(db_file)
+    return f"{root}.shard{shard}{ext or '.db'}"
+
+def shard_of(user_id: int, shards: int = DB_SHARDS) -> int:
+    return user_id % shards
+
+def _alert_id(local_id: int, shard: int) -> int:
+    return local_id * DB_SHARDS + shard
+
+def _split_alert_id(alert_id: int) -> tuple:
+    """(shard, id local) pentru un ID de alertă public."""
+    return alert_id % DB_SHARDS, alert_id // DB_SHARDS
+
+def _user_db(user_id: int):
+    return aiosqlite.connect(shard_file(shard_of(user_id)))
+
+async def _fan_out(query, *args) -> list:
+    """Rulează `query(db, shard, *args)` pe toate shard-urile în paralel; lista rezultatelor."""
+    async def run(shard: int):
+        async with aiosqlite.connect(shard_file(shard)) as db:
+            return await query(db, shard, *args)
+    return await asyncio.gather(*(run(shard) for shard in range(DB_SHARDS)))
+
+async def setup_shard(db: aiosqlite.Connection) -> None:
+    for statement in SHARD_SCHEMA:
+        await db.execute(statement)
+    cursor = await db.execute("PRAGMA table_info(users)")
+    user_columns = {row[1] for row in await cursor.fetchall()}
+    for column, definition in USER_COLUMNS:
+        if column not in user_columns:
+            await db.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+
+async def _setup_shard(db, shard):
+    await setup_shard(db)
+    await db.commit()
+
+async def _count_users(db, shard):
+    cursor = await db.execute("SELECT COUNT(*) FROM users")
+    return (await cursor.fetchone())[0]
+
+@timed_dependency("sqlite")
+async def setup_database():
+    await _fan_out(_setup_shard)
+    async with aiosqlite.connect(DB_FILE) as db:
         await db.execute("""CREATE TABLE IF NOT EXISTS celebration_media (
             media_id INTEGER PRIMARY KEY AUTOINCREMENT,
             media_type TEXT NOT NULL, -- 'gif', 'sticker', 'animation'
@@ -25,48 +85,353 @@ async def setup_database():
             category TEXT NOT NULL,   -- 'buy', 'price_up', 'milestone'
             message TEXT             -- Optional celebration message
         )""")
+
+        # Statistici materializate: /stats citește doar aceste tabele, niciodată COUNT(*)
+        await db.execute("""CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID""")
+        await db.execute("""CREATE TABLE IF NOT EXISTS stats_daily (
+            day TEXT NOT NULL,        -- 'YYYY-MM-DD', UTC
+            name TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, name)
+        ) WITHOUT ROWID""")
+        await db.execute("""CREATE TABLE IF NOT EXISTS daily_active (
+            day TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (day, user_id)
+        ) WITHOUT ROWID""")
+        await db.execute("""CREATE TABLE IF NOT EXISTS event_rollups (
+            hour TEXT NOT NULL,       -- 'YYYY-MM-DD HH:00', UTC
+            kind TEXT NOT NULL,
+            events INTEGER NOT NULL,
+            users INTEGER NOT NULL,
+            PRIMARY KEY (hour, kind)
+        ) WITHOUT ROWID""")
+        # Starea joburilor de masă (ex. sfatul săptămânal): per perioadă și fus orar, cu cursor
+        await db.execute("""CREATE TABLE IF NOT EXISTS job_runs (
+            job TEXT NOT NULL,
+            period TEXT NOT NULL,     -- ex. '2026-W42'
+            bucket INTEGER NOT NULL,  -- decalaj UTC în minute
+            cursor INTEGER NOT NULL DEFAULT 0,  -- ultimul user_id servit
+            sent INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            PRIMARY KEY (job, period, bucket)
+        ) WITHOUT ROWID""")
+        # Datele PTB (user_data/chat_data/bot_data), câte un rând per cheie
+        await db.execute("""CREATE TABLE IF NOT EXISTS persistence (
+            kind TEXT NOT NULL,       -- 'user', 'chat', 'bot', 'conversation:<nume>'
+            key TEXT NOT NULL,
+            data BLOB NOT NULL,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID""")
+        # Numărătoarea completă: la prima pornire cu tabela de contoare și, cu mai multe shard-uri,
+        # la fiecare pornire (upsert-urile din shard-uri nu sunt în tranzacția contoarelor)
+        cursor = await db.execute("SELECT 1 FROM stats_counters WHERE name = 'users_total'")
+        if await cursor.fetchone() is None or DB_SHARDS > 1:
+            user_counts = await _fan_out(_count_users)
+            await db.execute(
+                "INSERT INTO stats_counters (name, value) VALUES ('users_total', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (sum(user_counts),)
+            )
+        await db.commit()
+    logger.info(f"Database initialized successfully ({DB_SHARDS} shard(s)).")
+
+_INCREMENT_COUNTER = (
+    "INSERT INTO stats_counters (name, value) VALUES (?, ?) "
+    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value"
+)
+_INCREMENT_DAILY = (
+    "INSERT INTO stats_daily (day, name, value) VALUES (?, ?, ?) "
+    "ON CONFLICT(day, name) DO UPDATE SET value = value + excluded.value"
+)
+
+async def _upsert_users(db, shard, users_by_shard, commit=True):
+    """Upsert pe un shard; returnează zilele (last_seen) utilizatorilor nou inserați."""
+    users = users_by_shard.get(shard)
+    if not users:
+        return []
+    new_days = []
+    for user_id, first_name, last_name, username, language_code, last_seen in users:
+        cursor = await db.execute(
+            "INSERT OR IGNORE INTO users (user_id, first_name, last_name, username, language_code, last_seen) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, first_name, last_name, username, language_code, last_seen)
+        )
+        if cursor.rowcount > 0:
+            new_days.append(last_seen[:10])
+    await db.executemany(
+        "UPDATE users SET language_code = COALESCE(?, language_code), last_seen = ? WHERE user_id = ?",
+        [(language_code, last_seen, user_id) for user_id, _, _, _, language_code, last_seen in users]
+    )
+    if commit:
         await db.commit()
-    logger.info("Database initialized successfully.")
+    return new_days
+
+@timed_dependency("sqlite")
+async def apply_stats_batch(users: list, active: list, counters: dict, daily: dict) -> None:
+    """Scrie activitatea acumulată de StatsCollector.
 
-async def update_user_in_db(user):
+    `users`: (user_id, first_name, last_name, username, language_code, last_seen);
+    `active`: (day, user_id); `counters`: name -> delta; `daily`: (day, name) -> delta.
+    A shard stored in DB_FILE (DB_SHARDS=1) is upserted in the same transaction as the
+    counters. Other shards commit on their own files first, so a crash in between can
+    lose their new-user deltas; setup_database recounts users_total from the shards.
+    """
+    counters = dict(counters)
+    daily = dict(daily)
+    users_by_shard = {}
+    for row in users:
+        users_by_shard.setdefault(shard_of(row[0]), []).append(row)
+    local = [shard for shard in range(DB_SHARDS) if shard_file(shard) == DB_FILE]
+
+    async def upsert_remote(db, shard):
+        return [] if shard in local else await _upsert_users(db, shard, users_by_shard)
+
+    def count_new(new_days):
+        for day in new_days:
+            counters['users_total'] = counters.get('users_total', 0) + 1
+            daily[(day, 'new_users')] = daily.get((day, 'new_users'), 0) + 1
+
+    for new_days in await _fan_out(upsert_remote):
+        count_new(new_days)
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("INSERT OR IGNORE INTO users (user_id, first_name, last_name, username) VALUES (?, ?, ?, ?)",
-                       (user.id, user.first_name, user.last_name, user.username))
+        for shard in local:
+            count_new(await _upsert_users(db, shard, users_by_shard, commit=False))
+        for day, user_id in active:
+            cursor = await db.execute("INSERT OR IGNORE INTO daily_active (day, user_id) VALUES (?, ?)", (day, user_id))
+            if cursor.rowcount > 0:
+                daily[(day, 'active_users')] = daily.get((day, 'active_users'), 0) + 1
+        await db.executemany(_INCREMENT_COUNTER, [(name, value) for name, value in counters.items() if value])
+        await db.executemany(_INCREMENT_DAILY, [(day, name, value) for (day, name), value in daily.items() if value])
         await db.commit()
 
-async def create_price_alert(user_id: int, symbol: str, target_price: float, direction: str) -> int:
+@timed_dependency("sqlite")
+async def get_stats_snapshot(day: str) -> tuple:
+    """Contoarele totale și cele ale zilei date: (dict total, dict zi). Căutări după cheie primară."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        cursor = await db.execute("SELECT name, value FROM stats_counters")
+        totals = dict(await cursor.fetchall())
+        cursor = await db.execute("SELECT name, value FROM stats_daily WHERE day = ?", (day,))
+        today = dict(await cursor.fetchall())
+    return totals, today
+
+@timed_dependency("sqlite")
+async def load_persisted(kind: str, key: str):
+    """Datele serializate pentru o cheie sau None."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        cursor = await db.execute("SELECT data FROM persistence WHERE kind = ? AND key = ?", (kind, key))
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+@timed_dependency("sqlite")
+async def load_persisted_kind(kind: str) -> list:
+    async with aiosqlite.connect(DB_FILE) as db:
+        cursor = await db.execute("SELECT key, data FROM persistence WHERE kind = ?", (kind,))
+        return await cursor.fetchall()
+
+@timed_dependency("sqlite")
+async def save_persisted(rows: list, deletes: list) -> None:
+    """Scrie (kind, key, data) și șterge (kind, key) într-o singură tranzacție."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        if rows:
+            await db.executemany(
+                "INSERT INTO persistence (kind, key, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(kind, key) DO UPDATE SET data = excluded.data",
+                rows
+            )
+        if deletes:
+            await db.executemany("DELETE FROM persistence WHERE kind = ? AND key = ?", deletes)
+        await db.commit()
+
+@timed_dependency("sqlite")
+async def get_job_run(job: str, period: str, bucket: int):
+    """(cursor, sent, completed_at) sau None dacă rularea nu a început."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        cursor = await db.execute(
+            "SELECT cursor, sent, completed_at FROM job_runs WHERE job = ? AND period = ? AND bucket = ?",
+            (job, period, bucket)
+        )
+        return await cursor.fetchone()
+
+@timed_dependency("sqlite")
+async def save_job_run(job: str, period: str, bucket: int, cursor: int, sent: int, completed: bool = False) -> None:
+    async with aiosqlite.connect(DB_FILE) as db:
+        await db.execute(
+            "INSERT INTO job_runs (job, period, bucket, cursor, sent, completed_at) VALUES (?, ?, ?, ?, ?, CASE WHEN ? THEN CURRENT_TIMESTAMP END) "
+            "ON CONFLICT(job, period, bucket) DO UPDATE SET cursor = excluded.cursor, sent = excluded.sent, completed_at = excluded.completed_at",
+            (job, period, bucket, cursor, sent, completed)
+        )
+        await db.commit()
+
+async def _offset_buckets(db, shard, default_offset):
+    cursor = await db.execute("SELECT DISTINCT COALESCE(utc_offset, ?) FROM users", (default_offset,))
+    return [row[0] for row in await cursor.fetchall()]
+
+@timed_dependency("sqlite")
+async def set_utc_offset(user_id: int, offset_minutes: int) -> bool:
+    """Fusul orar ales de utilizator (/fus); False dacă utilizatorul nu are încă un rând în users."""
+    async with _user_db(user_id) as db:
+        cursor = await db.execute("UPDATE users SET utc_offset = ? WHERE user_id = ?", (offset_minutes, user_id))
+        await db.commit()
+        return cursor.rowcount > 0
+
+@timed_dependency("sqlite")
+async def get_utc_offset_buckets(default_offset: int) -> list:
+    return sorted(set().union(*await _fan_out(_offset_buckets, default_offset)))
+
+def _bucket_filter(bucket, default_offset: int):
+    if bucket is None:
+        return "", ()
+    return " AND COALESCE(utc_offset, ?) = ?", (default_offset, bucket)
+
+async def _count_recipients(db, shard, after_user_id, where, params):
+    cursor = await db.execute(f"SELECT COUNT(*) FROM users WHERE user_id > ?{where}", (after_user_id, *params))
+    return (await cursor.fetchone())[0]
+
+@timed_dependency("sqlite")
+async def count_recipients(after_user_id: int, bucket=None, default_offset: int = 0) -> int:
+    where, params = _bucket_filter(bucket, default_offset)
+    return sum(await _fan_out(_count_recipients, after_user_id, where, params))
+
+async def _recipients(db, shard, after_user_id, where, params, limit):
+    cursor = await db.execute(
+        f"SELECT user_id, language_code, last_seen, first_name, "
+        f"EXISTS(SELECT 1 FROM alerts WHERE alerts.user_id = users.user_id) AS has_alerts "
+        f"FROM users WHERE user_id > ?{where} ORDER BY user_id LIMIT ?",
+        (after_user_id, *params, limit)
+    )
+    return await cursor.fetchall()
+
+@timed_dependency("sqlite")
+async def get_recipients(after_user_id: int, limit: int, bucket=None, default_offset: int = 0) -> list:
+    """Următorii utilizatori după `after_user_id`, în ordinea cheii primare (paginare cu cursor).
+
+    Rows are (user_id, language_code, last_seen, first_name, has_alerts). Each shard
+    returns its next `limit` rows; the merged list is cut back to `limit`.
+    """
+    where, params = _bucket_filter(bucket, default_offset)
+    rows = [row for shard_rows in await _fan_out(_recipients, after_user_id, where, params, limit) for row in shard_rows]
+    rows.sort(key=lambda row: row[0])
+    return rows[:limit]
+
+async def _user_ids(db, shard):
+    cursor = await db.execute("SELECT user_id FROM users")
+    return [row[0] for row in await cursor.fetchall()]
+
+@timed_dependency("sqlite")
+async def get_all_user_ids() -> list:
+    return [user_id for ids in await _fan_out(_user_ids) for user_id in ids]
+
+def _events_table(day: str) -> str:
+    # Numele tabelei vine dintr-o dată formatată de noi; verificarea împiedică orice injecție
+    if len(day) != 8 or not day.isdigit():
+        raise ValueError(f"Invalid event day: {day!r}")
+    return f"events_{day}"
+
+@timed_dependency("sqlite")
+async def insert_events(by_day: dict) -> None:
+    """Inserează evenimentele (ts, kind, user_id, chat_id, detail) în tabelele zilelor lor."""
+    async with aiosqlite.connect(DB_FILE) as db:
+        for day, rows in by_day.items():
+            table = _events_table(day)
+            await db.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                user_id INTEGER,
+                chat_id INTEGER,
+                detail TEXT
+            )""")
+            await db.executemany(f"INSERT INTO {table} (ts, kind, user_id, chat_id, detail) VALUES (?, ?, ?, ?, ?)", rows)
+        await db.commit()
+
+@timed_dependency("sqlite")
+async def compact_events(raw_cutoff_day: str, retention_cutoff_hour: str) -> list:
+    """Agregă pe oră zilele anterioare lui `raw_cutoff_day`, le șterge tabelele și aplică retenția.
+
+    Returns the days that were compacted.
+    """
     async with aiosqlite.connect(DB_FILE) as db:
+        cursor = await db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'events\\_%' ESCAPE '\\'")
+        days = sorted(name[len('events_'):] for (name,) in await cursor.fetchall())
+        compacted = [day for day in days if day < raw_cutoff_day]
+        for day in compacted:
+            table = _events_table(day)
+            await db.execute(f"""INSERT INTO event_rollups (hour, kind, events, users)
+                SELECT strftime('%Y-%m-%d %H:00', ts, 'unixepoch') AS hour, kind, COUNT(*), COUNT(DISTINCT user_id)
+                FROM {table} GROUP BY hour, kind
+                ON CONFLICT(hour, kind) DO UPDATE SET events = events + excluded.events, users = MAX(users, excluded.users)""")
+            await db.execute(f"DROP TABLE {table}")
+        await db.execute("DELETE FROM event_rollups WHERE hour < ?", (retention_cutoff_hour,))
+        await db.commit()
+    return compacted
+
+@timed_dependency("sqlite")
+async def create_price_alert(user_id: int, symbol: str, target_price: float, direction: str) -> int:
+    async with _user_db(user_id) as db:
         cursor = await db.execute(
             "INSERT INTO alerts (user_id, symbol, target_price, direction) VALUES (?, ?, ?, ?)",
             (user_id, symbol.upper(), target_price, direction.lower())
         )
         await db.commit()
-        return cursor.lastrowid
+        return _alert_id(cursor.lastrowid, shard_of(user_id))
 
+@timed_dependency("sqlite")
 async def get_user_alerts(user_id: int) -> list:
-    async with aiosqlite.connect(DB_FILE) as db:
+    shard = shard_of(user_id)
+    async with _user_db(user_id) as db:
         cursor = await db.execute(
             "SELECT alert_id, symbol, target_price, direction FROM alerts WHERE user_id = ?",
             (user_id,)
         )
-        return await cursor.fetchall()
+        return [(_alert_id(alert_id, shard), *rest) for alert_id, *rest in await cursor.fetchall()]
 
+@timed_dependency("sqlite")
 async def delete_alert(alert_id: int, user_id: int) -> bool:
-    async with aiosqlite.connect(DB_FILE) as db:
+    shard, local_id = _split_alert_id(alert_id)
+    if shard != shard_of(user_id):
+        return False  # ID-ul nu poate aparține acestui utilizator
+    async with _user_db(user_id) as db:
         cursor = await db.execute(
             "DELETE FROM alerts WHERE alert_id = ? AND user_id = ?",
-            (alert_id, user_id)
+            (local_id, user_id)
         )
         await db.commit()
         return cursor.rowcount > 0
 
+async def _delete_alerts(db, shard, by_shard):
+    rows = by_shard.get(shard)
+    if not rows:
+        return 0
+    await db.executemany("DELETE FROM alerts WHERE alert_id = ? AND user_id = ?", rows)
+    await db.commit()
+    return db.total_changes
+
+@timed_dependency("sqlite")
+async def delete_alerts(alerts: list) -> int:
+    """Șterge mai multe alerte (alert_id, user_id), câte o tranzacție pe shard."""
+    if not alerts:
+        return 0
+    by_shard = {}
+    for alert_id, user_id in alerts:
+        shard, local_id = _split_alert_id(alert_id)
+        if shard == shard_of(user_id):
+            by_shard.setdefault(shard, []).append((local_id, user_id))
+    return sum(await _fan_out(_delete_alerts, by_shard))
+
+async def _active_alerts(db, shard):
+    cursor = await db.execute(
+        "SELECT a.alert_id, a.user_id, a.symbol, a.target_price, a.direction FROM alerts a JOIN users u ON a.user_id = u.user_id"
+    )
+    return [(_alert_id(alert_id, shard), *rest) for alert_id, *rest in await cursor.fetchall()]
+
+@timed_dependency("sqlite")
 async def get_all_active_alerts() -> list:
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute(
-            "SELECT a.alert_id, a.user_id, a.symbol, a.target_price, a.direction FROM alerts a JOIN users u ON a.user_id = u.user_id"
-        )
-        return await cursor.fetchall()
+    return [row for rows in await _fan_out(_active_alerts) for row in rows]
 
+@timed_dependency("sqlite")
 async def add_celebration_media(media_type: str, file_id: str, category: str, message: str = None) -> int:
     """Adaugă un nou media pentru celebrări în baza de date."""
     async with aiosqlite.connect(DB_FILE) as db:
@@ -77,6 +442,7 @@ async def add_celebration_media(media_type: str, file_id: str, category: str, me
         await db.commit()
         return cursor.lastrowid
 
+@timed_dependency("sqlite")
 async def get_random_celebration_media(category: str) -> tuple:
     """Returnează un media aleatoriu pentru o anumită categorie."""
     async with aiosqlite.connect(DB_FILE) as db:
@@ -86,6 +452,7 @@ async def get_random_celebration_media(category: str) -> tuple:
         )
         return await cursor.fetchone()
 
+@timed_dependency("sqlite")
 async def delete_celebration_media(media_id: int) -> bool:
     """Șterge un media din baza de date."""
     async with aiosqlite.connect(DB_FILE) as db:
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import NamedTuple, Optional
+
+from .config import logger, LOOP_LAG_INTERVAL, LOOP_STALL_THRESHOLD, PROFILE_SAMPLE_INTERVAL
+from .metrics import registry
+
+# Cadrele în care un thread doar așteaptă (selector, lacăte, cozi): eșantioane „idle”
+IDLE_FRAMES = frozenset((
+    ("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker"),
+))
+
+
+def _frame_name(frame) -> str:
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+
+
+class LoopMonitor:
+    """Măsoară întârzierea event loop-ului și prinde codul care îl blochează.
+
+    A probe task sleeps `interval` seconds and records how late it wakes up in
+    flowsy_loop_lag_seconds. A watchdog thread checks the probe: when the loop has not
+    ticked for `stall_threshold` seconds past its interval, it logs the loop thread's
+    current stack and task once per stall, while the blocking code is still running.
+    Stalls are counted in flowsy_loop_stalls_total when the loop resumes.
+    """
+
+    def __init__(self, interval: float = 0.5, stall_threshold: float = 0.25):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.last_tick = time.monotonic()
+        self.stalls_logged = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Pornește proba și watchdog-ul; se apelează din event loop."""
+        if self._probe_task and not self._probe_task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._stop.clear()
+        self._probe_task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._probe_task:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            self.last_tick = now
+            registry.observe("flowsy_loop_lag_seconds", lag)
+            if lag >= self.stall_threshold:
+                registry.inc("flowsy_loop_stalls_total")
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stop.wait(self.stall_threshold / 2):
+            tick = self.last_tick
+            blocked = time.monotonic() - tick - self.interval
+            if blocked < self.stall_threshold or tick == reported:
+                continue
+            reported = tick
+            self.stalls_logged += 1
+            logger.warning(f"Event loop blocked for {blocked:.2f}s{self._describe()}")
+
+    def _describe(self) -> str:
+        """Task-ul curent și stiva thread-ului event loop-ului, citite din watchdog."""
+        parts = []
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        if task is not None:
+            parts.append(f" in task {task.get_name()} ({task.get_coro()!r})")
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is not None:
+            parts.append(":\n" + "".join(traceback.format_stack(frame, limit=20)).rstrip())
+        return "".join(parts)
+
+
+class Profile(NamedTuple):
+    stacks: Counter   # stiva colapsată ("thread;fișier:funcție;...") -> eșantioane
+    samples: int
+    idle: int
+    seconds: float
+
+    def collapsed(self) -> str:
+        """Formatul „collapsed stacks”, intrare pentru flamegraph.pl sau speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int = 10) -> str:
+        busy = self.samples - self.idle
+        lines = [f"Profil pe {self.seconds:.0f}s: {self.samples} eșantioane, {busy} active ({self.idle} idle)."]
+        for stack, count in self.stacks.most_common(limit):
+            frames = stack.split(";")
+            # Thread-ul și ultimele cadre spun cel mai mult; mijlocul stivei e scurtat
+            shown = frames if len(frames) <= 6 else frames[:1] + ["…"] + frames[-5:]
+            lines.append(f"\n{count / max(busy, 1):.0%} ({count})\n  " + "\n  ".join(shown))
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """Profiler statistic pentru procesul viu, fără dependențe: citește sys._current_frames().
+
+    `run` samples every thread's stack each `interval` seconds, from a thread of its own,
+    so the event loop is profiled while it serves traffic. Samples whose leaf frame only
+    waits (IDLE_FRAMES) are counted as idle and left out of the stacks. While profiling,
+    the interpreter's switch interval is lowered so the sampler gets the GIL mid-callback
+    instead of only when the loop goes back to select(). One profile at a time.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _collapse(self, thread_name: str, frame) -> Optional[str]:
+        if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+            return None
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        names.append(thread_name)
+        return ";".join(reversed(names))
+
+    def run(self, seconds: float) -> Profile:
+        """Blochează thread-ul apelant `seconds` secunde; rulați-l cu asyncio.to_thread."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("a profile is already running")
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, 0.0005))
+        try:
+            own = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = idle = 0
+            started = time.monotonic()
+            deadline = started + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    samples += 1
+                    stack = self._collapse(names.get(ident, str(ident)), frame)
+                    if stack is None:
+                        idle += 1
+                    else:
+                        stacks[stack] += 1
+                del frame
+                time.sleep(self.interval)
+            return Profile(stacks, samples, idle, time.monotonic() - started)
+        finally:
+            sys.setswitchinterval(switch_interval)
+            self._lock.release()
+
+
+loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL, LOOP_STALL_THRESHOLD)
+profiler = SamplingProfiler(PROFILE_SAMPLE_INTERVAL)
@@ -0,0 +1,84 @@
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from .config import logger, EVENT_LOG_CAPACITY, EVENT_LOG_RAW_DAYS, EVENT_LOG_RETENTION_DAYS
+from .database import compact_events, insert_events
+from .metrics import registry
+
+
+class EventLog:
+    """Jurnal append-only al interacțiunilor: comenzi, mesaje AI, alerte, cumpărări.
+
+    `emit` only appends a tuple to an in-memory ring (no I/O, no await), so handlers pay
+    nothing measurable. The `flush` job writes the ring into one table per UTC day
+    (events_YYYYMMDD); `compact` folds days older than `raw_days` into hourly rollups,
+    drops their tables and deletes rollups older than `retention_days`.
+    """
+
+    def __init__(self, capacity: int = 100_000, raw_days: int = 2, retention_days: int = 90):
+        self._ring = deque(maxlen=capacity)
+        self.raw_days = raw_days
+        self.retention_days = retention_days
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def emit(self, kind: str, user_id: Optional[int] = None, chat_id: Optional[int] = None,
+             detail: Optional[str] = None) -> None:
+        if len(self._ring) == self._ring.maxlen:
+            self.dropped += 1  # inelul e plin: cel mai vechi eveniment se pierde
+        self._ring.append((time.time(), kind, user_id, chat_id, detail))
+
+    async def track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """TypeHandler: un eveniment 'command' pentru fiecare comandă primită."""
+        message = update.effective_message if isinstance(update, Update) else None
+        if message and message.text and message.text.startswith('/'):
+            command = message.text.split()[0][1:].split('@')[0].lower()
+            self.emit('command', update.effective_user.id if update.effective_user else None,
+                      update.effective_chat.id if update.effective_chat else None, command)
+
+    async def flush(self, context: ContextTypes.DEFAULT_TYPE = None) -> int:
+        """Job: golește inelul în tabelele zilnice, într-o singură tranzacție."""
+        if not self._ring:
+            return 0
+        batch = list(self._ring)
+        self._ring.clear()
+        by_day = {}
+        for event in batch:
+            day = datetime.fromtimestamp(event[0], timezone.utc).strftime('%Y%m%d')
+            by_day.setdefault(day, []).append(event)
+        try:
+            await insert_events(by_day)
+        except Exception as e:
+            # Înapoi în inel, înaintea celor emise între timp; dacă nu e loc, se pierd cele mai vechi
+            room = self._ring.maxlen - len(self._ring)
+            kept = batch[max(0, len(batch) - room):] if room > 0 else []
+            self.dropped += len(batch) - len(kept)
+            self._ring.extendleft(reversed(kept))
+            logger.error(f"Failed to write {len(batch)} events: {e}; "
+                         f"{len(batch) - len(kept)} discarded, the rest kept for the next flush")
+            return 0
+        registry.inc("flowsy_events_written_total", len(batch))
+        return len(batch)
+
+    async def compact(self, context: ContextTypes.DEFAULT_TYPE = None) -> None:
+        """Job: comprimă zilele vechi în agregate pe oră și aplică retenția."""
+        now = datetime.now(timezone.utc)
+        raw_cutoff = (now - timedelta(days=self.raw_days)).strftime('%Y%m%d')
+        retention_cutoff = (now - timedelta(days=self.retention_days)).strftime('%Y-%m-%d %H:00')
+        try:
+            compacted = await compact_events(raw_cutoff, retention_cutoff)
+        except Exception as e:
+            logger.error(f"Event compaction failed: {e}")
+            return
+        if compacted:
+            logger.info(f"Compacted event tables into hourly rollups: {compacted}")
+
+
+event_log = EventLog(EVENT_LOG_CAPACITY, EVENT_LOG_RAW_DAYS, EVENT_LOG_RETENTION_DAYS)
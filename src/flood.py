@@ -0,0 +1,115 @@
+import time
+from array import array
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from .metrics import registry
+
+ALLOW, WARN, DROP = "allow", "warn", "drop"
+
+
+class TokenBuckets:
+    """Token bucket pentru un număr mare de chei, stocat compact în array-uri.
+
+    Each key maps to a slot in parallel arrays (tokens, last update, warned flag), so a
+    bucket costs a few bytes instead of an object. Buckets idle for `idle_ttl` are full
+    again by definition and get evicted; their slots are reused.
+    """
+
+    __slots__ = ("rate", "burst", "idle_ttl", "_index", "_keys", "_tokens", "_updated", "_warned",
+                 "_free", "_last_sweep")
+
+    def __init__(self, rate: float, burst: float, idle_ttl: float = 600.0):
+        self.rate = rate          # jetoane pe secundă
+        self.burst = burst
+        self.idle_ttl = max(idle_ttl, burst / rate if rate else 0)
+        self._index: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = []
+        self._tokens = array('d')
+        self._updated = array('d')
+        self._warned = array('b')
+        self._free: List[int] = []
+        self._last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _slot(self, key: Hashable, now: float) -> int:
+        slot = self._index.get(key)
+        if slot is not None:
+            return slot
+        if self._free:
+            slot = self._free.pop()
+            self._keys[slot] = key
+            self._tokens[slot] = self.burst
+            self._updated[slot] = now
+            self._warned[slot] = 0
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._tokens.append(self.burst)
+            self._updated.append(now)
+            self._warned.append(0)
+        self._index[key] = slot
+        return slot
+
+    def take(self, key: Hashable, now: Optional[float] = None) -> Tuple[bool, bool]:
+        """Consumă un jeton. Returnează (permis, prima respingere de la ultimul mesaj permis)."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_sweep > self.idle_ttl:
+            self.evict_idle(now)
+        slot = self._slot(key, now)
+        tokens = min(self.burst, self._tokens[slot] + (now - self._updated[slot]) * self.rate)
+        self._updated[slot] = now
+        if tokens >= 1:
+            self._tokens[slot] = tokens - 1
+            self._warned[slot] = 0
+            return True, False
+        self._tokens[slot] = tokens
+        first = not self._warned[slot]
+        self._warned[slot] = 1
+        return False, first
+
+    def refund(self, key: Hashable) -> None:
+        slot = self._index.get(key)
+        if slot is not None:
+            self._tokens[slot] = min(self.burst, self._tokens[slot] + 1)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        idle = [key for key, slot in self._index.items() if now - self._updated[slot] > self.idle_ttl]
+        for key in idle:
+            slot = self._index.pop(key)
+            self._keys[slot] = None
+            self._free.append(slot)
+        return len(idle)
+
+
+class FloodControl:
+    """Limitează mesajele care ajung la Gemini: pe utilizator și, în grupuri, pe chat.
+
+    Rates are per minute. Admins get their own, larger buckets and skip the chat limit.
+    `check` answers ALLOW, WARN (first rejection: reply once asking to slow down) or DROP
+    (further rejections are ignored silently until a message is allowed again).
+    """
+
+    def __init__(self, user_per_minute: float, user_burst: float, chat_per_minute: float, chat_burst: float,
+                 admin_per_minute: float, admin_burst: float, idle_ttl: float = 600.0):
+        self.users = TokenBuckets(user_per_minute / 60, user_burst, idle_ttl)
+        self.chats = TokenBuckets(chat_per_minute / 60, chat_burst, idle_ttl)
+        self.admins = TokenBuckets(admin_per_minute / 60, admin_burst, idle_ttl)
+
+    def check(self, user_id: int, chat_id: int, chat_type: str, is_admin: bool = False) -> str:
+        now = time.monotonic()
+        buckets = self.admins if is_admin else self.users
+        allowed, first = buckets.take(user_id, now)
+        if not allowed:
+            registry.inc("flowsy_flood_rejected_total", scope="user")
+            return WARN if first else DROP
+        if chat_type in ('group', 'supergroup') and not is_admin:
+            allowed, first = self.chats.take(chat_id, now)
+            if not allowed:
+                buckets.refund(user_id)  # mesajul nu a fost procesat, nu-l taxăm pe utilizator
+                registry.inc("flowsy_flood_rejected_total", scope="chat")
+                return WARN if first else DROP
+        return ALLOW
@@ -1,60 +1,206 @@
 import asyncio
-import httpx
-import google.generativeai as genai
 import os
 import re
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ParseMode
+import threading
+import time
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import Forbidden, RetryAfter
 
 from .config import (
     logger, GEMINI_API_KEY, SYSTEM_PROMPT, API_TIMEOUT, 
     GROUP_LINK, LOGO_PATH, WELCOME_MESSAGE, ABOUT_MESSAGE, 
-    FEATURES_MESSAGE, COIN_MESSAGE, HELP_MESSAGE, BUY_LINK, ADMIN_ID, DB_FILE, CHAT_ID
+    FEATURES_MESSAGE, COIN_MESSAGE, HELP_MESSAGE, BUY_LINK, ADMIN_ID, CHAT_ID,
+    ALERT_SEND_RATE, ALERT_RETRY_INTERVAL, ALERT_RETRY_MAX_ATTEMPTS,
+    FLOOD_USER_PER_MINUTE, FLOOD_USER_BURST, FLOOD_CHAT_PER_MINUTE, FLOOD_CHAT_BURST,
+    FLOOD_ADMIN_PER_MINUTE, FLOOD_ADMIN_BURST, FLOOD_IDLE_TTL, COIN_CHART_BUCKET_SECONDS, PROFILE_MAX_SECONDS
 )
 from .database import (
-    update_user_in_db, create_price_alert, get_user_alerts, delete_alert, get_all_active_alerts,
-    add_celebration_media, get_random_celebration_media, delete_celebration_media
+    create_price_alert, get_user_alerts, delete_alert, delete_alerts, get_all_active_alerts,
+    add_celebration_media, get_random_celebration_media, delete_celebration_media, get_all_user_ids,
+    set_utc_offset
 )
-import aiosqlite
+from .metrics import registry, timed, timed_dependency, track_handler
+from .command_registry import command_registry
+from .ratelimit import RateLimiter
+from .stats import stats_collector
+from .events import event_log
+from .flood import FloodControl, WARN, DROP
+from .weekly_content import WeeklyContent
+from .outbound import ALERT, BULK, CELEBRATION
+from .price_history import price_history
+from .charts import ChartCache, ChartCard, render_price_chart
+from .diagnostics import profiler
 
 # --- API CLIENT --- 
+# CoinGecko uses IDs, not symbols. We need a mapping for common coins.
+# This can be expanded or moved to a config file.
+COINGECKO_IDS = {
+    'BTC': 'bitcoin',
+    'ETH': 'ethereum',
+    'SOL': 'solana',
+    # Add other popular coins here
+}
+
+@timed_dependency("coingecko")
 async def get_crypto_price(symbol: str) -> float | None:
     """Fetches the current price of a cryptocurrency from CoinGecko."""
-    # CoinGecko uses IDs, not symbols. We need a mapping for common coins.
-    # This can be expanded or moved to a config file.
-    symbol_to_id = {
-        'BTC': 'bitcoin',
-        'ETH': 'ethereum',
-        'SOL': 'solana',
-        # Add other popular coins here
-    }
-    coin_id = symbol_to_id.get(symbol.upper())
+    coin_id = COINGECKO_IDS.get(symbol.upper())
     if not coin_id:
         return None # Symbol not supported
 
+    import httpx
+
     url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status() # Raise an exception for bad status codes
-            data = response.json()
-            price = data.get(coin_id, {}).get('usd')
-            return float(price) if price else None
-    except (httpx.RequestError, ValueError, KeyError) as e:
+        response = await get_http_client().get(url)
+        response.raise_for_status() # Raise an exception for bad status codes
+        data = response.json()
+        price = data.get(coin_id, {}).get('usd')
+        if not price:
+            return None
+        # Fiecare preț obținut intră în istoric: tendințele nu cer apeluri suplimentare
+        price_history.record(symbol, float(price))
+        return float(price)
+    except (httpx.HTTPError, ValueError, KeyError) as e:
         logger.error(f"CoinGecko API request failed for {symbol}: {e}")
+        registry.inc("flowsy_dependency_errors_total", dependency="coingecko", op="get_crypto_price")
+        return None
+
+@timed_dependency("coingecko")
+async def get_crypto_quote(symbol: str) -> tuple | None:
+    """(preț, variația pe 24h în %) de la CoinGecko, într-un singur apel; variația poate lipsi."""
+    coin_id = COINGECKO_IDS.get(symbol.upper())
+    if not coin_id:
+        return None
+
+    import httpx
+
+    url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd&include_24hr_change=true"
+    try:
+        response = await get_http_client().get(url)
+        response.raise_for_status()
+        data = response.json().get(coin_id, {})
+        price = data.get('usd')
+        if not price:
+            return None
+        price_history.record(symbol, float(price))
+        change = data.get('usd_24h_change')
+        return float(price), (float(change) if change is not None else None)
+    except (httpx.HTTPError, ValueError, KeyError) as e:
+        logger.error(f"CoinGecko quote request failed for {symbol}: {e}")
+        registry.inc("flowsy_dependency_errors_total", dependency="coingecko", op="get_crypto_quote")
         return None
 
-# --- GEMINI INITIALIZATION ---
-try:
-    genai.configure(api_key=GEMINI_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-    logger.info("Gemini model 'gemini-1.5-flash' initialized.")
-except Exception as e:
-    logger.error(f"Failed to initialize Gemini: {e}")
-    gemini_model = None
+@timed_dependency("coingecko")
+async def get_market_chart(symbol: str) -> list:
+    """Punctele (timestamp, preț) din ultimele 24h de la CoinGecko; listă goală la eroare."""
+    coin_id = COINGECKO_IDS.get(symbol.upper())
+    if not coin_id:
+        return []
+
+    import httpx
+
+    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart?vs_currency=usd&days=1"
+    try:
+        response = await get_http_client().get(url)
+        response.raise_for_status()
+        return [(ms / 1000, float(price)) for ms, price in response.json().get('prices', [])]
+    except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+        logger.error(f"CoinGecko market chart request failed for {symbol}: {e}")
+        registry.inc("flowsy_dependency_errors_total", dependency="coingecko", op="get_market_chart")
+        return []
+
+# --- LAZY CLIENTS ---
+# Clienții grei sunt creați la prima folosire (sau de warm_up), nu la importul modulului
+_gemini_model = None
+_gemini_failed = False
+_gemini_lock = threading.Lock()
+_http_client = None
+_price_watcher = None
+_logo_file_id = None
+flood_control = FloodControl(
+    FLOOD_USER_PER_MINUTE, FLOOD_USER_BURST, FLOOD_CHAT_PER_MINUTE, FLOOD_CHAT_BURST,
+    FLOOD_ADMIN_PER_MINUTE, FLOOD_ADMIN_BURST, FLOOD_IDLE_TTL
+)
+
+def get_gemini_model():
+    """Returnează modelul Gemini, inițializându-l la primul apel. None dacă inițializarea a eșuat."""
+    global _gemini_model, _gemini_failed
+    if _gemini_model is not None or _gemini_failed:
+        return _gemini_model
+    with _gemini_lock:
+        if _gemini_model is None and not _gemini_failed:
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=GEMINI_API_KEY)
+                _gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+                logger.info("Gemini model 'gemini-1.5-flash' initialized.")
+            except Exception as e:
+                logger.error(f"Failed to initialize Gemini: {e}")
+                _gemini_failed = True
+    return _gemini_model
+
+def set_gemini_model(model) -> None:
+    """Replaces the Gemini model (used by benchmarks and replay)."""
+    global _gemini_model, _gemini_failed
+    _gemini_model, _gemini_failed = model, False
+
+def get_http_client():
+    """Client HTTP comun (conexiuni refolosite), creat la prima folosire."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(timeout=API_TIMEOUT)
+    return _http_client
+
+def set_http_client(client) -> None:
+    """Replaces the shared HTTP client (used by benchmarks and replay)."""
+    global _http_client
+    _http_client = client
+
+def set_price_watcher(watcher) -> None:
+    """Înregistrează PriceWatcher-ul activ, ca schimbările de alerte să-l trezească imediat."""
+    global _price_watcher
+    _price_watcher = watcher
+
+def alerts_changed() -> None:
+    if _price_watcher is not None:
+        _price_watcher.invalidate()
+
+async def ensure_gemini_model():
+    """Ca get_gemini_model, dar importul lent rulează într-un thread, nu în event loop."""
+    if _gemini_model is not None or _gemini_failed:
+        return _gemini_model
+    return await asyncio.to_thread(get_gemini_model)
+
+async def warm_up() -> None:
+    """Inițializează în fundal clienții grei, ca primul utilizator să nu aștepte după ei."""
+    await ensure_gemini_model()
+    get_http_client()
+
+async def close_clients() -> None:
+    if _http_client is not None:
+        await _http_client.aclose()
 
 # --- HELPERS ---
+@timed("dependency", dependency="gemini", op="generate_content")
+async def generate_content(prompt: str):
+    """Apelează Gemini într-un thread separat, cu timeout-ul configurat."""
+    stats_collector.inc('ai_calls')
+    try:
+        model = await ensure_gemini_model()
+        if model is None:
+            raise RuntimeError("Gemini is not available")
+        return await asyncio.wait_for(
+            asyncio.to_thread(model.generate_content, prompt),
+            timeout=API_TIMEOUT
+        )
+    except BaseException:
+        stats_collector.inc('ai_failures')
+        raise
+
 def escape_markdown_v2(text: str) -> str:
     escape_chars = r'_*[]()~`>#+-=|{}.!'
     return ''.join(f'\\{char}' if char in escape_chars else char for char in text)
@@ -76,35 +222,135 @@ async def send_reply(update: Update, text: str, markup=None, parse_mode=None):
             except Exception as fallback_e:
                 logger.error(f"Fallback plain text send also failed: {fallback_e}")
 
+# --- COIN CHARTS ---
+DAY_SECONDS = 24 * 3600
+
+def _format_usd(price: float) -> str:
+    return f"${price:,.2f}" if price >= 1 else f"${price:.6g}"
+
+async def build_coin_card(symbol: str) -> ChartCard | None:
+    """Prețul, variația pe 24h și graficul pentru /coin SIMBOL; None dacă prețul nu e disponibil."""
+    quote = await get_crypto_quote(symbol)
+    if quote is None:
+        return None
+    price, change = quote
+    series = price_history.series(symbol)
+    if series.coverage() < 3600:
+        # Istoric local prea scurt (ex. prima pornire): îl completăm o dată din CoinGecko
+        price_history.backfill(symbol, await get_market_chart(symbol))
+        series = price_history.series(symbol)
+    now = time.time()
+    if change is None and series.coverage() >= 0.9 * DAY_SECONDS:
+        change = series.change(DAY_SECONDS, now)
+    timestamps, prices = series.ordered(since=now - DAY_SECONDS)
+    # Randarea e CPU pur: o facem într-un thread, ca event loop-ul să rămână liber
+    png = await asyncio.to_thread(render_price_chart, timestamps, prices)
+    lines = [f"{symbol}: {_format_usd(price)}"]
+    if change is not None:
+        lines.append(f"24h: {change:+.2f}% {'📈' if change >= 0 else '📉'}")
+    if len(prices) >= 2:
+        lines.append(f"Min/Max 24h: {_format_usd(min(prices))} / {_format_usd(max(prices))}")
+    lines.append(f"Actualizat la {time.strftime('%H:%M', time.gmtime(now))} UTC")
+    return ChartCard("\n".join(lines), png)
+
+coin_charts = ChartCache(build_coin_card, COIN_CHART_BUCKET_SECONDS)
+
 # --- COMMAND HANDLERS ---
+@track_handler
 async def coin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    keyboard = [[InlineKeyboardButton("💰 Cumpără FlowsyAI Coin Acum", url=BUY_LINK)]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await send_reply(update, COIN_MESSAGE, markup=reply_markup, parse_mode=ParseMode.MARKDOWN_V2)
+    if not context.args:
+        keyboard = [[InlineKeyboardButton("💰 Cumpără FlowsyAI Coin Acum", url=BUY_LINK)]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        await send_reply(update, COIN_MESSAGE, markup=reply_markup, parse_mode=ParseMode.MARKDOWN_V2)
+        return
+
+    symbol = context.args[0].upper()[:10]
+    if symbol not in COINGECKO_IDS:
+        await send_reply(update, f"Simbolul {symbol} nu este suportat. Încearcă: {', '.join(COINGECKO_IDS)}.")
+        return
+    try:
+        card = await coin_charts.card(symbol)
+    except Exception as e:
+        logger.error(f"Building the /coin {symbol} chart failed: {e}")
+        card = None
+    if card is None:
+        await send_reply(update, "Nu am putut obține prețul acum. Încearcă din nou în câteva momente.")
+        return
+    try:
+        await coin_charts.send(context.bot, update.effective_chat.id, card)
+    except Exception as e:
+        logger.error(f"Sending /coin {symbol} to {update.effective_chat.id} failed: {e}")
+
+def _read_logo() -> bytes:
+    with open(LOGO_PATH, 'rb') as f:
+        return f.read()
 
+@track_handler
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update_user_in_db(update.effective_user)
+    stats_collector.record_user(update.effective_user)
     keyboard = [[InlineKeyboardButton("🚀 Alătură-te comunității FlowsyAI", url=GROUP_LINK)]]
     reply_markup = InlineKeyboardMarkup(keyboard)
+    global _logo_file_id
     try:
-        await context.bot.send_photo(chat_id=update.effective_chat.id, photo=open(LOGO_PATH, 'rb'), caption=WELCOME_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
+        # Logo-ul e citit de pe disc într-un thread doar până la prima trimitere; apoi folosim file_id-ul
+        photo = _logo_file_id or await asyncio.to_thread(_read_logo)
+        message = await context.bot.send_photo(chat_id=update.effective_chat.id, photo=photo, caption=WELCOME_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2, reply_markup=reply_markup)
+        if message and message.photo:
+            _logo_file_id = message.photo[-1].file_id
     except Exception as e:
         logger.warning(f"Sending photo failed: {e}. Sending text-only welcome.")
         await send_reply(update, WELCOME_MESSAGE, markup=reply_markup, parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def about(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update_user_in_db(update.effective_user)
+    stats_collector.record_user(update.effective_user)
     await send_reply(update, ABOUT_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def features(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update_user_in_db(update.effective_user)
+    stats_collector.record_user(update.effective_user)
     await send_reply(update, FEATURES_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update_user_in_db(update.effective_user)
+    stats_collector.record_user(update.effective_user)
     await send_reply(update, HELP_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2)
 
 # --- MESSAGE HANDLER ---
+GENERATED_COMMANDS_HEADER = """from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+from .config import logger
+from .handlers import send_reply
+
+"""
+
+def append_generated_command(path: str, command_code: str) -> None:
+    """Adaugă codul unei comenzi în fișier printr-un fișier temporar + os.replace.
+
+    The watcher never sees a half-written file: it reads either the old or the new version.
+    """
+    existing_content = ""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            existing_content = f.read()
+    if not existing_content:
+        existing_content = GENERATED_COMMANDS_HEADER
+    elif 'from telegram import Update, ParseMode' in existing_content:
+        # Antetul vechi nu mai funcționează cu python-telegram-bot 20
+        existing_content = existing_content.replace(
+            'from telegram import Update, ParseMode',
+            'from telegram import Update\nfrom telegram.constants import ParseMode', 1)
+    if not existing_content.endswith('\n\n'):
+        existing_content += '\n' if existing_content.endswith('\n') else '\n\n'
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(existing_content + command_code + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 async def generate_command_from_instruction(update: Update, context: ContextTypes.DEFAULT_TYPE, instruction: str) -> None:
     """Generează o nouă comandă bazată pe instrucțiunile în limbaj natural ale administratorului."""
     try:
@@ -135,10 +381,7 @@ async def generate_command_from_instruction(update: Update, context: ContextType
         """
 
         # Generează codul comenzii folosind Gemini
-        response = await asyncio.wait_for(
-            asyncio.to_thread(gemini_model.generate_content, command_prompt),
-            timeout=API_TIMEOUT
-        )
+        response = await generate_content(command_prompt)
 
         if not response.text:
             raise ValueError("API-ul nu a returnat niciun răspuns")
@@ -159,44 +402,16 @@ async def generate_command_from_instruction(update: Update, context: ContextType
 
         command_name = func_name_match.group(1)
 
-        # Salvează codul în fișierul de comenzi generate
-        commands_file = os.path.join(os.path.dirname(__file__), 'generated_commands.py')
-        
-        # Verifică dacă fișierul există și citește conținutul existent
-        existing_content = ""
-        if os.path.exists(commands_file):
-            with open(commands_file, 'r', encoding='utf-8') as f:
-                existing_content = f.read()
-
-        # Adaugă importurile necesare dacă fișierul este nou
-        if not existing_content:
-            existing_content = """from telegram import Update, ParseMode
-from telegram.ext import ContextTypes
-from .config import logger
-from .handlers import send_reply
-
-"""
-
-        # Adaugă noua comandă la sfârșitul fișierului
-        with open(commands_file, 'w', encoding='utf-8') as f:
-            f.write(existing_content)
-            if not existing_content.endswith('\n\n'):
-                f.write('\n\n')
-            f.write(command_code)
+        # Salvează codul în fișierul de comenzi generate (scriere atomică, în afara buclei)
+        await asyncio.to_thread(append_generated_command, command_registry.path, command_code)
 
-        # Trimite confirmarea către admin
-        await send_reply(
-            update,
-            f"Am creat comanda nouă `/{command_name}`\. "
-            f"Pentru a o activa, trebuie să:\n"
-            f"1\. Adaugi în main\.py:\n"
-            f"```python\n"
-            f"from \.generated_commands import {command_name}\n"
-            f"application\.add_handler\(CommandHandler\('{command_name}', {command_name}\)\)\n"
-            f"```\n"
-            f"2\. Repornești botul\.",
-            parse_mode=ParseMode.MARKDOWN_V2
-        )
+        # Registrul reîncarcă doar funcția nouă și o activează fără repornire
+        loaded, status = await command_registry.reload()
+        public_name = command_registry.command_name(command_name)
+        if loaded:
+            await send_reply(update, f"Am creat comanda nouă /{public_name}. Este deja activă. {status}")
+        else:
+            await send_reply(update, f"Am salvat comanda /{public_name}, dar nu a putut fi activată. {status}")
 
     except asyncio.TimeoutError:
         logger.error(f"Generarea comenzii a expirat după {API_TIMEOUT} secunde.")
@@ -205,6 +420,7 @@ from .handlers import send_reply
         logger.error(f"Eroare la generarea comenzii: {e}")
         await send_reply(update, "A apărut o eroare la generarea comenzii\. Te rog încearcă din nou\.", parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
 
@@ -223,9 +439,17 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         if not (message.text and f'@{bot_username}' in message.text):
             return
 
-    await update_user_in_db(user)
+    stats_collector.record_user(user)
 
-    if not gemini_model:
+    # Limită de mesaje înaintea apelului Gemini: un singur avertisment, apoi ignorăm în tăcere
+    verdict = flood_control.check(user.id, message.chat.id, chat_type, is_admin=user.id == ADMIN_ID)
+    if verdict == WARN:
+        await send_reply(update, "⏳ Trimiți mesaje prea repede. Te rog așteaptă puțin înainte de următoarea întrebare.")
+        return
+    if verdict == DROP:
+        return
+
+    if not await ensure_gemini_model():
         await send_reply(update, "Serviciul de inteligență artificială nu este disponibil momentan.")
         return
 
@@ -242,16 +466,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         conversation_history = "\n".join(history)
         full_prompt = f"{SYSTEM_PROMPT}\n\n---\n\nCONVERSATION HISTORY:\n{conversation_history}"
         
-        response = await asyncio.wait_for(
-            asyncio.to_thread(gemini_model.generate_content, full_prompt),
-            timeout=API_TIMEOUT
-        )
+        response = await generate_content(full_prompt)
         
         if not response.text:
             raise ValueError("API returned an empty response")
 
         ai_response = response.text
         context.user_data['history'].append(f"Flowsy: {ai_response}")
+        event_log.emit('ai_message', user.id, message.chat.id, chat_type)
 
     except asyncio.TimeoutError:
         logger.error(f"Gemini API call timed out after {API_TIMEOUT} seconds.")
@@ -270,15 +492,76 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await send_reply(update, ai_response, markup=reply_markup, parse_mode=ParseMode.MARKDOWN_V2)
 
 # --- ADMIN & SCHEDULED FUNCTIONS ---
+@track_handler
 async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if update.effective_user.id != ADMIN_ID:
         await send_reply(update, r"Nu ai permisiunea pentru această comandă\.")
         return
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute("SELECT COUNT(*) FROM users")
-        total_users = (await cursor.fetchone())[0]
-    await send_reply(update, f"*Statistici Bot*\n\nTotal utilizatori unici: *{total_users}*", parse_mode=ParseMode.MARKDOWN_V2)
+    totals, today = await stats_collector.snapshot()
+    chat_types = (('private', 'private'), ('group', 'grupuri'), ('supergroup', 'supergrupuri'), ('channel', 'canale'))
+    messages = ", ".join(f"{label} {totals.get('messages_' + kind, 0)}" for kind, label in chat_types)
+    # Text simplu: send_reply ar escapa oricum tot textul în modul MarkdownV2
+    text = (
+        "📊 Statistici Bot\n\n"
+        f"Total utilizatori unici: {totals.get('users_total', 0)}\n"
+        f"Activi azi: {today.get('active_users', 0)} (noi: {today.get('new_users', 0)})\n"
+        f"Mesaje: {messages}\n"
+        f"Mesaje azi: {sum(v for k, v in today.items() if k.startswith('messages_'))}\n"
+        f"Apeluri AI: {totals.get('ai_calls', 0)} (eșuate: {totals.get('ai_failures', 0)}), azi {today.get('ai_calls', 0)}\n"
+        f"Alerte create: {totals.get('alerts_created', 0)}, declanșate: {totals.get('alerts_fired', 0)}\n"
+        f"Celebrări trimise: {totals.get('celebrations_sent', 0)}"
+    )
+    await send_reply(update, text)
+
+@track_handler
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Rezumatul latențelor (p50/p99) și al erorilor pentru handlere și dependențe externe."""
+    if update.effective_user.id != ADMIN_ID:
+        await send_reply(update, r"Nu ai permisiunea pentru această comandă\.")
+        return
+    lines = registry.summary()
+    depths = getattr(context.application.update_processor, "queue_depths", None)
+    if depths:
+        busiest = sorted(depths().items(), key=lambda item: item[1], reverse=True)[:5]
+        if busiest:
+            lines.append("Cozi de update-uri: " + ", ".join(f"{kind} {key_id}={depth}" for (kind, key_id), depth in busiest))
+    outbound = getattr(context.bot, "rate_limiter", None)
+    if hasattr(outbound, "queue_depths"):
+        lines.append("Coada de trimitere: " + ", ".join(f"{name}={depth}" for name, depth in outbound.queue_depths().items()))
+    text = "Metrici (de la pornire):\n\n" + "\n".join(lines) if lines else "Nu există metrici înregistrate încă."
+    # Mesajele Telegram au maxim 4096 de caractere
+    await send_reply(update, text[:4000])
+
+@track_handler
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Profilează procesul viu câteva secunde; trimite stivele cele mai frecvente și fișierul pentru flamegraph."""
+    if update.effective_user.id != ADMIN_ID:
+        await send_reply(update, r"Nu ai permisiunea pentru această comandă\.")
+        return
+    try:
+        seconds = float(context.args[0]) if context.args else 10.0
+    except ValueError:
+        await send_reply(update, "Folosire: /profile <secunde>")
+        return
+    seconds = max(1.0, min(seconds, PROFILE_MAX_SECONDS))
+    if profiler.running:
+        await send_reply(update, "Un profil rulează deja. Încearcă din nou după ce se termină.")
+        return
+    await send_reply(update, f"Profilez procesul timp de {seconds:.0f} secunde...")
+    try:
+        profile = await asyncio.to_thread(profiler.run, seconds)
+    except RuntimeError as e:
+        await send_reply(update, f"Profilul nu a putut porni: {e}")
+        return
+    await send_reply(update, profile.top()[:4000])
+    if profile.stacks:
+        await context.bot.send_document(
+            update.effective_chat.id, document=profile.collapsed().encode('utf-8'),
+            filename=f"profile-{int(time.time())}.folded",
+            caption="Stive colapsate: flamegraph.pl profile.folded > flame.svg sau speedscope.app"
+        )
 
+@track_handler
 async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if update.effective_user.id != ADMIN_ID:
         await send_reply(update, r"Nu ai permisiunea pentru această comandă\.")
@@ -288,11 +571,10 @@ async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await send_reply(update, r"Te rog specifică un mesaj\. Exemplu: `/broadcast Salutare tuturor\!`", parse_mode=ParseMode.MARKDOWN_V2)
         return
 
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute("SELECT user_id FROM users")
-        user_ids = await cursor.fetchall()
+    user_ids = await get_all_user_ids()
 
-    tasks = [context.bot.send_message(user_id[0], message_to_send, parse_mode=ParseMode.MARKDOWN_V2, disable_web_page_preview=True) for user_id in user_ids]
+    tasks = [context.bot.send_message(user_id, message_to_send, parse_mode=ParseMode.MARKDOWN_V2, disable_web_page_preview=True,
+                                      rate_limit_args=BULK) for user_id in user_ids]
     results = await asyncio.gather(*tasks, return_exceptions=True)
 
     sent_count = sum(1 for r in results if not isinstance(r, Exception))
@@ -300,6 +582,7 @@ async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     await send_reply(update, rf"*Broadcast Terminat*\n\nMesaj trimis către *{sent_count}* utilizatori\.\nEșuat pentru *{failed_count}* utilizatori\.", parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles the /alerta command for setting price alerts."""
     try:
@@ -340,6 +623,8 @@ async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             target_price=target_price,
             direction=direction
         )
+        alerts_changed()
+        stats_collector.inc('alerts_created')
 
         await send_reply(
             update,
@@ -351,6 +636,7 @@ async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         logger.error(f"Error in alert_command: {e}")
         await send_reply(update, r"A apărut o eroare la crearea alertei\. Te rog încearcă din nou\.", parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Shows all active alerts for the user."""
     try:
@@ -372,6 +658,7 @@ async def alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         logger.error(f"Error in alerts_command: {e}")
         await send_reply(update, r"A apărut o eroare la afișarea alertelor\.", parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def delete_alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Deletes a price alert by ID."""
     try:
@@ -391,6 +678,7 @@ async def delete_alert_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
         success = await delete_alert(alert_id, update.effective_user.id)
         if success:
+            alerts_changed()
             await send_reply(update, r"Alerta a fost ștearsă cu succes\.", parse_mode=ParseMode.MARKDOWN_V2)
         else:
             await send_reply(update, r"Nu am găsit o alertă cu acest ID\.", parse_mode=ParseMode.MARKDOWN_V2)
@@ -399,8 +687,45 @@ async def delete_alert_command(update: Update, context: ContextTypes.DEFAULT_TYP
         logger.error(f"Error in delete_alert_command: {e}")
         await send_reply(update, r"A apărut o eroare la ștergerea alertei\.", parse_mode=ParseMode.MARKDOWN_V2)
 
-async def send_celebration(context: ContextTypes.DEFAULT_TYPE, category: str, chat_id: int) -> None:
-    """Trimite un media de celebrare aleatoriu pentru o categorie specifică."""
+# Fusul orar: UTC+2, +5:30, -3 sau 0
+_UTC_OFFSET_RE = re.compile(r"^(?:UTC|GMT)?\s*([+-]?)(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+
+def parse_utc_offset(text: str) -> int | None:
+    """Decalajul față de UTC, în minute, sau None dacă textul nu e un fus orar valid."""
+    match = _UTC_OFFSET_RE.match(text.strip())
+    if not match:
+        return None
+    sign, hours, minutes = match.groups()
+    if minutes and int(minutes) >= 60:
+        return None
+    offset = int(hours) * 60 + int(minutes or 0)
+    offset = -offset if sign == '-' else offset
+    return offset if -12 * 60 <= offset <= 14 * 60 else None
+
+@track_handler
+async def timezone_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Setează fusul orar al utilizatorului, folosit de mesajele săptămânale."""
+    offset = parse_utc_offset(" ".join(context.args)) if context.args else None
+    if offset is None:
+        await send_reply(update, "Folosire: /fus <decalaj față de UTC>. Exemplu: /fus +2 sau /fus -5:30")
+        return
+    # Rândul din users e scris de StatsCollector la flush; îl scriem acum, ca UPDATE-ul să-l găsească
+    stats_collector.record_user(update.effective_user)
+    await stats_collector.flush()
+    if not await set_utc_offset(update.effective_user.id, offset):
+        await send_reply(update, "Nu am putut salva fusul orar. Te rog încearcă din nou.")
+        return
+    hours, minutes = divmod(abs(offset), 60)
+    await send_reply(update, f"Fusul orar a fost setat la UTC{'-' if offset < 0 else '+'}{hours}" + (f":{minutes:02d}" if minutes else "") + ".")
+
+async def send_celebration(context: ContextTypes.DEFAULT_TYPE, category: str, chat_id: int, count: int = 1,
+                           limiter: RateLimiter = None, priority: int = CELEBRATION) -> None:
+    """Trimite un media de celebrare aleatoriu pentru o categorie specifică.
+
+    `count` > 1 înseamnă că celebrarea rezumă mai multe evenimente agregate.
+    `limiter`, dacă e dat, este consultat înaintea fiecărui mesaj trimis.
+    `priority` e clasa din coada de trimitere (src/outbound.py).
+    """
     try:
         media = await get_random_celebration_media(category)
         if not media:
@@ -408,23 +733,36 @@ async def send_celebration(context: ContextTypes.DEFAULT_TYPE, category: str, ch
             return
 
         media_type, file_id, message = media
+        if count > 1 and category == 'buy':
+            summary = f"🔥 {count} cumpărături noi de $FLOWSY!"
+            message = f"{summary}\n\n{message}" if message else summary
         if message:
             message = escape_markdown_v2(message)
 
+        if limiter:
+            await limiter.acquire()
         if media_type == 'sticker':
-            await context.bot.send_sticker(chat_id=chat_id, sticker=file_id)
+            await context.bot.send_sticker(chat_id=chat_id, sticker=file_id, rate_limit_args=priority)
             if message:
-                await context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN_V2)
+                if limiter:
+                    await limiter.acquire()
+                await context.bot.send_message(chat_id=chat_id, text=message, parse_mode=ParseMode.MARKDOWN_V2,
+                                               rate_limit_args=priority)
         elif media_type in ['gif', 'animation']:
             await context.bot.send_animation(
                 chat_id=chat_id,
                 animation=file_id,
                 caption=message if message else None,
-                parse_mode=ParseMode.MARKDOWN_V2 if message else None
+                parse_mode=ParseMode.MARKDOWN_V2 if message else None,
+                rate_limit_args=priority
             )
+        else:
+            return
+        stats_collector.inc('celebrations_sent')
     except Exception as e:
         logger.error(f"Error sending celebration: {e}")
 
+@track_handler
 async def add_celebration_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Adaugă un nou media de celebrare în baza de date."""
     if update.effective_user.id != ADMIN_ID:
@@ -475,6 +813,7 @@ async def add_celebration_command(update: Update, context: ContextTypes.DEFAULT_
         logger.error(f"Error in add_celebration_command: {e}")
         await send_reply(update, r"A apărut o eroare la adăugarea media\-ului\.", parse_mode=ParseMode.MARKDOWN_V2)
 
+@track_handler
 async def delete_celebration_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Șterge un media de celebrare din baza de date."""
     if update.effective_user.id != ADMIN_ID:
@@ -506,42 +845,122 @@ async def delete_celebration_command(update: Update, context: ContextTypes.DEFAU
         logger.error(f"Error in delete_celebration_command: {e}")
         await send_reply(update, r"A apărut o eroare la ștergerea media\-ului\.", parse_mode=ParseMode.MARKDOWN_V2)
 
+def evaluate_alert(symbol: str, target_price: float, direction: str, current_price: float):
+    """Returnează (mesaj, categorie de celebrare) dacă alerta s-a declanșat, altfel None."""
+    price_text = escape_markdown_v2(str(current_price))
+    target_text = escape_markdown_v2(str(target_price))
+    if direction == 'peste' and current_price >= target_price:
+        return f"🚀 *Alertă de preț\!*\n\nPrețul {symbol} a ajuns la {price_text} USD, peste ținta de {target_text} USD\!", 'price_up'
+    if direction == 'sub' and current_price <= target_price:
+        return f"📉 *Alertă de preț\!*\n\nPrețul {symbol} a scăzut la {price_text} USD, sub ținta de {target_text} USD\!", None
+    return None
+
+# Trimiterile de alerte împart o limită comună de rată; eșecurile așteaptă aici o nouă încercare
+_alert_limiter = RateLimiter(ALERT_SEND_RATE, burst=int(ALERT_SEND_RATE))
+_alert_retries = {}  # alert_id -> [alert, message, category, attempts, next_attempt_at]
+
+async def _send_alert_notification(context: ContextTypes.DEFAULT_TYPE, user_id: int, message: str, celebration_category) -> None:
+    await _alert_limiter.acquire()
+    await context.bot.send_message(chat_id=user_id, text=message, parse_mode=ParseMode.MARKDOWN_V2, rate_limit_args=ALERT)
+    if celebration_category:
+        await send_celebration(context, celebration_category, user_id, limiter=_alert_limiter, priority=ALERT)
+
+async def _deliver_alerts(context: ContextTypes.DEFAULT_TYPE, pending: list) -> list:
+    """Trimite notificările concurent, sub limita de rată.
+
+    `pending` holds (alert, message, category, attempts). Delivered alerts are deleted in a
+    single transaction; transient failures go to the retry queue, and users who blocked
+    the bot get their alerts removed. Returns the ids that are no longer pending here.
+    """
+    delivered, blocked = [], []
+    queue = iter(pending)
+
+    async def worker() -> None:
+        for alert, message, category, attempts in queue:
+            alert_id, user_id = alert[0], alert[1]
+            try:
+                await _send_alert_notification(context, user_id, message, category)
+                delivered.append((alert_id, user_id))
+                event_log.emit('alert_fired', user_id, user_id, alert[2])
+                _alert_retries.pop(alert_id, None)
+            except Forbidden as e:
+                logger.warning(f"User {user_id} blocked the bot, removing alert {alert_id}: {e}")
+                blocked.append((alert_id, user_id))
+                _alert_retries.pop(alert_id, None)
+            except Exception as e:
+                delay = ALERT_RETRY_INTERVAL * 2 ** attempts
+                if isinstance(e, RetryAfter):
+                    retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+                    _alert_limiter.pause(retry_after)
+                    delay = max(delay, retry_after)
+                if attempts + 1 >= ALERT_RETRY_MAX_ATTEMPTS:
+                    # Alerta rămâne în baza de date și se poate declanșa din nou la un preț viitor
+                    logger.error(f"Giving up on alert {alert_id} for user {user_id} after {attempts + 1} attempts: {e}")
+                    _alert_retries.pop(alert_id, None)
+                    continue
+                logger.warning(f"Alert {alert_id} for user {user_id} failed ({e}), retrying in {delay:.0f}s")
+                _alert_retries[alert_id] = [alert, message, category, attempts + 1, time.monotonic() + delay]
+
+    workers = min(len(pending), max(1, int(ALERT_SEND_RATE)))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+    if delivered:
+        stats_collector.inc('alerts_fired', len(delivered))
+    removed = delivered + blocked
+    if removed:
+        await delete_alerts(removed)
+    return [alert_id for alert_id, _ in removed] + [alert_id for alert_id in (a[0][0] for a in pending) if alert_id in _alert_retries]
+
+@track_handler
+async def process_price_alerts(context: ContextTypes.DEFAULT_TYPE, symbol: str, current_price: float, alerts: list) -> list:
+    """Evaluează alertele unui simbol la prețul dat și notifică utilizatorii.
+
+    Returns the ids of the alerts that fired (delivered, or waiting in the retry queue).
+    """
+    pending = []
+    for alert in alerts:
+        alert_id, user_id, _symbol, target_price, direction = alert
+        if alert_id in _alert_retries:
+            continue  # deja declanșată, așteaptă reîncercarea
+        result = evaluate_alert(symbol, target_price, direction, current_price)
+        if result:
+            message, celebration_category = result
+            pending.append((alert, message, celebration_category, 0))
+    if not pending:
+        return []
+    return await _deliver_alerts(context, pending)
+
+async def retry_failed_alerts(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Job: retrimite notificările de alertă eșuate a căror pauză a expirat."""
+    now = time.monotonic()
+    due = [(alert, message, category, attempts)
+           for alert, message, category, attempts, next_at in list(_alert_retries.values()) if next_at <= now]
+    if due:
+        await _deliver_alerts(context, due)
+
+@track_handler
 async def check_alerts(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Checks all active alerts and notifies users when conditions are met."""
+    """Checks all active alerts and notifies users when conditions are met.
+
+    Prețul se cere o singură dată pentru fiecare simbol, nu pentru fiecare alertă.
+    PriceWatcher face același lucru continuu; aceasta rămâne pentru verificări punctuale.
+    """
     try:
-        alerts = await get_all_active_alerts()
-        for alert_id, user_id, symbol, target_price, direction in alerts:
-            current_price = await get_crypto_price(symbol)
+        by_symbol = {}
+        for alert in await get_all_active_alerts():
+            by_symbol.setdefault(alert[2].upper(), []).append(alert)
+
+        symbols = list(by_symbol)
+        prices = await asyncio.gather(*(get_crypto_price(symbol) for symbol in symbols))
+        for symbol, current_price in zip(symbols, prices):
             if current_price is None:
                 continue
-
-            condition_met = False
-            celebration_category = None
-
-            if direction == 'peste' and current_price >= target_price:
-                condition_met = True
-                celebration_category = 'price_up'
-                message = f"🚀 *Alertă de preț!*\n\nPrețul {symbol} a ajuns la {current_price} USD, peste ținta de {target_price} USD\!"
-            elif direction == 'sub' and current_price <= target_price:
-                condition_met = True
-                message = f"📉 *Alertă de preț!*\n\nPrețul {symbol} a scăzut la {current_price} USD, sub ținta de {target_price} USD\!"
-
-            if condition_met:
-                try:
-                    await context.bot.send_message(
-                        chat_id=user_id,
-                        text=message,
-                        parse_mode=ParseMode.MARKDOWN_V2
-                    )
-                    if celebration_category:
-                        await send_celebration(context, celebration_category, user_id)
-                    await delete_alert(alert_id, user_id)
-                except Exception as e:
-                    logger.error(f"Failed to send alert notification to user {user_id}: {e}")
+            await process_price_alerts(context, symbol, current_price, by_symbol[symbol])
 
     except Exception as e:
         logger.error(f"Error in check_alerts: {e}")
 
+@track_handler
 async def poll_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         # E.g., /sondaj "Intrebare?" "Opt1" "Opt2"
@@ -578,12 +997,11 @@ async def poll_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         logger.error(f"Failed to create poll: {e}")
         await send_reply(update, r"A apărut o eroare la crearea sondajului\. Te rog încearcă din nou\.", parse_mode=ParseMode.MARKDOWN_V2)
 
-async def weekly_tip(context: ContextTypes.DEFAULT_TYPE):
-    tip_message = rf"*Sfatul Săptămânii de la Flowsy* 💡\n\nȘtiai că poți folosi modele AI pentru a-ți genera idei de proiecte noi? Încearcă să-i ceri lui Gemini: `sugerează-mi 3 idei de aplicații web care folosesc Python și recunoaștere de imagini`\.\n\nHai pe [grupul nostru]({GROUP_LINK}) să ne arăți ce ai creat\!"
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute("SELECT user_id FROM users")
-        user_ids = await cursor.fetchall()
-    
-    logger.info(f"Sending weekly tip to {len(user_ids)} users.")
-    tasks = [context.bot.send_message(user_id[0], tip_message, parse_mode=ParseMode.MARKDOWN_V2, disable_web_page_preview=True) for user_id in user_ids]
-    await asyncio.gather(*tasks, return_exceptions=True)
\ No newline at end of file
+# Un apel Gemini pe segment (limbă, activitate, alerte), nu pe utilizator
+weekly_content = WeeklyContent(generate_content)
+
+@track_handler
+async def weekly_tip(context: ContextTypes.DEFAULT_TYPE, recipient: tuple) -> None:
+    """Trimite sfatul săptămânii, personalizat, unui destinatar; eșalonarea o face MassJob."""
+    text = await weekly_content.render(recipient)
+    await context.bot.send_message(recipient[0], text, disable_web_page_preview=True, rate_limit_args=BULK)
\ No newline at end of file
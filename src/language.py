@@ -0,0 +1,230 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Fără dependențe de config: modulul e folosit și de main.py din rădăcină
+
+TOKEN_RE = re.compile(r"[^\W\d_]+")
+RO_DIACRITICS = frozenset("ăâîșț")
+# Variantele cu sedilă (ş, ţ) apar des pe tastaturile vechi
+_NORMALIZE = str.maketrans({"ş": "ș", "ţ": "ț", "Ş": "ș", "Ţ": "ț"})
+
+# Cuvinte scurte și frecvente, specifice unei singure limbi. Cele care sunt cuvinte și în
+# cealaltă limbă (in, are, am, ai, a, me, as, care, pot, cat, tot...) și împrumuturile folosite
+# în ambele (ok, super, cool, coin, token, wallet) lipsesc intenționat: nu spun nimic despre limbă.
+RO_WORDS = frozenset("""
+    și si să sa că ca de la cu pe pentru este e sunt nu da ce cum când cand unde cine
+    mai foarte bine doar acum aici asta acest această aceasta acesta ceva cineva
+    îmi imi îți iti mă te se ne vă va lor lui ei el ea eu tu noi voi un o niște niste
+    dacă daca până pana după dupa fără fara despre prin sau dar iar deci însă insa
+    vreau poți poti poate putem trebuie aș ați ati avem aveți aveti fost fi
+    salut bună buna mulțumesc multumesc mersi te rog vă rog frate
+    cât câte cate mult multe puțin putin toți toti toate nimic niciodată
+    ajută ajuta ajutor întrebare intrebare moneda monedă prețul pretul preț pret cumpăr
+    cumpar cumpăra cumpara vând vand acum azi mâine maine ieri săptămâna saptamana
+    luna anul banii bani câștig castig investiție investitie investesc grup grupul
+""".split())
+
+EN_WORDS = frozenset("""
+    the and or but is was were be been being have has had will would can could
+    should shall may might must do does did done not no yes what when where how who
+    why which this that these those there here it its it's i'm you your you're he she
+    they them their we our us my of to for with from about into over than then
+    just only also very really much many some any all every each because if so
+    hello hi hey thanks thank please help want need know think get got make go going
+    buy sell price money today tomorrow yesterday week month year
+    good great nice sure let let's tell show give work works working
+""".split())
+
+# Text de antrenare pentru profilurile de n-grame: propoziții tipice pentru chat-ul botului
+_RO_SAMPLE = """
+salut ce mai faci aș vrea să știu cum funcționează botul și cât costă moneda
+vreau să cumpăr flowsy dar nu știu de unde pot să-l iau mulțumesc frumos pentru ajutor
+care este prețul de azi al monedei și când se listează pe alte platforme
+poți să-mi explici ce înseamnă inteligența artificială și cum o folosesc în proiecte
+am investit în proiect și aștept să crească prețul săptămâna viitoare
+spune-mi te rog cum setez o alertă de preț pentru bitcoin și ethereum
+comunitatea este foarte activă iar echipa răspunde repede la întrebări
+nu înțeleg de ce tranzacția nu apare în portofel am așteptat o oră
+mulțumesc mult o zi bună tuturor ne vedem pe grup mâine seară
+""" + " ".join(RO_WORDS)
+
+_EN_SAMPLE = """
+hello how are you doing i would like to know how the bot works and what the coin costs
+i want to buy flowsy but i don't know where i can get it thanks a lot for the help
+what is the price today and when will it be listed on other exchanges
+can you explain what artificial intelligence means and how i can use it in projects
+i invested in the project and i am waiting for the price to grow next week
+please tell me how to set a price alert for bitcoin and ethereum
+the community is very active and the team answers questions quickly
+i don't understand why the transaction doesn't show up in my wallet i waited an hour
+thank you so much have a nice day everyone see you in the group tomorrow night
+""" + " ".join(EN_WORDS)
+
+
+class Detection(NamedTuple):
+    language: Optional[str]   # 'ro' / 'en', None când textul nu conține indicii
+    margin: float             # pozitiv = română, negativ = engleză
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower().translate(_NORMALIZE))
+
+
+class _TrigramModel:
+    """Log-probabilități de trigrame de caractere, cu netezire add-one."""
+
+    def __init__(self, sample: str):
+        counts = Counter()
+        for token in tokenize(sample):
+            padded = f" {token} "
+            counts.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        total = sum(counts.values())
+        self.unseen = math.log(1 / (total + len(counts) + 1))
+        self.logp: Dict[str, float] = {gram: math.log((n + 1) / (total + len(counts) + 1)) for gram, n in counts.items()}
+
+    def score(self, token: str) -> float:
+        padded = f" {token} "
+        logp, unseen = self.logp, self.unseen
+        return sum(logp.get(padded[i:i + 3], unseen) for i in range(len(padded) - 2))
+
+
+class LanguageDetector:
+    """Română sau engleză, pe cuvinte întregi și n-grame de caractere.
+
+    Tokens are matched against the two word sets (exact lookup, so 'de' no longer matches
+    inside 'decide'); a token with Romanian diacritics is strong Romanian evidence; any
+    other token is scored with character trigrams, with a small weight. Tables are built
+    once, in the constructor. `detect` returns the language and a signed margin
+    (positive = Romanian) that LanguageProfiles accumulates per user.
+    """
+
+    def __init__(self, word_weight: float = 1.0, diacritic_weight: float = 2.0, ngram_weight: float = 0.4):
+        self.word_weight = word_weight
+        self.diacritic_weight = diacritic_weight
+        self.ngram_weight = ngram_weight
+        self._ro = _TrigramModel(_RO_SAMPLE)
+        self._en = _TrigramModel(_EN_SAMPLE)
+        self._token_cache: Dict[str, float] = {}
+
+    def _token_margin(self, token: str) -> float:
+        margin = self._token_cache.get(token)
+        if margin is not None:
+            return margin
+        if token in RO_WORDS:
+            margin = self.word_weight
+        elif token in EN_WORDS:
+            margin = -self.word_weight
+        elif not RO_DIACRITICS.isdisjoint(token):
+            margin = self.diacritic_weight
+        elif len(token) < 3 or not token.isascii():
+            margin = 0.0  # prea scurt sau alt alfabet: fără indicii
+        else:
+            # Raportul de verosimilitate, normalizat pe trigramă și plafonat la ±1
+            ratio = (self._ro.score(token) - self._en.score(token)) / len(token)
+            margin = self.ngram_weight * max(-1.0, min(1.0, ratio))
+        if len(self._token_cache) < 50_000:
+            self._token_cache[token] = margin
+        return margin
+
+    def margin(self, tokens: Iterable[str]) -> float:
+        return sum(self._token_margin(token) for token in tokens)
+
+    def word_margin(self, tokens: Iterable[str]) -> float:
+        """Doar cuvintele din liste și diacriticele: fără trigrame, deci ieftin."""
+        margin = 0.0
+        for token in tokens:
+            if token in RO_WORDS:
+                margin += self.word_weight
+            elif token in EN_WORDS:
+                margin -= self.word_weight
+            elif not RO_DIACRITICS.isdisjoint(token):
+                margin += self.diacritic_weight
+        return margin
+
+    def detect(self, text: str) -> Detection:
+        margin = self.margin(tokenize(text))
+        if margin > 0:
+            return Detection('ro', margin)
+        if margin < 0:
+            return Detection('en', margin)
+        return Detection(None, 0.0)
+
+
+class LanguageProfiles:
+    """Limba fiecărui utilizator, învățată din mesajele lui.
+
+    The profile is a decayed sum of detection margins (positive = Romanian), so a user
+    who switches language is followed within a few messages. Once the profile is
+    confident (`|score| >= confident_margin` after `min_messages`), full detection is
+    skipped and only re-run every `recheck_every` messages; skipped messages still get the
+    cheap word lookup, and one with at least `switch_evidence` against the profile is
+    detected right away, so a language switch is not missed for a whole window. Profiles are loaded per user with
+    `load` (from the caller's storage) and changed ones are returned by `take_dirty`.
+    """
+
+    def __init__(self, detector: LanguageDetector, confident_margin: float = 6.0, min_messages: int = 3,
+                 decay: float = 0.8, max_step: float = 5.0, recheck_every: int = 20, switch_evidence: float = 2.0,
+                 default: str = 'en'):
+        self.detector = detector
+        self.confident_margin = confident_margin
+        self.min_messages = min_messages
+        self.decay = decay
+        self.max_step = max_step
+        self.recheck_every = recheck_every
+        self.switch_evidence = switch_evidence
+        self.default = default
+        # user_id -> [scor, mesaje, mesaje de la ultima detecție]
+        self._profiles: Dict[int, List[float]] = {}
+        self._dirty: set = set()
+        self.detections = 0
+        self.skipped = 0
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._profiles
+
+    def load(self, user_id: int, row: Optional[Tuple[float, int]]) -> None:
+        """Profilul salvat (scor, mesaje) sau None pentru un utilizator nou."""
+        score, messages = row if row else (0.0, 0)
+        self._profiles.setdefault(user_id, [float(score), int(messages), 0])
+
+    def language_of(self, user_id: int) -> str:
+        profile = self._profiles.get(user_id)
+        if not profile or profile[0] == 0:
+            return self.default
+        return 'ro' if profile[0] > 0 else 'en'
+
+    def is_confident(self, user_id: int) -> bool:
+        profile = self._profiles.get(user_id)
+        return bool(profile) and profile[1] >= self.min_messages and abs(profile[0]) >= self.confident_margin
+
+    def observe(self, user_id: int, text: str) -> str:
+        """Actualizează profilul cu un mesaj nou și returnează limba în care să răspundem."""
+        profile = self._profiles.setdefault(user_id, [0.0, 0, 0])
+        profile[1] += 1
+        tokens = tokenize(text)
+        if self.is_confident(user_id) and profile[2] < self.recheck_every:
+            # Indicii clare în cealaltă limbă: detectăm acum, nu la următoarea verificare
+            evidence = self.detector.word_margin(tokens)
+            if evidence * profile[0] >= 0 or abs(evidence) < self.switch_evidence:
+                profile[2] += 1
+                self.skipped += 1
+                return self.language_of(user_id)
+        self.detections += 1
+        profile[2] = 0
+        margin = self.detector.margin(tokens)
+        if margin:
+            step = max(-self.max_step, min(self.max_step, margin))
+            profile[0] = profile[0] * self.decay + step
+            self._dirty.add(user_id)
+        return self.language_of(user_id)
+
+    def take_dirty(self) -> List[Tuple[int, str, float, int]]:
+        """Rândurile (user_id, limbă, scor, mesaje) schimbate de la ultimul apel."""
+        dirty, self._dirty = self._dirty, set()
+        return [(user_id, self.language_of(user_id), self._profiles[user_id][0], self._profiles[user_id][1])
+                for user_id in sorted(dirty) if user_id in self._profiles]
+
+    def restore_dirty(self, user_ids: Iterable[int]) -> None:
+        self._dirty.update(user_ids)
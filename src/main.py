@@ -1,55 +1,116 @@
 import asyncio
 import sys
 import os
-import importlib
 from datetime import time
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
+from typing import Optional
+from telegram import Update
+from telegram.ext import Application, CommandHandler, MessageHandler, TypeHandler, filters
+from telegram.request import BaseRequest
 
+from .startup import startup_timer
 from .blockchain import SolanaMonitor
+from .celebrations import CelebrationAggregator
+from .classifier import TransferEvent
 
-from .config import TOKEN, logger, SOLANA_WS_URL, FLOWSY_TOKEN_MINT, CHAT_ID
-from .database import setup_database
+from .config import (
+    TOKEN, logger, SOLANA_WS_URLS, SOLANA_RPC_URL, SOLANA_DEMOTE_LAG, SOLANA_BACKFILL_LIMIT,
+    SOLANA_CLASSIFIER_WORKERS, SOLANA_CLASSIFIER_BATCH_SIZE, FLOWSY_TOKEN_MINT, CHAT_ID,
+    CELEBRATION_WINDOW, CELEBRATION_MAX_PER_MINUTE, SEEN_SIGNATURES_CAPACITY,
+    METRICS_HOST, METRICS_PORT, RECORD_UPDATES_PATH, RECORD_SALT, GENERATED_COMMANDS_POLL_INTERVAL,
+    PRICE_POLL_MIN_INTERVAL, PRICE_POLL_MAX_INTERVAL, PRICE_NEAR_DISTANCE, PRICE_FAR_DISTANCE, PRICE_FEED_WS_URL,
+    ALERT_RETRY_INTERVAL, UPDATE_CONCURRENCY, STATS_FLUSH_INTERVAL, EVENT_LOG_FLUSH_INTERVAL,
+    PERSISTENCE_UPDATE_INTERVAL, WEEKLY_TIP_WEEKDAY, WEEKLY_TIP_TIME, WEEKLY_TIP_WINDOW, MASS_SEND_RATE,
+    MASS_JOB_TZ_BUCKETS, DEFAULT_UTC_OFFSET, OUTBOUND_GLOBAL_RATE, OUTBOUND_PRIVATE_INTERVAL,
+    OUTBOUND_GROUP_PER_MINUTE, OUTBOUND_MAX_RETRIES, PRICE_HISTORY_SNAPSHOT_INTERVAL
+)
+from .command_registry import command_registry
+from .database import setup_database, get_all_active_alerts
 from .handlers import (
     start, about, features, help_command, coin, stats, broadcast, poll_command,
-    handle_message, weekly_tip, alert_command, alerts_command, delete_alert_command, check_alerts,
-    add_celebration_command, delete_celebration_command
+    handle_message, weekly_tip, alert_command, alerts_command, delete_alert_command,
+    timezone_command, add_celebration_command, delete_celebration_command, send_celebration, metrics_command, profile_command,
+    warm_up, close_clients, get_crypto_price, process_price_alerts, retry_failed_alerts, set_price_watcher
 )
+from .mass_jobs import MassJob
+from .metrics import TimedHTTPXRequest, start_metrics_server
+from .price_watch import PriceWatcher
+from .persistence import SQLitePersistence
+from .recorder import UpdateRecorder
+from .stats import stats_collector
+from .events import event_log
+from .update_processor import ChatOrderedUpdateProcessor
+from .outbound import OutboundScheduler
+from .price_history import price_history
+from .diagnostics import loop_monitor
+
+async def emit_buy_celebration(chat_id: int, count: int) -> None:
+    """Trimite o singură celebrare care rezumă toate cumpărăturile din fereastră."""
+    logger.info(f"Sending buy celebration for {count} purchase(s) to chat {chat_id}")
+    # Notă: Contextul aplicației este disponibil global
+    await send_celebration(app, 'buy', chat_id, count=count)
 
-async def handle_solana_transaction(transaction_data):
-    """Procesează o tranzacție Solana și trimite o celebrare dacă este o achiziție."""
+async def handle_solana_transaction(event: TransferEvent):
+    """Procesează o tranzacție Solana clasificată și trimite o celebrare dacă este o achiziție."""
     try:
-        logs = transaction_data.get('value', {}).get('logs', [])
-        # Verifică dacă este o tranzacție de transfer
-        is_buy = any("Instruction: Transfer" in log for log in logs)
-        
-        if is_buy:
-            logger.info("Detected Flowsy token purchase, sending celebration")
-            # Trimite celebrarea în grupul principal
-            # Notă: Contextul aplicației este disponibil global
-            await send_celebration(app, 'buy', CHAT_ID)
+        if event.kind != 'buy':
+            return
+        # Agregatorul ignoră semnăturile repetate și grupează rafalele într-o singură celebrare
+        if celebration_aggregator.add_buy(CHAT_ID, event.signature):
+            event_log.emit('buy_detected', chat_id=CHAT_ID, detail=event.signature)
+            logger.info(f"Detected Flowsy token purchase of {event.amount} tokens ({event.signature}), queued for celebration")
     except Exception as e:
         logger.error(f"Error processing Solana transaction for celebration: {e}")
 
-async def main() -> None:
-    await setup_database()
-    global app  # Folosim o variabilă globală pentru a accesa aplicația în callback-ul Solana
-    app = Application.builder().token(TOKEN).build()
+async def warm_up_in_background(app: Application) -> None:
+    """Inițializări lente făcute după ce polling-ul a pornit deja."""
+    try:
+        with startup_timer.phase("warm-up: Gemini and HTTP clients"):
+            await warm_up()
+        with startup_timer.phase("warm-up: generated commands"):
+            await command_registry.reload()
+    except Exception as e:
+        logger.error(f"Background warm-up failed: {e}")
+    startup_timer.report()
 
-    # Încarcă și înregistrează comenzile generate dinamic
-    generated_commands_file = os.path.join(os.path.dirname(__file__), 'generated_commands.py')
-    if os.path.exists(generated_commands_file):
-        try:
-            spec = importlib.util.spec_from_file_location("generated_commands", generated_commands_file)
-            generated_commands = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(generated_commands)
-
-            for name, func in generated_commands.__dict__.items():
-                if asyncio.iscoroutinefunction(func) and not name.startswith("__"):
-                    command_name = name.replace('_command', '')
-                    app.add_handler(CommandHandler(command_name, func))
-                    logger.info(f"Loaded generated command: /{command_name}")
-        except Exception as e:
-            logger.error(f"Failed to load generated commands: {e}")
+def build_application(token: str = TOKEN, request: Optional[BaseRequest] = None) -> Application:
+    """Construiește aplicația cu toate handlerele și job-urile înregistrate.
+
+    `request` permite înlocuirea clientului HTTP pentru Bot API (de ex. în replay/benchmark-uri).
+    """
+    builder = (
+        Application.builder()
+        .token(token)
+        .request(request or TimedHTTPXRequest())
+        # Un răspuns Gemini lent nu mai blochează alți utilizatori; același chat rămâne în ordine
+        .concurrent_updates(ChatOrderedUpdateProcessor(UPDATE_CONCURRENCY))
+        # Istoricul conversațiilor (user_data) supraviețuiește repornirilor
+        .persistence(SQLitePersistence(update_interval=PERSISTENCE_UPDATE_INTERVAL))
+        # O singură coadă pentru tot ce trimite botul: răspunsurile trec înaintea trimiterilor în masă
+        .rate_limiter(OutboundScheduler(OUTBOUND_GLOBAL_RATE, OUTBOUND_PRIVATE_INTERVAL,
+                                        OUTBOUND_GROUP_PER_MINUTE, OUTBOUND_MAX_RETRIES))
+    )
+
+    recorder = UpdateRecorder(RECORD_UPDATES_PATH, RECORD_SALT) if RECORD_UPDATES_PATH else None
+
+    async def flush_buffers(application: Application) -> None:
+        await stats_collector.flush()
+        await event_log.flush()
+        await price_history.save()
+        if recorder:
+            await asyncio.to_thread(recorder.flush)
+    builder.post_shutdown(flush_buffers)
+
+    app = builder.build()
+
+    # Înregistrarea (opțională) rulează înaintea tuturor celorlalte handlere
+    if recorder:
+        app.add_handler(TypeHandler(Update, recorder.record), group=-2)
+        logger.info(f"Recording anonymised updates to {RECORD_UPDATES_PATH}")
+    # Un singur handler rulează per grup, deci contorul de mesaje și jurnalul au grupurile lor
+    app.add_handler(TypeHandler(Update, event_log.track_update), group=-3)
+    app.add_handler(TypeHandler(Update, stats_collector.track_update), group=-1)
+
+    command_registry.attach(app)
 
     # Register command handlers
     app.add_handler(CommandHandler("start", start))
@@ -63,8 +124,11 @@ async def main() -> None:
     app.add_handler(CommandHandler("alerta", alert_command))
     app.add_handler(CommandHandler("alerte", alerts_command))
     app.add_handler(CommandHandler("stergealerta", delete_alert_command))
+    app.add_handler(CommandHandler("fus", timezone_command))
     app.add_handler(CommandHandler("addcelebration", add_celebration_command))
     app.add_handler(CommandHandler("deletecelebration", delete_celebration_command))
+    app.add_handler(CommandHandler("metrics", metrics_command))
+    app.add_handler(CommandHandler("profile", profile_command))
 
     # Register message handler
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
@@ -72,25 +136,98 @@ async def main() -> None:
     # Register scheduled jobs
     job_queue = app.job_queue
     if job_queue:
-        job_queue.run_daily(weekly_tip, time=time(hour=9, minute=0), days=(0,)) # Monday at 9:00 AM
+        # Sfatul săptămânii: eșalonat pe o fereastră, reluat după repornire, niciodată trimis de două ori
+        hour, minute = (int(part) for part in WEEKLY_TIP_TIME.split(':'))
+        weekly_tip_job = MassJob(
+            "weekly_tip", weekly_tip,
+            weekday=WEEKLY_TIP_WEEKDAY, at=time(hour=hour, minute=minute),
+            window=WEEKLY_TIP_WINDOW, rate=MASS_SEND_RATE,
+            tz_buckets=MASS_JOB_TZ_BUCKETS, default_offset=DEFAULT_UTC_OFFSET
+        )
+        job_queue.run_repeating(weekly_tip_job.tick, interval=300, first=30)
+
+        # Comenzile generate sunt reîncărcate la cald când fișierul se schimbă
+        job_queue.run_repeating(command_registry.check_for_changes, interval=GENERATED_COMMANDS_POLL_INTERVAL, first=GENERATED_COMMANDS_POLL_INTERVAL)
+
+        # Activitatea și contoarele pentru /stats sunt scrise în loturi
+        job_queue.run_repeating(stats_collector.flush, interval=STATS_FLUSH_INTERVAL, first=STATS_FLUSH_INTERVAL)
 
-        # Schedule alert checks
-        job_queue.run_repeating(check_alerts, interval=60, first=10)
+        # Jurnalul de evenimente: scriere în loturi, agregare pe oră a zilelor vechi
+        job_queue.run_repeating(event_log.flush, interval=EVENT_LOG_FLUSH_INTERVAL, first=EVENT_LOG_FLUSH_INTERVAL)
+        job_queue.run_repeating(event_log.compact, interval=3600, first=60)
+
+        # Notificările de alertă eșuate sunt retrimise mai târziu, nu pierdute
+        job_queue.run_repeating(retry_failed_alerts, interval=ALERT_RETRY_INTERVAL / 2, first=ALERT_RETRY_INTERVAL)
+
+        # Istoricul prețurilor supraviețuiește repornirilor prin snapshot-uri periodice
+        job_queue.run_repeating(price_history.save, interval=PRICE_HISTORY_SNAPSHOT_INTERVAL, first=PRICE_HISTORY_SNAPSHOT_INTERVAL)
+
+    return app
+
+async def main() -> None:
+    startup_timer.mark("modules imported")
+    with startup_timer.phase("database setup"):
+        await setup_database()
+    with startup_timer.phase("price history snapshot"):
+        await asyncio.to_thread(price_history.load)
+    global app, celebration_aggregator  # Folosim variabile globale pentru a accesa aplicația în callback-ul Solana
+    with startup_timer.phase("build application"):
+        app = build_application()
+    celebration_aggregator = CelebrationAggregator(
+        emit=emit_buy_celebration,
+        window=CELEBRATION_WINDOW,
+        max_per_minute=CELEBRATION_MAX_PER_MINUTE,
+        seen_capacity=SEEN_SIGNATURES_CAPACITY
+    )
 
     # Configurează și pornește monitorul Solana
     solana_monitor = SolanaMonitor(
-        ws_url=SOLANA_WS_URL,
+        ws_urls=SOLANA_WS_URLS,
         token_mint_address=FLOWSY_TOKEN_MINT,
-        transaction_callback=handle_solana_transaction
+        transaction_callback=handle_solana_transaction,
+        rpc_url=SOLANA_RPC_URL,
+        backfill_limit=SOLANA_BACKFILL_LIMIT,
+        demote_lag=SOLANA_DEMOTE_LAG,
+        dedup_capacity=SEEN_SIGNATURES_CAPACITY,
+        classifier_workers=SOLANA_CLASSIFIER_WORKERS,
+        classifier_batch_size=SOLANA_CLASSIFIER_BATCH_SIZE
+    )
+
+    # Alertele de preț: interogări adaptive doar pentru simbolurile cu alerte (+ feed push opțional)
+    alert_context = app.context_types.context(app)
+
+    async def on_price(symbol, price, alerts):
+        return await process_price_alerts(alert_context, symbol, price, alerts)
+
+    price_watcher = PriceWatcher(
+        fetch_price=get_crypto_price,
+        load_alerts=get_all_active_alerts,
+        on_price=on_price,
+        min_interval=PRICE_POLL_MIN_INTERVAL,
+        max_interval=PRICE_POLL_MAX_INTERVAL,
+        near_distance=PRICE_NEAR_DISTANCE,
+        far_distance=PRICE_FAR_DISTANCE,
+        feed_url=PRICE_FEED_WS_URL or None
     )
+    set_price_watcher(price_watcher)
 
     logger.info("Starting bot and Solana monitor...")
     async with app:
         await app.start()
         await app.updater.start_polling()
-        
+        startup_timer.mark("polling started")
+
+        # Întârzierea event loop-ului intră în metrici; blocajele lungi ajung în log cu stiva lor
+        loop_monitor.start()
+
+        # Gemini, clientul HTTP și comenzile generate se încarcă după pornirea polling-ului
+        warm_up_task = asyncio.create_task(warm_up_in_background(app))
+
+        metrics_server = await start_metrics_server(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+
         # Pornește monitorizarea Solana într-un task separat
         monitor_task = asyncio.create_task(solana_monitor.start())
+        price_watch_task = asyncio.create_task(price_watcher.run())
         
         # Așteaptă la infinit
         try:
@@ -98,4 +235,19 @@ async def main() -> None:
         except asyncio.CancelledError:
             logger.info("Stopping Solana monitor...")
             await solana_monitor.stop()
-            await monitor_task
\ No newline at end of file
+            price_watcher.stop()
+            await asyncio.gather(monitor_task, price_watch_task, return_exceptions=True)
+            await celebration_aggregator.close()
+            await loop_monitor.stop()
+            # Aplicația trebuie oprită înainte de ieșirea din `async with` (shutdown() salvează
+            # persistența). post_shutdown îl apelează doar run_polling, deci îl rulăm noi
+            await app.updater.stop()
+            await app.stop()
+            await app.post_shutdown(app)
+            if metrics_server:
+                metrics_server.close()
+            warm_up_task.cancel()
+            await close_clients()
+
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
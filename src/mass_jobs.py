@@ -0,0 +1,111 @@
+import asyncio
+import time
+from datetime import datetime, time as dtime, timedelta, timezone
+from typing import Awaitable, Callable, Dict
+
+from telegram.error import Forbidden, RetryAfter
+from telegram.ext import ContextTypes
+
+from .config import logger
+from .database import count_recipients, get_job_run, get_recipients, get_utc_offset_buckets, save_job_run
+from .metrics import registry
+from .ratelimit import RateLimiter
+
+# Primește contextul și rândul destinatarului (vezi database.get_recipients)
+SendFunc = Callable[[ContextTypes.DEFAULT_TYPE, tuple], Awaitable[None]]
+
+
+class MassJob:
+    """Un mesaj trimis tuturor utilizatorilor o dată pe săptămână, eșalonat.
+
+    Delivery starts at `weekday`/`at` local time (Python weekday, 0 = Monday) and is spread
+    over `window` seconds, never faster than `rate` messages per second. With `tz_buckets`,
+    users are grouped by users.utc_offset (minutes, set with /fus; `default_offset` when
+    unset) and each group starts at its own local time. A run that could not start within `catch_up`
+    seconds of its slot is skipped for that week rather than sent late.
+    """
+
+    def __init__(self, name: str, send: SendFunc, weekday: int, at: dtime, window: float, rate: float,
+                 tz_buckets: bool = False, default_offset: int = 0, catch_up: float = 86400,
+                 batch_size: int = 200):
+        self.name = name
+        self.send = send
+        self.weekday = weekday
+        self.at = at
+        self.window = window
+        self.rate = rate
+        self.tz_buckets = tz_buckets
+        self.default_offset = default_offset
+        self.catch_up = catch_up
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate)
+        self._running: Dict[int, asyncio.Task] = {}
+
+    def slot(self, now_utc: datetime, offset_minutes: int):
+        """(perioadă, început în UTC) pentru săptămâna locală curentă a grupului."""
+        local = now_utc + timedelta(minutes=offset_minutes)
+        monday = (local - timedelta(days=local.weekday())).date()
+        start_local = datetime.combine(monday + timedelta(days=self.weekday), self.at, tzinfo=timezone.utc)
+        year, week, _ = monday.isocalendar()
+        return f"{year}-W{week:02d}", start_local - timedelta(minutes=offset_minutes)
+
+    async def tick(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job periodic: pornește (sau reia după repornire) grupurile ajunse la ora lor."""
+        now = datetime.now(timezone.utc)
+        buckets = await get_utc_offset_buckets(self.default_offset) if self.tz_buckets else [self.default_offset]
+        for bucket in buckets:
+            task = self._running.get(bucket)
+            if task and not task.done():
+                continue
+            period, start = self.slot(now, bucket)
+            if not (start <= now < start + timedelta(seconds=self.catch_up)):
+                continue
+            run = await get_job_run(self.name, period, bucket)
+            if run and run[2]:
+                continue  # deja livrat în această perioadă
+            self._running[bucket] = asyncio.create_task(
+                self._deliver(context, period, bucket, start, run[0] if run else 0, run[1] if run else 0)
+            )
+
+    async def _deliver(self, context: ContextTypes.DEFAULT_TYPE, period: str, bucket: int, start: datetime,
+                       cursor: int, sent: int) -> None:
+        bucket_filter = bucket if self.tz_buckets else None
+        remaining = await count_recipients(cursor, bucket_filter, self.default_offset)
+        deadline = start.timestamp() + self.window
+        logger.info(f"Mass job {self.name} {period} (UTC{bucket / 60:+g}): {remaining} recipients, resuming after user {cursor}")
+
+        while True:
+            batch = await get_recipients(cursor, self.batch_size, bucket_filter, self.default_offset)
+            if not batch:
+                break
+            # Ritmul acoperă restul ferestrei; limita globală rămâne plafonul
+            time_left = max(1.0, deadline - time.time())
+            interval = max(1 / self.rate, time_left / max(1, remaining))
+            results = await asyncio.gather(*(self._send_one(context, row, index * interval) for index, row in enumerate(batch)))
+            sent += sum(results)
+            remaining -= len(batch)
+            cursor = batch[-1][0]
+            # Cursorul e salvat după fiecare lot: o repornire reia de aici, fără dubluri
+            await save_job_run(self.name, period, bucket, cursor, sent)
+
+        await save_job_run(self.name, period, bucket, cursor, sent, completed=True)
+        logger.info(f"Mass job {self.name} {period} (UTC{bucket / 60:+g}) completed: {sent} delivered")
+
+    async def _send_one(self, context: ContextTypes.DEFAULT_TYPE, row: tuple, delay: float) -> bool:
+        await asyncio.sleep(delay)
+        for _ in range(3):
+            await self.limiter.acquire()
+            try:
+                await self.send(context, row)
+                registry.inc("flowsy_mass_job_sent_total", job=self.name)
+                return True
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+                self.limiter.pause(retry_after)
+            except Forbidden:
+                return False  # utilizatorul a blocat botul
+            except Exception as e:
+                logger.warning(f"Mass job {self.name} failed for user {row[0]}: {e}")
+                registry.inc("flowsy_mass_job_failed_total", job=self.name)
+                return False
+        return False
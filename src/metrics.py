@@ -0,0 +1,202 @@
+import asyncio
+import functools
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Limitele bucket-urilor (secunde), acoperă de la interogări SQLite până la apeluri Gemini lente
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # ultimul bucket este +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation inside the matching bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    """In-process store for counters and histograms, keyed by name and labels."""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        return self.histograms.get(self._key(name, labels))
+
+    def counter(self, name: str, **labels: Any) -> float:
+        return self.counters.get(self._key(name, labels), 0)
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                cumulative += bucket_count
+                bucket_labels = self._format_labels(labels, 'le="%s"' % bound)
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = self._format_labels(labels, 'le="+Inf"')
+            lines.append(f"{name}_bucket{inf_labels} {histogram.count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {histogram.total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> List[str]:
+        """One human-readable line per histogram: count, p50, p99 and errors."""
+        lines = []
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            errors = self.counters.get((name.replace('_seconds', '_errors_total'), labels), 0)
+            label_text = ",".join(v for _, v in labels)
+            lines.append(
+                f"{name.replace('flowsy_', '').replace('_seconds', '')}[{label_text}] "
+                f"n={histogram.count} p50={histogram.quantile(0.5) * 1000:.0f}ms "
+                f"p99={histogram.quantile(0.99) * 1000:.0f}ms err={errors:.0f}"
+            )
+        return lines
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def timer(family: str, **labels: Any) -> Iterator[None]:
+    """Records the duration of a block in flowsy_<family>_seconds and failures in flowsy_<family>_errors_total."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        registry.inc(f"flowsy_{family}_errors_total", **labels)
+        raise
+    finally:
+        registry.observe(f"flowsy_{family}_seconds", time.perf_counter() - started, **labels)
+
+
+def timed(family: str, **labels: Any) -> Callable:
+    """Decorator version of `timer` for sync and async functions."""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timer(family, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(family, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def track_handler(func: Callable) -> Callable:
+    """Latency histogram and error count for a Telegram handler, labelled by its name."""
+    return timed("handler", handler=func.__name__)(func)
+
+
+def timed_dependency(dependency: str) -> Callable:
+    """Latency histogram for calls to an external dependency, labelled by function name."""
+    def decorator(func: Callable) -> Callable:
+        return timed("dependency", dependency=dependency, op=func.__name__)(func)
+    return decorator
+
+
+class TimedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that times every Bot API call by endpoint name."""
+
+    async def do_request(self, url: str, method: str, *args: Any, **kwargs: Any) -> Tuple[int, bytes]:
+        with timer("dependency", dependency="bot_api", op=url.rsplit('/', 1)[-1]):
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = "200 OK", registry.render_prometheus().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """Serves GET /metrics in Prometheus text format on a local port."""
+    server = await asyncio.start_server(_handle_http, host, port)
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from .config import logger
+from .metrics import registry
+
+# Clasele de prioritate, transmise ca rate_limit_args (ex. bot.send_message(..., rate_limit_args=BULK))
+INTERACTIVE, ALERT, CELEBRATION, BULK = 0, 1, 2, 3
+PRIORITY_NAMES = ("interactive", "alert", "celebration", "bulk")
+
+# Endpoint-urile care livrează un mesaj nou într-un chat și intră sub limitele pe chat
+_MESSAGE_ENDPOINTS = frozenset((
+    "sendMessage", "sendPhoto", "sendAnimation", "sendSticker", "sendVideo", "sendAudio",
+    "sendDocument", "sendVoice", "sendVideoNote", "sendMediaGroup", "sendLocation", "sendVenue",
+    "sendContact", "sendPoll", "sendDice", "sendInvoice", "sendGame", "copyMessage", "forwardMessage",
+))
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+
+
+class OutboundScheduler(BaseRateLimiter[int]):
+    """Toate cererile către Bot API trec printr-o singură coadă, pe priorități.
+
+    Requests to the same chat go one at a time, in order, spaced by `private_interval`
+    seconds in private chats and `group_per_minute` per minute in groups and channels;
+    each then waits for a slot under the global `global_rate`. Global slots go to the
+    highest priority waiting (INTERACTIVE, then ALERT, CELEBRATION, BULK), so a broadcast
+    never delays a reply. A RetryAfter pauses the chat and the global queue, and the
+    request is retried up to `max_retries` times before the error reaches the caller.
+    Requests without a chat (getMe, answerCallbackQuery...) only take a global slot;
+    getUpdates is never limited.
+    """
+
+    __slots__ = ("global_rate", "private_interval", "group_interval", "max_retries", "_heap", "_seq",
+                 "_wakeup", "_dispatcher", "_next_slot", "_paused_until", "_chat_next", "_chat_locks", "_depths",
+                 "_last_sweep")
+
+    def __init__(self, global_rate: float = 30.0, private_interval: float = 1.0, group_per_minute: float = 20.0,
+                 max_retries: int = 3):
+        if global_rate <= 0 or group_per_minute <= 0:
+            raise ValueError("rates must be positive")
+        self.global_rate = global_rate
+        self.private_interval = private_interval
+        self.group_interval = 60.0 / group_per_minute
+        self.max_retries = max_retries
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._chat_next: Dict[Union[int, str], float] = {}
+        self._chat_locks: Dict[Union[int, str], list] = {}  # chat -> [lacăt, cereri care îl folosesc]
+        self._depths = [0] * len(PRIORITY_NAMES)
+        self._last_sweep = time.monotonic()
+
+    async def initialize(self) -> None:
+        self._start()
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        # Ce a rămas în coadă pleacă fără limită, ca shutdown-ul să nu blocheze
+        while self._heap:
+            future = heapq.heappop(self._heap)[-1]
+            if not future.done():
+                future.set_result(None)
+
+    def _start(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Cereri care așteaptă un loc global, pe clasă de prioritate."""
+        return dict(zip(PRIORITY_NAMES, self._depths))
+
+    def pause(self, seconds: float, chat_id: Union[int, str, None] = None) -> None:
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        if chat_id is not None:
+            self._chat_next[chat_id] = max(self._chat_next.get(chat_id, 0.0), now + seconds)
+
+    # --- limite ---
+
+    def _chat_interval(self, chat_id: Union[int, str]) -> float:
+        # ID-urile negative (și @username) sunt grupuri sau canale
+        is_group = not isinstance(chat_id, int) or chat_id < 0
+        return self.group_interval if is_group else self.private_interval
+
+    def _sweep(self, now: float) -> None:
+        if len(self._chat_next) > 10_000 and now - self._last_sweep > 60:
+            self._last_sweep = now
+            self._chat_next = {key: slot for key, slot in self._chat_next.items() if slot > now}
+
+    async def _global_slot(self, priority: int) -> None:
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), time.monotonic(), future))
+        self._depths[priority] += 1
+        self._wakeup.set()
+        try:
+            await future
+        finally:
+            self._depths[priority] -= 1
+
+    async def _dispatch(self) -> None:
+        interval = 1.0 / self.global_rate
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            wait = max(self._paused_until, self._next_slot) - now
+            if wait > 0:
+                # O cerere mai prioritară sosită între timp va fi aleasă după somn
+                await asyncio.sleep(wait)
+                continue
+            priority, _, queued_at, future = heapq.heappop(self._heap)
+            if future.done():
+                continue  # apelantul a renunțat
+            self._next_slot = now + interval
+            registry.observe("flowsy_outbound_queue_wait_seconds", now - queued_at, priority=PRIORITY_NAMES[priority])
+            future.set_result(None)
+
+    # --- BaseRateLimiter ---
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        priority = rate_limit_args if rate_limit_args in range(len(PRIORITY_NAMES)) else INTERACTIVE
+        chat_id = data.get("chat_id") if endpoint in _MESSAGE_ENDPOINTS else None
+        if chat_id is None:
+            return await self._send(callback, args, kwargs, endpoint, priority, None)
+        entry = self._chat_locks.get(chat_id)
+        if entry is None:
+            entry = self._chat_locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self._send(callback, args, kwargs, endpoint, priority, chat_id)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[chat_id]
+
+    async def _send(self, callback, args, kwargs, endpoint: str, priority: int, chat_id):
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                delay = self._chat_next.get(chat_id, 0.0) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await self._global_slot(priority)
+            if chat_id is not None:
+                now = time.monotonic()
+                self._sweep(now)
+                self._chat_next[chat_id] = now + self._chat_interval(chat_id)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                seconds = _retry_seconds(e)
+                registry.inc("flowsy_outbound_retry_after_total", priority=PRIORITY_NAMES[priority])
+                self.pause(seconds, chat_id)
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Telegram flood limit on {endpoint} (chat {chat_id}): retrying in {seconds:.0f}s")
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import pickle
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from .config import logger
+from .database import load_persisted, load_persisted_kind, save_persisted
+
+RowKey = Tuple[str, str]
+ConversationDict = Dict[Tuple, object]
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class SQLitePersistence(BasePersistence):
+    """Persistența PTB în tabela `persistence` din baza de date a botului.
+
+    Each user, chat, bot_data and conversation state is its own row, pickled on its own.
+    User and chat data are read lazily, the first time an update for that key arrives
+    (refresh_*_data). On every persistence round PTB hands us the touched entries; only
+    those whose pickled bytes differ from what is stored are written, all of them in one
+    transaction shortly after the round (`write_delay`) and again on shutdown (flush).
+    Values must be plain picklable data, as with PicklePersistence.
+    """
+
+    def __init__(self, update_interval: float = 60, write_delay: float = 0.5):
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self.write_delay = write_delay
+        self._digests: Dict[RowKey, bytes] = {}
+        self._loaded: set = set()
+        self._load_failed: set = set()
+        self._dirty: Dict[RowKey, bytes] = {}
+        self._deleted: set = set()
+        self._conversations: Dict[str, ConversationDict] = {}
+        self._write_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    # --- citire ---
+
+    async def _load(self, kind: str, key: Any) -> Optional[Any]:
+        row_key = (kind, str(key))
+        if row_key in self._loaded:
+            return None
+        try:
+            data = await load_persisted(*row_key)
+        except Exception as e:
+            # Necitit: nu scriem peste rândul salvat până nu reușește o citire (la următorul update)
+            logger.error(f"Could not load persisted {kind} data for {key}: {e}")
+            self._load_failed.add(row_key)
+            return None
+        self._loaded.add(row_key)
+        self._load_failed.discard(row_key)
+        if data is None:
+            return None
+        self._digests[row_key] = _digest(data)
+        return pickle.loads(data)
+
+    async def get_user_data(self) -> Dict[int, Any]:
+        return {}  # încărcare leneșă în refresh_user_data
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def get_bot_data(self) -> Any:
+        return await self._load('bot', '') or {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        if name not in self._conversations:
+            kind = f"conversation:{name}"
+            rows = await load_persisted_kind(kind)
+            conversations = {}
+            for key, data in rows:
+                self._digests[(kind, key)] = _digest(data)
+                self._loaded.add((kind, key))
+                conversation_key, state = pickle.loads(data)
+                conversations[tuple(conversation_key)] = state
+            self._conversations[name] = conversations
+        return dict(self._conversations[name])
+
+    async def refresh_user_data(self, user_id: int, user_data: Any) -> None:
+        stored = await self._load('user', user_id)
+        if stored:
+            for key, value in stored.items():
+                user_data.setdefault(key, value)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        stored = await self._load('chat', chat_id)
+        if stored:
+            for key, value in stored.items():
+                chat_data.setdefault(key, value)
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass  # bot_data e citit o singură dată, la pornire
+
+    # --- scriere ---
+
+    def _stage(self, kind: str, key: Any, value: Any) -> None:
+        row_key = (kind, str(key))
+        if row_key in self._load_failed:
+            return  # citirea a eșuat: o scriere ar înlocui datele salvate cu cele parțiale din memorie
+        if not value and row_key not in self._digests:
+            return  # nimic de salvat și nimic salvat anterior (ex. chat_data gol)
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = _digest(data)
+        self._loaded.add(row_key)
+        self._deleted.discard(row_key)
+        if self._digests.get(row_key) == digest:
+            self._dirty.pop(row_key, None)
+            return
+        self._digests[row_key] = digest
+        self._dirty[row_key] = data
+        self._schedule_write()
+
+    def _schedule_write(self) -> None:
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_soon())
+
+    async def _write_soon(self) -> None:
+        await asyncio.sleep(self.write_delay)  # adună toate intrările rundei curente
+        await self._write()
+
+    async def _write(self) -> None:
+        async with self._write_lock:
+            if not (self._dirty or self._deleted):
+                return
+            dirty, self._dirty = self._dirty, {}
+            deleted, self._deleted = self._deleted, set()
+            try:
+                await save_persisted([(kind, key, data) for (kind, key), data in dirty.items()], sorted(deleted))
+            except Exception as e:
+                logger.error(f"Failed to persist {len(dirty)} entries: {e}")
+                for row_key, data in dirty.items():
+                    self._dirty.setdefault(row_key, data)
+                self._deleted |= deleted
+                # Fără digest, intrarea va fi rescrisă la următoarea rundă chiar dacă nu se schimbă
+                for row_key in dirty:
+                    self._digests.pop(row_key, None)
+
+    async def update_user_data(self, user_id: int, data: Any) -> None:
+        self._stage('user', user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        self._stage('chat', chat_id, data)
+
+    async def update_bot_data(self, data: Any) -> None:
+        self._stage('bot', '', data)
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        conversations = self._conversations.setdefault(name, {})
+        kind, row_key = f"conversation:{name}", repr(key)
+        if new_state is None:
+            conversations.pop(key, None)
+            self._drop(kind, row_key)
+        else:
+            conversations[key] = new_state
+            self._stage(kind, row_key, (list(key), new_state))
+
+    def _drop(self, kind: str, key: Any) -> None:
+        row_key = (kind, str(key))
+        self._dirty.pop(row_key, None)
+        self._digests.pop(row_key, None)
+        self._deleted.add(row_key)
+        self._schedule_write()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._drop('user', user_id)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._drop('chat', chat_id)
+
+    async def flush(self) -> None:
+        if self._write_task:
+            await asyncio.gather(self._write_task, return_exceptions=True)
+        await self._write()
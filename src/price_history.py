@@ -0,0 +1,240 @@
+import asyncio
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import logger, PRICE_HISTORY_CAPACITY, PRICE_HISTORY_PATH, PRICE_HISTORY_RESOLUTION
+
+_MAGIC = b"FPH1"
+_BYTEORDER = b"L" if sys.byteorder == "little" else b"B"
+
+
+class PriceSeries:
+    """Buffer circular de capacitate fixă cu perechi (timestamp, preț), în două array('d').
+
+    Points closer than `resolution` seconds to the previous one replace it instead of
+    being appended, so the buffer covers capacity * resolution seconds whatever the
+    polling rate. Queries slice the arrays (C loops in min/max/sum), never Python lists
+    of objects.
+    """
+
+    __slots__ = ("capacity", "resolution", "_ts", "_px", "_head", "_size")
+
+    def __init__(self, capacity: int, resolution: float = 0.0):
+        self.capacity = capacity
+        self.resolution = resolution
+        self._ts = array('d', bytes(8 * capacity))
+        self._px = array('d', bytes(8 * capacity))
+        self._head = 0   # poziția celui mai vechi punct
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> float:
+        """Timestamp-ul punctului `index` în ordine cronologică (permite bisect pe serie)."""
+        return self._ts[(self._head + index) % self.capacity]
+
+    def _physical(self, index: int) -> int:
+        return (self._head + index) % self.capacity
+
+    def append(self, ts: float, price: float) -> None:
+        if self._size:
+            last = self._physical(self._size - 1)
+            if ts < self._ts[last]:
+                return  # punct mai vechi decât ultimul: ignorat, seria rămâne ordonată
+            if ts - self._ts[last] < self.resolution:
+                self._ts[last], self._px[last] = ts, price
+                return
+        if self._size < self.capacity:
+            slot = self._physical(self._size)
+            self._size += 1
+        else:
+            slot = self._head
+            self._head = (self._head + 1) % self.capacity
+        self._ts[slot], self._px[slot] = ts, price
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        if not self._size:
+            return None
+        last = self._physical(self._size - 1)
+        return self._ts[last], self._px[last]
+
+    def _slices(self, start: int, column: array) -> List[array]:
+        """Punctele de la indexul logic `start` până la capăt, ca una sau două felii."""
+        if start >= self._size:
+            return []
+        begin, end = self._physical(start), self._physical(self._size - 1) + 1
+        if begin < end:
+            return [column[begin:end]]
+        return [column[begin:], column[:end]]
+
+    def ordered(self, since: float = float('-inf')) -> Tuple[array, array]:
+        """(timestamps, prețuri) începând cu `since`, în ordine cronologică."""
+        start = bisect_left(self, since, 0, self._size)
+        ts, px = array('d'), array('d')
+        for part in self._slices(start, self._ts):
+            ts.extend(part)
+        for part in self._slices(start, self._px):
+            px.extend(part)
+        return ts, px
+
+    def price_at(self, ts: float) -> Optional[float]:
+        """Ultimul preț cunoscut la momentul `ts` (sau cel mai vechi, dacă istoricul începe după)."""
+        if not self._size:
+            return None
+        index = max(0, bisect_right(self, ts, 0, self._size) - 1)
+        return self._px[self._physical(index)]
+
+    def change(self, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Variația procentuală față de prețul de acum `seconds` secunde."""
+        latest = self.latest()
+        if latest is None:
+            return None
+        now = latest[0] if now is None else now
+        then = self.price_at(now - seconds)
+        if not then or self._size < 2:
+            return None
+        return (latest[1] - then) / then * 100
+
+    def min_max(self, seconds: float, now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        now = time.time() if now is None else now
+        parts = self._slices(bisect_left(self, now - seconds, 0, self._size), self._px)
+        if not parts:
+            return None
+        return min(min(part) for part in parts), max(max(part) for part in parts)
+
+    def moving_average(self, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        now = time.time() if now is None else now
+        parts = self._slices(bisect_left(self, now - seconds, 0, self._size), self._px)
+        count = sum(len(part) for part in parts)
+        return sum(sum(part) for part in parts) / count if count else None
+
+    def coverage(self) -> float:
+        """Câte secunde acoperă istoricul."""
+        if self._size < 2:
+            return 0.0
+        return self._ts[self._physical(self._size - 1)] - self._ts[self._head]
+
+
+class PriceHistory:
+    """Istoricul recent al prețurilor, câte un PriceSeries per simbol.
+
+    Filled by get_crypto_price, so trends cost no extra upstream calls. `save` writes a
+    compact binary snapshot (raw float64 arrays) atomically; `load` restores it at
+    startup, so history survives restarts.
+    """
+
+    def __init__(self, capacity: int = 2880, resolution: float = 30.0, path: Optional[str] = None):
+        self.capacity = capacity
+        self.resolution = resolution
+        self.path = path
+        self._series: Dict[str, PriceSeries] = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._series
+
+    def series(self, symbol: str) -> Optional[PriceSeries]:
+        return self._series.get(symbol.upper())
+
+    def record(self, symbol: str, price: float, ts: Optional[float] = None) -> None:
+        symbol = symbol.upper()
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = PriceSeries(self.capacity, self.resolution)
+        series.append(time.time() if ts is None else ts, price)
+
+    def backfill(self, symbol: str, points: Iterable[Tuple[float, float]]) -> None:
+        """Adaugă puncte (timestamp, preț) mai vechi decât istoricul existent, ex. de la CoinGecko."""
+        symbol = symbol.upper()
+        old = self._series.get(symbol)
+        first = old[0] if old else float('inf')
+        series = PriceSeries(self.capacity, self.resolution)
+        for ts, price in sorted(points):
+            if ts < first:
+                series.append(ts, price)
+        if old:
+            for ts, price in zip(*old.ordered()):
+                series.append(ts, price)
+        self._series[symbol] = series
+
+    def change(self, symbol: str, seconds: float) -> Optional[float]:
+        series = self.series(symbol)
+        return series.change(seconds, time.time()) if series else None
+
+    def min_max(self, symbol: str, seconds: float) -> Optional[Tuple[float, float]]:
+        series = self.series(symbol)
+        return series.min_max(seconds) if series else None
+
+    def moving_average(self, symbol: str, seconds: float) -> Optional[float]:
+        series = self.series(symbol)
+        return series.moving_average(seconds) if series else None
+
+    # --- snapshot ---
+
+    def _dump(self) -> bytes:
+        parts = [_MAGIC, _BYTEORDER, struct.pack("<I", len(self._series))]
+        for symbol, series in self._series.items():
+            ts, px = series.ordered()
+            name = symbol.encode("utf-8")
+            parts += [struct.pack("<HI", len(name), len(ts)), name, ts.tobytes(), px.tobytes()]
+        return b"".join(parts)
+
+    def _restore(self, data: bytes) -> int:
+        if data[:4] != _MAGIC:
+            raise ValueError("not a price history snapshot")
+        swap = data[4:5] != _BYTEORDER
+        (symbols,), offset = struct.unpack_from("<I", data, 5), 9
+        for _ in range(symbols):
+            name_length, count = struct.unpack_from("<HI", data, offset)
+            offset += 6
+            symbol = data[offset:offset + name_length].decode("utf-8")
+            offset += name_length
+            ts, px = array('d'), array('d')
+            ts.frombytes(data[offset:offset + 8 * count])
+            offset += 8 * count
+            px.frombytes(data[offset:offset + 8 * count])
+            offset += 8 * count
+            if swap:
+                ts.byteswap()
+                px.byteswap()
+            for point_ts, point_px in zip(ts, px):
+                self.record(symbol, point_px, point_ts)
+        return symbols
+
+    def _write(self, data: bytes) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def load(self) -> int:
+        """Încarcă snapshot-ul, dacă există; returnează numărul de simboluri."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "rb") as f:
+                return self._restore(f.read())
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Could not load price history from {self.path}: {e}")
+            return 0
+
+    async def save(self, context=None) -> None:
+        """Job: snapshot pe disc; scrierea și fsync rulează într-un thread."""
+        if not self.path or not self._series:
+            return
+        # Serializarea rămâne în event loop: bufferele nu se schimbă în timpul copierii
+        data = self._dump()
+        try:
+            await asyncio.to_thread(self._write, data)
+        except OSError as e:
+            logger.error(f"Could not save price history to {self.path}: {e}")
+
+
+price_history = PriceHistory(PRICE_HISTORY_CAPACITY, PRICE_HISTORY_RESOLUTION, PRICE_HISTORY_PATH or None)
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import logger
+from .metrics import registry
+
+# (alert_id, user_id, symbol, target_price, direction) — exact ca rândurile din get_all_active_alerts
+AlertRow = Tuple[int, int, str, float, str]
+
+FetchPrice = Callable[[str], Awaitable[Optional[float]]]
+LoadAlerts = Callable[[], Awaitable[Sequence[AlertRow]]]
+# Primește alertele simbolului și returnează id-urile celor declanșate
+OnPrice = Callable[[str, float, List[AlertRow]], Awaitable[Iterable[int]]]
+
+
+class PriceWatcher:
+    """Urmărește prețurile doar pentru simbolurile cu alerte active.
+
+    Each symbol has its own polling deadline, derived from how far the last price is
+    from the nearest alert threshold: `min_interval` when closer than `near_distance`
+    (relative), `max_interval` beyond `far_distance`, linear in between. When
+    `feed_url` is set, prices pushed over that websocket are evaluated immediately
+    and postpone the next poll of that symbol, so polling becomes a fallback.
+    """
+
+    def __init__(self, fetch_price: FetchPrice, load_alerts: LoadAlerts, on_price: OnPrice,
+                 min_interval: float = 5.0, max_interval: float = 300.0,
+                 near_distance: float = 0.005, far_distance: float = 0.10,
+                 feed_url: Optional[str] = None, refresh_interval: float = 300.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.fetch_price = fetch_price
+        self.load_alerts = load_alerts
+        self.on_price = on_price
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.near_distance = near_distance
+        self.far_distance = far_distance
+        self.feed_url = feed_url
+        self.refresh_interval = refresh_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._alerts: Dict[str, List[AlertRow]] = {}
+        self._next_poll: Dict[str, float] = {}
+        self.last_price: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._wake = asyncio.Event()
+        self._dirty = True
+        self._refreshed_at = 0.0
+        self._running = False
+        self._feed = None
+        self._feed_symbols: frozenset = frozenset()
+
+    @property
+    def symbols(self) -> List[str]:
+        return sorted(self._alerts)
+
+    def invalidate(self) -> None:
+        """Alertele s-au schimbat (adăugare/ștergere): reîncarcă la următoarea iterație."""
+        self._dirty = True
+        self._wake.set()
+
+    def interval_for(self, symbol: str, price: float) -> float:
+        """Intervalul până la următoarea interogare, în funcție de cea mai apropiată țintă."""
+        alerts = self._alerts.get(symbol)
+        if not alerts or price <= 0:
+            return self.max_interval
+        distance = min(abs(price - target) for _, _, _, target, _ in alerts) / price
+        if distance <= self.near_distance:
+            return self.min_interval
+        if distance >= self.far_distance:
+            return self.max_interval
+        ratio = (distance - self.near_distance) / (self.far_distance - self.near_distance)
+        return self.min_interval + ratio * (self.max_interval - self.min_interval)
+
+    async def _reload(self) -> None:
+        rows = await self.load_alerts()
+        grouped: Dict[str, List[AlertRow]] = defaultdict(list)
+        for row in rows:
+            grouped[row[2].upper()].append(row)
+
+        now = time.monotonic()
+        for symbol in list(self._next_poll):
+            if symbol not in grouped:
+                del self._next_poll[symbol]
+                self.last_price.pop(symbol, None)
+        for symbol in grouped:
+            if symbol not in self._next_poll:
+                self._next_poll[symbol] = now  # simbol nou: prima interogare imediat
+            elif symbol in self.last_price:
+                # Pragurile s-au putut apropia; nu așteptăm intervalul vechi, calculat pentru alte alerte
+                self._alerts[symbol] = grouped[symbol]
+                self._next_poll[symbol] = min(self._next_poll[symbol], now + self.interval_for(symbol, self.last_price[symbol]))
+        self._alerts = dict(grouped)
+        self._refreshed_at = now
+        self._dirty = False
+        await self._update_feed_subscription()
+
+    async def handle_price(self, symbol: str, price: float, source: str = "poll") -> None:
+        """Evaluează alertele simbolului la un preț nou, indiferent de unde a venit."""
+        symbol = symbol.upper()
+        registry.inc("flowsy_price_updates_total", source=source)
+        async with self._locks[symbol]:
+            self.last_price[symbol] = price
+            alerts = self._alerts.get(symbol)
+            if not alerts:
+                return
+            try:
+                fired = set(await self.on_price(symbol, price, list(alerts)))
+            except Exception as e:
+                logger.error(f"Error evaluating alerts for {symbol}: {e}")
+                fired = set()
+            if fired:
+                remaining = [row for row in self._alerts.get(symbol, []) if row[0] not in fired]
+                if remaining:
+                    self._alerts[symbol] = remaining
+                else:
+                    self._alerts.pop(symbol, None)
+                    self._next_poll.pop(symbol, None)
+                    self.last_price.pop(symbol, None)
+                    return
+
+            interval = self.interval_for(symbol, price)
+            if source == "feed":
+                # Feed-ul acoperă simbolul; interogarea rămâne doar plasă de siguranță
+                interval = self.max_interval
+            if symbol in self._next_poll:
+                self._next_poll[symbol] = time.monotonic() + interval
+
+    async def _poll(self, symbol: str) -> None:
+        registry.inc("flowsy_price_polls_total", symbol=symbol)
+        price = await self.fetch_price(symbol)
+        if price is None:
+            if symbol in self._next_poll:
+                self._next_poll[symbol] = time.monotonic() + min(self.max_interval, self.min_interval * 4)
+            return
+        await self.handle_price(symbol, price, source="poll")
+
+    async def run(self) -> None:
+        self._running = True
+        feed_task = asyncio.create_task(self._feed_loop()) if self.feed_url else None
+        try:
+            while self._running:
+                now = time.monotonic()
+                if self._dirty or now - self._refreshed_at >= self.refresh_interval:
+                    try:
+                        await self._reload()
+                    except Exception as e:
+                        logger.error(f"Could not load alerts for price watch: {e}")
+                        self._refreshed_at = now
+
+                now = time.monotonic()
+                due = [symbol for symbol, at in self._next_poll.items() if at <= now]
+                if due:
+                    # Termenul se mută înainte ca să nu fie reluat dacă interogarea întârzie
+                    for symbol in due:
+                        self._next_poll[symbol] = now + self.max_interval
+                    await asyncio.gather(*(self._poll(symbol) for symbol in due), return_exceptions=True)
+                    continue
+
+                deadline = min(self._next_poll.values(), default=now + self.refresh_interval)
+                deadline = min(deadline, self._refreshed_at + self.refresh_interval)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, deadline - now))
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+        finally:
+            self._running = False
+            if feed_task:
+                feed_task.cancel()
+                await asyncio.gather(feed_task, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    # --- PUSH FEED ---
+
+    async def _update_feed_subscription(self) -> None:
+        symbols = frozenset(self._alerts)
+        if self._feed is None or symbols == self._feed_symbols:
+            return
+        try:
+            await self._feed.send(json.dumps({"subscribe": sorted(symbols)}))
+            self._feed_symbols = symbols
+        except Exception as e:
+            logger.warning(f"Could not update price feed subscription: {e}")
+
+    def _parse_feed_message(self, raw) -> List[Tuple[str, float]]:
+        data = json.loads(raw)
+        items = data if isinstance(data, list) else [data]
+        prices = []
+        for item in items:
+            if isinstance(item, dict) and "symbol" in item and "price" in item:
+                prices.append((str(item["symbol"]), float(item["price"])))
+        return prices
+
+    async def _feed_loop(self) -> None:
+        import websockets
+
+        attempt = 0
+        while self._running:
+            try:
+                async with websockets.connect(self.feed_url) as ws:
+                    logger.info(f"Connected to price feed {self.feed_url}")
+                    attempt = 0
+                    self._feed = ws
+                    self._feed_symbols = frozenset()
+                    await self._update_feed_subscription()
+                    async for raw in ws:
+                        try:
+                            prices = self._parse_feed_message(raw)
+                        except (ValueError, TypeError) as e:
+                            logger.warning(f"Ignoring malformed price feed message: {e}")
+                            continue
+                        for symbol, price in prices:
+                            await self.handle_price(symbol, price, source="feed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Price feed connection failed: {e}")
+            finally:
+                self._feed = None
+            if not self._running:
+                break
+            # Cât timp feed-ul e căzut, interogările revin la intervalele adaptive
+            for symbol, price in list(self.last_price.items()):
+                if symbol in self._next_poll:
+                    self._next_poll[symbol] = min(self._next_poll[symbol], time.monotonic() + self.interval_for(symbol, price))
+            self._wake.set()
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+from typing import Any, List
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from .config import logger
+
+# Câmpuri care identifică persoane și sunt înlocuite la înregistrare
+NAME_FIELDS = {'first_name', 'last_name', 'username', 'title', 'phone_number', 'invite_link', 'bio'}
+ID_PARENTS = {
+    'from', 'chat', 'user', 'sender_chat', 'forward_from', 'forward_from_chat', 'via_bot',
+    'new_chat_members', 'left_chat_member', 'sender_user',
+}
+# Orice dict cu aceste chei e un User sau un Chat: `id`-ul lui e hash-uit oricare ar fi părintele
+PERSON_KEYS = {'is_bot', 'first_name', 'type'}
+TEXT_FIELDS = {'text', 'caption'}
+WORD_PATTERN = re.compile(r"[^\s]+")
+
+
+class UpdateRecorder:
+    """Scrie update-urile primite, anonimizate, într-un fișier JSONL comprimat cu gzip.
+
+    User and chat ids are replaced by a keyed hash (stable within one salt), names are
+    dropped and message text keeps only commands and @mentions, with word lengths preserved
+    (in UTF-16 code units, like Telegram's entity offsets) so entities stay valid.
+    """
+
+    def __init__(self, path: str, salt: str, flush_every: int = 100, redact_text: bool = True):
+        self.path = path
+        self.salt = salt.encode()
+        self.flush_every = flush_every
+        self.redact_text = redact_text
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def _hash_id(self, value: int) -> int:
+        digest = hmac.new(self.salt, str(value).encode(), hashlib.sha256).digest()
+        hashed = int.from_bytes(digest[:6], 'big') or 1
+        # Păstrează semnul: ID-urile negative sunt grupuri/canale
+        return -hashed if value < 0 else hashed
+
+    @staticmethod
+    def _redact(text: str) -> str:
+        def mask(match) -> str:
+            word = match.group(0)
+            if word[0] in '/@':
+                return word
+            # Offset-urile entităților sunt în unități UTF-16: un emoji ocupă două
+            return 'x' * (len(word.encode('utf-16-le')) // 2)
+        return WORD_PATTERN.sub(mask, text)
+
+    def _anonymise(self, data: Any, parent: str = '') -> Any:
+        if isinstance(data, dict):
+            is_person = parent in ID_PARENTS or not PERSON_KEYS.isdisjoint(data)
+            result = {}
+            for key, value in data.items():
+                if key in NAME_FIELDS and isinstance(value, str):
+                    result[key] = key if key != 'username' else None
+                elif key == 'id' and is_person and isinstance(value, int):
+                    result[key] = self._hash_id(value)
+                elif key in ('user_id', 'chat_id') and isinstance(value, int):
+                    result[key] = self._hash_id(value)
+                elif key in TEXT_FIELDS and isinstance(value, str) and self.redact_text:
+                    result[key] = self._redact(value)
+                else:
+                    result[key] = self._anonymise(value, key)
+            return {k: v for k, v in result.items() if v is not None}
+        if isinstance(data, list):
+            return [self._anonymise(item, parent) for item in data]
+        return data
+
+    async def record(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """TypeHandler callback: buffers one anonymised update."""
+        try:
+            line = json.dumps({
+                "t": round(time.time() - self._started, 3),
+                "update": self._anonymise(update.to_dict()),
+            }, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"Failed to record update: {e}")
+            return
+        self._buffer.append(line)
+        if len(self._buffer) >= self.flush_every:
+            lines, self._buffer = self._buffer, []
+            context.application.create_task(self._write_async(lines))
+
+    async def _write_async(self, lines: List[str]) -> None:
+        await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: List[str]) -> None:
+        with self._lock, gzip.open(self.path, 'at', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def flush(self) -> None:
+        """Writes whatever is still buffered (called on shutdown)."""
+        lines, self._buffer = self._buffer, []
+        if lines:
+            self._write(lines)
+
+
+def load_recording(path: str) -> List[dict]:
+    """Reads a recording written by UpdateRecorder, in order."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,117 @@
+"""Redistribuie tabelele users și alerts pe un alt număr de shard-uri.
+
+Run it with the bot stopped, then start the bot with the new DB_SHARDS:
+
+    python -m src.reshard --shards 8                  # din layout-ul curent (DB_SHARDS) în 8 fișiere
+    python -m src.reshard --from-shards 8 --shards 1  # înapoi într-un singur fișier (DB_FILE)
+
+New shards are written next to the old ones and swapped in only when all of them are
+complete, so an interrupted run leaves the old layout untouched. Alert IDs encode the
+shard, so they are renumbered; users see the new IDs in /alerte.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from typing import List
+
+from .config import DB_FILE, DB_SHARDS, logger
+from .database import SHARD_SCHEMA, USER_COLUMNS, shard_file
+
+TMP_SUFFIX = ".resharding"
+
+
+def _create_schema(db: sqlite3.Connection) -> None:
+    for statement in SHARD_SCHEMA:
+        db.execute(statement)
+    columns = {row[1] for row in db.execute("PRAGMA table_info(users)")}
+    for column, definition in USER_COLUMNS:
+        if column not in columns:
+            db.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+
+
+def _copy_shard(db: sqlite3.Connection, sources: List[str], shard: int, shards: int) -> tuple:
+    """Copiază din toate sursele rândurile care aparțin shard-ului; (utilizatori, alerte)."""
+    target_columns = [row[1] for row in db.execute("PRAGMA table_info(users)")]
+    # Același rezultat ca user_id % shards din Python, și pentru valori negative
+    belongs = f"((user_id % {shards}) + {shards}) % {shards} = {shard}"
+    users = alerts = 0
+    for source in sources:
+        db.execute("ATTACH DATABASE ? AS src", (source,))
+        source_columns = {row[1] for row in db.execute("PRAGMA src.table_info(users)")}
+        columns = ", ".join(column for column in target_columns if column in source_columns)
+        users += db.execute(f"INSERT OR IGNORE INTO users ({columns}) SELECT {columns} FROM src.users WHERE {belongs}").rowcount
+        alerts += db.execute(
+            "INSERT INTO alerts (user_id, symbol, target_price, direction) "
+            f"SELECT user_id, symbol, target_price, direction FROM src.alerts WHERE {belongs} ORDER BY alert_id"
+        ).rowcount
+        db.commit()
+        db.execute("DETACH DATABASE src")
+    return users, alerts
+
+
+def reshard(shards: int, from_shards: int, db_file: str = DB_FILE) -> tuple:
+    """Mută users/alerts din `from_shards` fișiere în `shards` fișiere. Returnează (utilizatori, alerte)."""
+    sources = [shard_file(shard, from_shards, db_file) for shard in range(from_shards)]
+    missing = [path for path in sources if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Missing shard files: {', '.join(missing)}")
+    if shards == from_shards:
+        return 0, 0
+
+    targets = [shard_file(shard, shards, db_file) for shard in range(shards)]
+    users = alerts = 0
+    if shards == 1:
+        # Un singur shard înseamnă DB_FILE, care are și celelalte tabele: copiem într-o tranzacție
+        with sqlite3.connect(db_file) as db:
+            _create_schema(db)
+            db.execute("DELETE FROM alerts")
+            db.execute("DELETE FROM users")
+            users, alerts = _copy_shard(db, sources, 0, 1)
+    else:
+        for shard, target in enumerate(targets):
+            tmp = target + TMP_SUFFIX
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            db = sqlite3.connect(tmp)
+            try:
+                _create_schema(db)
+                copied = _copy_shard(db, sources, shard, shards)
+            finally:
+                db.close()
+            users, alerts = users + copied[0], alerts + copied[1]
+            logger.info(f"Shard {shard}/{shards}: {copied[0]} users, {copied[1]} alerts")
+        for target in targets:
+            os.replace(target + TMP_SUFFIX, target)
+
+    # Sursele rămase în afara noului layout
+    for source in sources:
+        if source in targets:
+            continue
+        if source == db_file:
+            with sqlite3.connect(db_file) as db:
+                db.execute("DELETE FROM alerts")
+                db.execute("DELETE FROM users")
+        else:
+            os.remove(source)
+    return users, alerts
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Redistribuie users/alerts pe N fișiere SQLite")
+    parser.add_argument("--shards", type=int, required=True, help="Numărul nou de shard-uri")
+    parser.add_argument("--from-shards", type=int, default=DB_SHARDS, help="Layout-ul curent (implicit DB_SHARDS)")
+    parser.add_argument("--db-file", default=DB_FILE)
+    args = parser.parse_args(argv)
+    if args.shards < 1 or args.from_shards < 1:
+        parser.error("shard counts must be >= 1")
+    try:
+        users, alerts = reshard(args.shards, args.from_shards, args.db_file)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        print(f"Resharding failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{users} users and {alerts} alerts in {args.shards} shard(s). Set DB_SHARDS={args.shards} before starting the bot.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import itertools
+import logging
+from typing import Any, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .metrics import timed_dependency
+
+logger = logging.getLogger(__name__)
+
+
+class SolanaRPCError(Exception):
+    """Raised when the Solana JSON-RPC endpoint returns an error object."""
+
+
+class SolanaRPC:
+    """Minimal async JSON-RPC client for the Solana HTTP API."""
+
+    def __init__(self, url: str, timeout: float = 30.0, client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self._client = client or httpx.AsyncClient(timeout=timeout)
+        self._ids = itertools.count(1)
+
+    @timed_dependency("solana_rpc")
+    async def call(self, method: str, params: Sequence[Any]) -> Any:
+        """Performs a single JSON-RPC call and returns its result."""
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": list(params)}
+        response = await self._client.post(self.url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        if 'error' in data:
+            raise SolanaRPCError(f"{method} failed: {data['error'].get('message')}")
+        return data.get('result')
+
+    @timed_dependency("solana_rpc")
+    async def batch(self, calls: Sequence[Tuple[str, Sequence[Any]]]) -> List[Any]:
+        """Sends several calls in one JSON-RPC batch request.
+
+        Results are returned in the order of `calls`; failed entries are None.
+        """
+        if not calls:
+            return []
+        ids = [next(self._ids) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": list(params)}
+            for request_id, (method, params) in zip(ids, calls)
+        ]
+        response = await self._client.post(self.url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict):
+            # Some providers answer a batch with a single error object
+            raise SolanaRPCError(f"Batch request failed: {data.get('error', {}).get('message')}")
+
+        by_id = {}
+        for item in data:
+            if 'error' in item:
+                logger.warning(f"Batched RPC call {item.get('id')} failed: {item['error'].get('message')}")
+                continue
+            by_id[item.get('id')] = item.get('result')
+        return [by_id.get(request_id) for request_id in ids]
+
+    async def close(self) -> None:
+        await self._client.aclose()
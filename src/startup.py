@@ -0,0 +1,43 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+from .config import logger
+
+# Activează raportul cu STARTUP_PROFILE=1. Pentru detalii pe fiecare modul: python -X importtime -m src.main
+STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', '0').lower() in ('1', 'true', 'yes')
+
+
+class StartupTimer:
+    """Measures named startup phases and logs them as a small report."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, began - self.started, time.perf_counter() - began))
+
+    def mark(self, name: str) -> None:
+        """Records a point in time (e.g. 'polling started') relative to process start."""
+        now = time.perf_counter() - self.started
+        self.phases.append((name, now, 0.0))
+
+    def report(self, title: str = "Startup") -> None:
+        if not self.enabled:
+            return
+        lines = [f"{title} timing report:"]
+        for name, at, duration in self.phases:
+            suffix = f" took {duration * 1000:8.1f} ms" if duration else ""
+            lines.append(f"  +{at * 1000:8.1f} ms  {name}{suffix}")
+        logger.info("\n".join(lines))
+
+
+startup_timer = StartupTimer(STARTUP_PROFILE)
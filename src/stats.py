@@ -0,0 +1,94 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from .config import logger
+from .database import apply_stats_batch, get_stats_snapshot
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class StatsCollector:
+    """Acumulează activitatea în memorie și o scrie periodic, într-o singură tranzacție.
+
+    Users are upserted in batches, not one INSERT per message. Every counter goes both
+    into the running total (stats_counters) and into today's row (stats_daily), so /stats
+    reads a handful of primary-key rows whatever the size of the users table.
+    """
+
+    def __init__(self):
+        self._users: Dict[int, tuple] = {}
+        self._active: set = set()
+        self._counters: Counter = Counter()
+        self._daily: Counter = Counter()
+        # (zi, user_id) deja scrise de acest proces: evită reinserări inutile
+        self._seen_day = _today()
+        self._seen_today: set = set()
+        self._lock = asyncio.Lock()
+
+    def record_user(self, user) -> None:
+        """Înregistrează utilizatorul (upsert la următorul flush) și activitatea lui de azi."""
+        if user is None:
+            return
+        now = _now()
+        self._users[user.id] = (user.id, user.first_name, user.last_name, user.username,
+                                getattr(user, 'language_code', None), now)
+        day = now[:10]
+        if day != self._seen_day:
+            self._seen_day, self._seen_today = day, set()
+        if user.id not in self._seen_today:
+            self._active.add((day, user.id))
+
+    def inc(self, name: str, value: int = 1) -> None:
+        self._counters[name] += value
+        self._daily[(_today(), name)] += value
+
+    async def track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """TypeHandler (grupul -1): numără mesajele după tipul chat-ului."""
+        if isinstance(update, Update) and update.effective_message and update.effective_chat:
+            self.inc(f"messages_{update.effective_chat.type}")
+
+    async def flush(self, context: ContextTypes.DEFAULT_TYPE = None) -> None:
+        """Job: scrie tot ce s-a acumulat. Dacă scrierea eșuează, datele rămân pentru data viitoare."""
+        async with self._lock:
+            if not (self._users or self._active or self._counters):
+                return
+            users, self._users = self._users, {}
+            active, self._active = self._active, set()
+            counters, self._counters = self._counters, Counter()
+            daily, self._daily = self._daily, Counter()
+            try:
+                await apply_stats_batch(list(users.values()), sorted(active), counters, daily)
+            except Exception as e:
+                logger.error(f"Failed to flush stats: {e}")
+                for user_id, row in users.items():
+                    self._users.setdefault(user_id, row)
+                self._active |= active
+                self._counters.update(counters)
+                self._daily.update(daily)
+                return
+            self._seen_today.update(user_id for day, user_id in active if day == self._seen_day)
+
+    async def snapshot(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Totalurile și contoarele de azi, inclusiv ce nu a fost încă scris."""
+        today = _today()
+        totals, daily = await get_stats_snapshot(today)
+        for name, value in self._counters.items():
+            totals[name] = totals.get(name, 0) + value
+        for (day, name), value in self._daily.items():
+            if day == today:
+                daily[name] = daily.get(name, 0) + value
+        return totals, daily
+
+
+stats_collector = StatsCollector()
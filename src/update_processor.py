@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from .metrics import registry
+
+Key = Tuple[str, int]
+
+# Plafonul clasei de bază: semaforul ei este luat înaintea lacătelor pe chat, deci îl
+# ținem practic nelimitat și aplicăm limita globală abia după ce update-ul e la rând.
+_UNBOUNDED = 2 ** 30
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Procesează update-urile concurent, dar în ordine pentru același chat sau utilizator.
+
+    Updates that share a chat or a user wait for each other (FIFO, asyncio.Lock); the
+    global `max_concurrent` limit only applies to updates whose turn has come, so a chat
+    with a long backlog cannot hold slots that other chats could use.
+    """
+
+    __slots__ = ("max_concurrent", "_global", "_locks", "_depth")
+
+    def __init__(self, max_concurrent: int):
+        super().__init__(_UNBOUNDED)
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be a positive integer")
+        self.max_concurrent = max_concurrent
+        self._global = asyncio.Semaphore(max_concurrent)
+        self._locks: Dict[Key, asyncio.Lock] = {}
+        self._depth: Dict[Key, int] = {}
+
+    @staticmethod
+    def keys_for(update: object) -> List[Key]:
+        """Cheile de serializare, mereu în aceeași ordine (evită blocajele reciproce)."""
+        if not isinstance(update, Update):
+            return []
+        keys = set()
+        if update.effective_chat:
+            keys.add(("chat", update.effective_chat.id))
+        if update.effective_user:
+            keys.add(("user", update.effective_user.id))
+        return sorted(keys)
+
+    def queue_depth(self, key: Key) -> int:
+        """Câte update-uri (în lucru + în așteptare) are cheia, de ex. ("chat", 123)."""
+        return self._depth.get(key, 0)
+
+    def queue_depths(self) -> Dict[Key, int]:
+        return dict(self._depth)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        keys = self.keys_for(update)
+        for key in keys:
+            self._depth[key] = self._depth.get(key, 0) + 1
+            if key not in self._locks:
+                self._locks[key] = asyncio.Lock()
+        locks = [self._locks[key] for key in keys]
+
+        queued_at = time.perf_counter()
+        acquired = 0
+        started = False
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired += 1
+            async with self._global:
+                registry.observe("flowsy_update_queue_wait_seconds", time.perf_counter() - queued_at)
+                started = True
+                await coroutine
+        finally:
+            for lock in locks[:acquired]:
+                lock.release()
+            for key in keys:
+                depth = self._depth[key] - 1
+                if depth:
+                    self._depth[key] = depth
+                else:
+                    # Nimeni nu mai așteaptă cheia: eliberăm memoria
+                    del self._depth[key]
+                    del self._locks[key]
+            if not started and hasattr(coroutine, "close"):
+                # Anulat înainte de rând: corutina nu va mai fi rulată
+                coroutine.close()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from .config import logger, GROUP_LINK
+
+
+class Segment(NamedTuple):
+    language: str      # 'ro' / 'en'
+    activity: str      # 'active' (7 zile), 'occasional' (30 zile), 'dormant'
+    has_alerts: bool
+
+
+def segment_of(recipient: tuple, now: Optional[datetime] = None) -> Segment:
+    """Segmentul unui destinatar (rând din database.get_recipients)."""
+    _, language_code, last_seen, _, has_alerts = recipient[:5]
+    language = 'ro' if (language_code or 'ro').lower().startswith('ro') else 'en'
+    activity = 'dormant'
+    if last_seen:
+        now = now or datetime.now(timezone.utc)
+        seen = datetime.strptime(last_seen[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+        if now - seen <= timedelta(days=7):
+            activity = 'active'
+        elif now - seen <= timedelta(days=30):
+            activity = 'occasional'
+    return Segment(language, activity, bool(has_alerts))
+
+
+# Textul generat ajunge în șabloane; tot ce e local (salut, îndemn) e gata scris
+TEMPLATES = {
+    'ro': {
+        'title': "Sfatul Săptămânii de la Flowsy 💡",
+        'greeting': "Salut, {name}!",
+        'alerts_cta': "Alertele tale de preț sunt active; le vezi oricând cu /alerte.",
+        'no_alerts_cta': "Setează o alertă de preț, de exemplu: /alerta BTC 65000 peste",
+        'group': "Hai pe grupul nostru să ne arăți ce ai creat: {link}",
+        'fallback_tip': "Știai că poți folosi modele AI pentru a-ți genera idei de proiecte noi? Încearcă să-i ceri lui Flowsy 3 idei de aplicații web care folosesc Python și recunoaștere de imagini.",
+    },
+    'en': {
+        'title': "Flowsy's Tip of the Week 💡",
+        'greeting': "Hi, {name}!",
+        'alerts_cta': "Your price alerts are active; check them anytime with /alerte.",
+        'no_alerts_cta': "Set a price alert, for example: /alerta BTC 65000 peste",
+        'group': "Join our group and show us what you built: {link}",
+        'fallback_tip': "Did you know you can use AI models to brainstorm new projects? Ask Flowsy for 3 web app ideas that use Python and image recognition.",
+    },
+}
+
+ACTIVITY_HINTS = {
+    'active': "a regular user who chats with the bot every week",
+    'occasional': "a user who comes back a few times a month",
+    'dormant': "a user who has not used the bot for over a month and should be welcomed back",
+}
+
+
+class WeeklyContent:
+    """Generează sfatul săptămânii o singură dată pe segment și îl personalizează local.
+
+    `generate` is the Gemini call (prompt -> response with `.text`). Results are cached
+    per (week, segment); concurrent requests for the same segment share one call. When
+    generation fails the segment gets the static fallback tip, also cached for the week.
+    """
+
+    def __init__(self, generate: Callable[[str], Awaitable[object]], max_chars: int = 600):
+        self.generate = generate
+        self.max_chars = max_chars
+        self._cache: Dict[Tuple[str, Segment], asyncio.Future] = {}
+        self.model_calls = 0
+
+    @staticmethod
+    def period(now: Optional[datetime] = None) -> str:
+        year, week, _ = (now or datetime.now(timezone.utc)).isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def _prompt(self, segment: Segment) -> str:
+        language = "Romanian" if segment.language == 'ro' else "English"
+        alerts = ("already uses price alerts for crypto" if segment.has_alerts
+                  else "has not set any crypto price alert yet")
+        return (
+            f"Write one short, practical tip of the week (max 3 sentences, under {self.max_chars // 2} characters) "
+            f"for members of the FlowsyAI community (AI and the FlowsyAI Coin). Write it in {language}. "
+            f"The reader is {ACTIVITY_HINTS[segment.activity]} and {alerts}. "
+            "Reply with the tip text only: no greeting, no title, no markdown, no links."
+        )
+
+    async def _generate(self, segment: Segment) -> str:
+        self.model_calls += 1
+        try:
+            response = await self.generate(self._prompt(segment))
+            text = (response.text or "").strip()
+            if text:
+                return text[:self.max_chars]
+        except Exception as e:
+            logger.warning(f"Weekly tip generation failed for {segment}: {e}")
+        return TEMPLATES[segment.language]['fallback_tip']
+
+    async def tip_for(self, segment: Segment, period: Optional[str] = None) -> str:
+        period = period or self.period()
+        key = (period, segment)
+        future = self._cache.get(key)
+        if future is None:
+            # Săptămâna s-a schimbat: textele vechi nu mai sunt necesare
+            for old in [k for k in self._cache if k[0] != period]:
+                del self._cache[old]
+            future = asyncio.get_running_loop().create_future()
+            self._cache[key] = future
+            try:
+                future.set_result(await self._generate(segment))
+            except BaseException:
+                self._cache.pop(key, None)
+                future.cancel()
+                raise
+        return await future
+
+    async def render(self, recipient: tuple, period: Optional[str] = None) -> str:
+        """Mesajul complet pentru un destinatar (text simplu, fără markdown)."""
+        segment = segment_of(recipient)
+        templates = TEMPLATES[segment.language]
+        tip = await self.tip_for(segment, period)
+        name = recipient[3] or ("prietene" if segment.language == 'ro' else "friend")
+        parts = [
+            templates['title'],
+            templates['greeting'].format(name=name),
+            tip,
+            templates['alerts_cta'] if segment.has_alerts else templates['no_alerts_cta'],
+            templates['group'].format(link=GROUP_LINK),
+        ]
+        return "\n\n".join(parts)
@@ -0,0 +1,48 @@
+import pytest
+
+from benchmarks.language_corpus import CORPUS
+from src.language import LanguageDetector, LanguageProfiles
+
+MIN_ACCURACY = 0.95
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return LanguageDetector()
+
+
+def test_corpus_accuracy(detector):
+    wrong = [(expected, text) for expected, text in CORPUS if (detector.detect(text).language or 'en') != expected]
+    assert 1 - len(wrong) / len(CORPUS) >= MIN_ACCURACY, wrong
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("as soon as possible", 'en'),
+    ("take care", 'en'),
+    ("are you there", 'en'),
+    ("send me the link", 'en'),
+    ("care e pretul acum", 'ro'),
+    ("nu pot sa intru in cont", 'ro'),
+])
+def test_shared_words(detector, text, expected):
+    assert detector.detect(text).language == expected
+
+
+def test_profile_follows_language_switch(detector):
+    profiles = LanguageProfiles(detector)
+    romanian = [text for expected, text in CORPUS if expected == 'ro']
+    english = [text for expected, text in CORPUS if expected == 'en']
+    for text in romanian[:10]:
+        assert profiles.observe(1, text) == 'ro'
+    assert profiles.is_confident(1)
+    replies = [profiles.observe(1, text) for text in english[:5]]
+    assert replies[-1] == 'en'
+    assert replies.index('en') <= 3
+
+
+def test_confident_profile_skips_detection(detector):
+    profiles = LanguageProfiles(detector)
+    english = [text for expected, text in CORPUS if expected == 'en']
+    for text in english[:20]:
+        assert profiles.observe(1, text) == 'en'
+    assert profiles.skipped > 0